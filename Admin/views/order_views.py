@@ -13,6 +13,7 @@ from django.http import JsonResponse
 from decimal import Decimal,ROUND_HALF_UP
 
 from products.models import Product,Category
+from products.services import schedule_price_summary_refresh
 from userFolder.order.models import OrderItem,OrderMain,ORDER_STATUS_CHOICES,ADMIN_ORDER_STATUS_CHOICES,PAYMENT_STATUS_CHOICES,ReturnOrder,CancelOrder,CancelItem
 from userFolder.wallet.models import Wallet,Transaction,TransactionStatus,TransactionType
 
@@ -327,6 +328,7 @@ def manage_return_request(request, item_id, order_id):
                 product_variant.__class__.objects.filter(
                     pk=product_variant.pk
                 ).update(stock=F('stock') + order_item.quantity)
+                schedule_price_summary_refresh(product_ids=[product_variant.product_id])
 
             order_item.save()
             
@@ -11,6 +11,8 @@ from django.forms import inlineformset_factory
 from django.contrib import messages
 
 from products.models import Product,Category,ProductVariant,ProductImage
+from products.search import search_products
+from products.cache import invalidate_products
 from ..forms import *
 
 @method_decorator([never_cache, staff_member_required(login_url='admin_login')], name="dispatch")
@@ -29,7 +31,7 @@ class AdminProductsView(LoginRequiredMixin, ListView):
         status_query = self.request.GET.get("status", "")
 
         if search_query:
-            queryset = queryset.filter(name__icontains=search_query)
+            queryset = search_products(queryset, search_query).order_by("-search_rank", "-updated_at")
 
         if category_query:
             queryset = queryset.filter(category__name__icontains=category_query)
@@ -205,8 +207,11 @@ def toggle_category_block(request, id):
     # Apply same status to related products
     new_status = category.is_active
     products = category.products.all()
-    count = products.count()
+    product_ids = list(products.values_list("id", flat=True))
+    count = len(product_ids)
     products.update(is_active=new_status)
+    # queryset.update() skips the product signals
+    transaction.on_commit(lambda: invalidate_products(product_ids))
 
     if new_status:
         # Category has been unblocked
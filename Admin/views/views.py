@@ -23,6 +23,7 @@ from ..forms import (AdminLoginForm,AdminForgotPasswordEmailForm,AdminSetNewPass
 from ..utils import send_html_mail
 from accounts.models import CustomUser, EmailOTP
 from userFolder.order.models import OrderMain,OrderItem
+from userFolder.order.leaderboard import top_products as top_sold_products, top_categories as top_sold_categories
 from userFolder.wallet.models import *
 from products.contact_models import ContactModel,Thumbanails
 from products.models import Product
@@ -89,18 +90,19 @@ def admin_forgot(request):
                 del request.session["admin_reset_password_allowed"]
 
             otp_code = EmailOTP.generate_otp()
-            EmailOTP.objects.create(user=user, otp=otp_code)
 
             subject = "Admin Reset Password One-Time-Password "
 
             try:
-                send_html_mail(
-                    subject=subject,
-                    template_name="email/admin_otp_email.html",
-                    context={"otp_code": otp_code},
-                    to_email=email,
-                    plain_text=f"Your OTP code for password Rest is :{otp_code}",
-                )
+                with transaction.atomic():
+                    EmailOTP.objects.create(user=user, otp=otp_code)
+                    send_html_mail(
+                        subject=subject,
+                        template_name="email/admin_otp_email.html",
+                        context={"otp_code": otp_code},
+                        to_email=email,
+                        plain_text=f"Your OTP code for password Rest is :{otp_code}",
+                    )
                 request.session["reset_admin_email"] = user.email
                 messages.success(
                     request, f"An OTP has been Sent to {email}", extra_tags="admin"
@@ -295,21 +297,13 @@ def admin_home(request):
     
     order_labels = [item['order_status'] for item in order]
     order_data = [item['count'] for item in order]
-    top_products = (OrderItem.objects
-                    .filter(order__order_status = 'delivered')
-                    .values('variant__product__name','variant__product__category__name')
-                    .annotate(total_sold=Sum('quantity')) 
-                    .order_by('-total_sold')[:5])
-    
-    top_categories = (OrderItem.objects.filter(order__order_status='delivered') 
-                    .values('variant__product__category__name') 
-                    .annotate(total_revenue=Sum('price_at_purchase')) 
-                    .order_by('-total_revenue')[:5])
+    top_products = top_sold_products('all', 5)
+    top_categories = list(top_sold_categories('all', 5))
     
     if top_categories:
-        max_revenue = top_categories[0]['total_revenue']
+        max_revenue = top_categories[0].revenue
         for cat in top_categories:
-            cat['percentage'] = (cat['total_revenue'] / max_revenue * 100) if max_revenue > 0 else 0
+            cat.percentage = (cat.revenue / max_revenue * 100) if max_revenue > 0 else 0
     context = {
         "order_labels": json.dumps(order_labels),
         "order_data": json.dumps(order_data),
@@ -0,0 +1,61 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from products.models import ProductVariant
+from userFolder.order.finalize import decrement_stock
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Times how long order finalization holds variant row locks, per-item loop vs one UPDATE (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=10, help='Order lines (distinct variants) per order')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        variant_ids = list(ProductVariant.objects.order_by('pk').values_list('pk', flat=True)[:options['lines']])
+        if len(variant_ids) < options['lines']:
+            raise CommandError(f"Only {len(variant_ids)} variants in the database, load products first.")
+        lines = [(variant_id, 1, f'variant {variant_id}') for variant_id in variant_ids]
+
+        try:
+            with transaction.atomic():
+                ProductVariant.objects.filter(pk__in=variant_ids).update(stock=10 ** 6)
+                legacy = self.time_runs(lambda: self.per_item(lines), options['repeat'])
+                batched = self.time_runs(lambda: decrement_stock(lines), options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f"{len(lines)} lines, {options['repeat']} runs on {connection.vendor}")
+        for name, (median, p95, queries) in (('per-item', legacy), ('one UPDATE', batched)):
+            self.stdout.write(f'{name:11} lock held median {median:7.2f} ms   p95 {p95:7.2f} ms   {queries} queries')
+        self.stdout.write(self.style.SUCCESS('Stock changes rolled back.'))
+
+    def per_item(self, lines):
+        # What the payment views did before finalize_order
+        for variant_id, quantity, _ in lines:
+            variant = ProductVariant.objects.select_for_update().get(id=variant_id)
+            variant.stock -= quantity
+            variant.save()
+
+    def time_runs(self, run, repeat):
+        """Each run in its own savepoint: locks are taken at the first statement and held until it ends."""
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                with transaction.atomic():
+                    started = time.perf_counter()
+                    run()
+                    timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return statistics.median(timings), p95, len(captured)
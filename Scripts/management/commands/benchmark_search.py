@@ -0,0 +1,97 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from products.models import Category, Product
+from products.search import search_products, update_search_vectors
+
+ADJECTIVES = ["classic", "slim", "relaxed", "vintage", "printed", "striped", "washed", "oversized", "cropped", "linen"]
+COLOURS = ["black", "white", "navy", "olive", "maroon", "beige", "grey", "mustard", "teal", "blue"]
+ITEMS = ["shirt", "tshirt", "hoodie", "jacket", "jeans", "chinos", "kurta", "shorts", "sweater", "blazer"]
+QUERIES = ["shirt", "blue jeans", "vint", "oversized hoodie", "linen kurta", "jackte", "navy slim chinos"]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Times icontains vs full-text/trigram product search over a synthetic catalog (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The search benchmark needs PostgreSQL.')
+
+        try:
+            with transaction.atomic():
+                self.build_catalog(options['products'])
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE products_product')
+                self.run_queries(options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('Synthetic catalog rolled back.'))
+
+    def build_catalog(self, total):
+        categories = [
+            Category.objects.create(name=f'Benchmark {item} {random.random()}', description=item)
+            for item in ITEMS
+        ]
+        started = time.perf_counter()
+        # Generated server side: bulk_create would run autoslug's uniqueness query per row
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO products_product
+                    (name, slug, description, category_id, is_featured, is_active,
+                     created_at, updated_at, in_wishlist, random_key)
+                SELECT words.name, 'benchmark-' || n || '-' || md5(random()::text),
+                       words.name || ' made for everyday wear',
+                       (%(categories)s)[1 + floor(random() * %(category_count)s)::int],
+                       random() < 0.1, true, now(), now(), false, random()
+                FROM generate_series(1, %(total)s) AS n
+                CROSS JOIN LATERAL (
+                    SELECT (%(adjectives)s)[1 + floor(random() * 10)::int] || ' '
+                        || (%(colours)s)[1 + floor(random() * 10)::int] || ' '
+                        || (%(items)s)[1 + floor(random() * 10)::int] || ' ' || n AS name
+                ) AS words
+                """,
+                {
+                    "categories": [category.pk for category in categories],
+                    "category_count": len(categories),
+                    "total": total,
+                    "adjectives": ADJECTIVES,
+                    "colours": COLOURS,
+                    "items": ITEMS,
+                },
+            )
+        update_search_vectors()
+        self.stdout.write(f'Built {total} products in {time.perf_counter() - started:.1f}s')
+
+    def run_queries(self, repeat):
+        base = Product.objects.filter(is_active=True)
+        for text in QUERIES:
+            legacy = self.time_query(
+                lambda: list(base.filter(name__icontains=text).distinct()[:24]), repeat
+            )
+            ranked = self.time_query(
+                lambda: list(search_products(base, text).order_by('-search_rank', 'pk')[:24]), repeat
+            )
+            self.stdout.write(
+                f'{text!r:22} icontains {legacy:8.2f} ms   search {ranked:8.2f} ms'
+            )
+
+    def time_query(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
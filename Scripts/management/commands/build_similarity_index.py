@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.similarity import build_similarity_index, index_path
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the content-based similar products index (TF-IDF over name, description and category)'
+
+    def handle(self, *args, **options):
+        count = build_similarity_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} products into {index_path()}.'))
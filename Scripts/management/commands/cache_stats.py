@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from products.cache import cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows hit, miss and invalidation counters of the tagged catalog cache'
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        lookups = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / lookups * 100 if lookups else 0
+        self.stdout.write(
+            f"hits {stats['hits']}  misses {stats['misses']}  "
+            f"invalidations {stats['invalidations']}  hit ratio {ratio:.1f}%"
+        )
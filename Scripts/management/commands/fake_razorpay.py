@@ -0,0 +1,186 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import random
+import secrets
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+
+class FakeRazorpay:
+    """In-memory orders and payments, enough of the API for checkout and the callbacks."""
+
+    def __init__(self, key_id, key_secret, latency, error_rate, webhook_url=None, webhook_secret=""):
+        self.key_id = key_id
+        self.key_secret = key_secret
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.latency = latency
+        self.error_rate = error_rate
+        self.orders = {}
+        self.payments = {}
+        self.lock = threading.Lock()
+
+    def create_order(self, data):
+        order = {
+            "id": f"order_{secrets.token_hex(7)}",
+            "entity": "order",
+            "amount": int(data["amount"]),
+            "amount_paid": 0,
+            "currency": data.get("currency", "INR"),
+            "receipt": data.get("receipt"),
+            "status": "created",
+            "created_at": int(time.time()),
+        }
+        with self.lock:
+            self.orders[order["id"]] = order
+        return order
+
+    def pay(self, order_id):
+        """Pays an order the way checkout.js would and returns what it posts to the callback."""
+        with self.lock:
+            order = self.orders[order_id]
+            payment = {
+                "id": f"pay_{secrets.token_hex(7)}",
+                "entity": "payment",
+                "amount": order["amount"],
+                "currency": order["currency"],
+                "status": "captured",
+                "order_id": order_id,
+                "method": "upi",
+                "captured": True,
+                "created_at": int(time.time()),
+            }
+            self.payments[payment["id"]] = payment
+            order.update(status="paid", amount_paid=order["amount"])
+        if self.webhook_url:
+            threading.Thread(target=self.send_webhook, args=("payment.captured", payment), daemon=True).start()
+        signature = hmac.new(
+            self.key_secret.encode(), f"{order_id}|{payment['id']}".encode(), hashlib.sha256
+        ).hexdigest()
+        return {
+            "razorpay_order_id": order_id,
+            "razorpay_payment_id": payment["id"],
+            "razorpay_signature": signature,
+        }
+
+
+    def send_webhook(self, event, payment):
+        body = json.dumps({"entity": "event", "event": event, "payload": {"payment": {"entity": payment}}}).encode()
+        request = urllib.request.Request(self.webhook_url, data=body, headers={
+            "Content-Type": "application/json",
+            "X-Razorpay-Event-Id": f"evt_{secrets.token_hex(7)}",
+            "X-Razorpay-Signature": hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest(),
+        })
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+        except OSError as e:
+            logger.warning("Webhook to %s failed: %s", self.webhook_url, e)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Keep-alive connections otherwise stall on Nagle between the header and body writes
+    disable_nagle_algorithm = True
+    gateway = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def reply_error(self, status, code, description):
+        self.reply(status, {"error": {"code": code, "description": description}})
+
+    def authorized(self):
+        expected = base64.b64encode(f"{self.gateway.key_id}:{self.gateway.key_secret}".encode()).decode()
+        return self.headers.get("Authorization") == f"Basic {expected}"
+
+    def body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def handle_api(self, method):
+        gateway = self.gateway
+        if gateway.latency:
+            time.sleep(random.expovariate(1 / gateway.latency))
+
+        parts = self.path.split("?")[0].strip("/").split("/")
+        # Test hook, no auth: what the browser would post to the callback after paying
+        if method == "POST" and parts[:2] == ["fake", "pay"]:
+            order_id = self.body().get("order_id")
+            if order_id not in gateway.orders:
+                return self.reply_error(400, "BAD_REQUEST_ERROR", "The id provided does not exist")
+            return self.reply(200, gateway.pay(order_id))
+
+        if random.random() < gateway.error_rate:
+            return self.reply_error(500, "SERVER_ERROR", "Injected failure")
+        if not self.authorized():
+            return self.reply_error(401, "BAD_REQUEST_ERROR", "The api key provided is invalid")
+        if method == "POST" and parts == ["v1", "orders"]:
+            return self.reply(200, gateway.create_order(self.body()))
+        if method == "GET" and len(parts) == 4 and parts[:2] == ["v1", "orders"] and parts[3] == "payments":
+            items = [payment for payment in list(gateway.payments.values()) if payment["order_id"] == parts[2]]
+            return self.reply(200, {"entity": "collection", "count": len(items), "items": items})
+        if method == "GET" and len(parts) == 3 and parts[:2] in (["v1", "orders"], ["v1", "payments"]):
+            found = (gateway.orders if parts[1] == "orders" else gateway.payments).get(parts[2])
+            if found is None:
+                return self.reply_error(400, "BAD_REQUEST_ERROR", "The id provided does not exist")
+            return self.reply(200, found)
+        self.reply_error(400, "BAD_REQUEST_ERROR", "The requested URL was not found on the server.")
+
+    def do_GET(self):
+        self.handle_api("GET")
+
+    def do_POST(self):
+        self.handle_api("POST")
+
+
+class Command(BaseCommand):
+    help = ('Runs a local fake of the Razorpay orders/payments API for offline load tests. '
+            'Point RAZORPAY_BASE_URL at it; POST {"order_id": ...} to /fake/pay for callback data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=0, help='Mean of an exponential delay added to every call')
+        parser.add_argument('--error-rate', type=float, default=0, help='Share of calls answered with a 500 SERVER_ERROR')
+        parser.add_argument('--webhook-url', help='Also POST a signed payment.captured webhook here for every payment, '
+                                                  'e.g. http://127.0.0.1:8000/payment/webhook/')
+
+    def handle(self, *args, **options):
+        Handler.gateway = FakeRazorpay(
+            settings.RAZORPAY_KEY_ID,
+            settings.RAZORPAY_KEY_SECRET,
+            options['latency_ms'] / 1000,
+            options['error_rate'],
+            options['webhook_url'],
+            settings.RAZORPAY_WEBHOOK_SECRET,
+        )
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        server.daemon_threads = True
+        self.stdout.write(self.style.SUCCESS(
+            f"Fake Razorpay listening on http://{options['host']}:{options['port']} "
+            f"(set RAZORPAY_BASE_URL to it). Ctrl-C to stop."
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -8,6 +8,7 @@ from urllib.parse import urlparse # <-- ADDED
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.core.files.base import ContentFile # <-- ADDED
+from django.core.management import call_command
 
 # Replace 'products' with the name of your app where models are located
 from products.models import Category, Product, ProductImage, Size, ProductVariant
@@ -144,6 +145,9 @@ class Command(BaseCommand):
             self.stdout.write(f"  Added/Updated {len(size_variants_list)} variants for {product.name}")
             processed_count += 1
 
+        # Names and descriptions changed, refresh the similar products index once the import is committed
+        transaction.on_commit(lambda: call_command('build_similarity_index', stdout=self.stdout))
+
         self.stdout.write(self.style.SUCCESS(f'\nImport complete!'))
         self.stdout.write(self.style.SUCCESS(f'Processed: {processed_count} products.'))
         self.stdout.write(self.style.WARNING(f'Skipped:   {skipped_count} products (due to zero price or missing data).'))
\ No newline at end of file
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from userFolder.payment.events import EVENT_BATCH_SIZE, process_pending_events
+from userFolder.payment.models import PaymentEventStatus
+
+
+class Command(BaseCommand):
+    help = 'Places orders from pending Razorpay webhook and checkout callback events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EVENT_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the queue is empty')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            counts = process_pending_events(options['batch_size'])
+            if counts or not options['loop']:
+                summary = ', '.join(f'{count} {status}' for status, count in sorted(counts.items())) or 'none pending'
+                self.stdout.write(self.style.SUCCESS(
+                    f'Payment events: {summary} in {time.perf_counter() - started:.2f}s.'
+                ))
+            if not options['loop']:
+                return
+            # A full batch that did not end in retries means more are waiting, so go again straight away
+            if sum(counts.values()) < options['batch_size'] or counts.get(PaymentEventStatus.PENDING):
+                time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from userFolder.payment.gateway import stats
+
+
+class Command(BaseCommand):
+    help = 'Shows call, error and latency counters of the Razorpay gateway client across all workers'
+
+    def handle(self, *args, **options):
+        for name, call in stats().items():
+            line = f"{name:14} calls {call['calls']}  errors {call['errors']}  rejected {call['rejected']}"
+            if call['p50_ms'] is not None:
+                line += f"  p50 <= {call['p50_ms']} ms  p95 <= {call['p95_ms']} ms  p99 <= {call['p99_ms']} ms"
+            self.stdout.write(line)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from offer.services import rebuild_offer_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-product offer index used by catalog and cart queries'
+
+    def handle(self, *args, **options):
+        count = rebuild_offer_index()
+        self.stdout.write(self.style.SUCCESS(f'Offer index rebuilt for {count} products.'))
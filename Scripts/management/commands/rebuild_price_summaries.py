@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.services import refresh_price_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the per-product price and stock summary used by the storefront'
+
+    def handle(self, *args, **options):
+        count = refresh_price_summaries()
+        self.stdout.write(self.style.SUCCESS(f'Price summaries refreshed for {count} products.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from userFolder.review.services import rebuild_rating_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the per-product review count, average and star histogram'
+
+    def handle(self, *args, **options):
+        count = rebuild_rating_summaries()
+        self.stdout.write(self.style.SUCCESS(f'Rating summaries rebuilt for {count} products.'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from userFolder.order.leaderboard import rebuild_leaderboard, roll_windows
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the bestseller counters from delivered orders (or only rolls the today/7d/30d windows)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--windows-only', action='store_true', help='Only roll the time windows from the daily counters')
+
+    def handle(self, *args, **options):
+        if options['windows_only']:
+            roll_windows()
+            self.stdout.write(self.style.SUCCESS('Leaderboard windows rolled.'))
+            return
+        rebuild_leaderboard()
+        self.stdout.write(self.style.SUCCESS('Sales leaderboard rebuilt from order history.'))
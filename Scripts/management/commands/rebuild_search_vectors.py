@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from products.cache import PRODUCT_LISTS, invalidate_tags
+from products.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored full-text search vector of every product'
+
+    def handle(self, *args, **options):
+        count = update_search_vectors()
+        invalidate_tags(PRODUCT_LISTS)
+        self.stdout.write(self.style.SUCCESS(f'Search vectors refreshed for {count} products.'))
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from userFolder.payment.events import EVENT_BATCH_SIZE, reconcile_attempts
+
+
+class Command(BaseCommand):
+    help = 'Checks Razorpay for payment attempts left open and queues the paid ones for the payment worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-minutes', type=int, default=60,
+                            help='Only attempts created at least this long ago')
+        parser.add_argument('--limit', type=int, default=EVENT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        queued, expired, top_ups = reconcile_attempts(
+            timedelta(minutes=options['older_than_minutes']), options['limit']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Queued {queued} paid attempt(s) for process_payment_events, expired {expired}.'
+        ))
+        if top_ups:
+            self.stdout.write(self.style.WARNING(
+                f'{top_ups} paid wallet top-up(s) were never credited; see the payment attempts in the admin.'
+            ))
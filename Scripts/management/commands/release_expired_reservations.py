@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from userFolder.order.inventory import RELEASE_BATCH_SIZE, release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Deletes stock reservations whose draft order has expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=RELEASE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired reservation(s).'))
@@ -0,0 +1,31 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products.cache import invalidate_products
+from products.models import Product
+from products.contact_models import Thumbanails
+
+
+class Command(BaseCommand):
+    help = 'Reassigns random_key on products and thumbnails so random carousels rotate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for model in (Product, Thumbanails):
+            ids = list(model.objects.values_list('id', flat=True).order_by('id'))
+            for start in range(0, len(ids), batch_size):
+                rows = [model(id=pk, random_key=random.random()) for pk in ids[start:start + batch_size]]
+                # Short transaction per batch so storefront reads are never blocked for long
+                with transaction.atomic():
+                    model.objects.bulk_update(rows, ['random_key'])
+            self.stdout.write(f'{model.__name__}: reshuffled {len(ids)} rows')
+
+        # bulk_update skips signals, the shuffled listing order changed everywhere
+        invalidate_products()
+        self.stdout.write(self.style.SUCCESS('Random keys reshuffled.'))
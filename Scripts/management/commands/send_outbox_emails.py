@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.outbox import EMAIL_BATCH_SIZE, send_pending_emails
+
+
+class Command(BaseCommand):
+    help = 'Sends queued transactional emails (order confirmations, OTPs) over one SMTP connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EMAIL_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the queue is empty')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            sent, failed = send_pending_emails(options['batch_size'])
+            if sent or failed or not options['loop']:
+                style = self.style.WARNING if failed else self.style.SUCCESS
+                self.stdout.write(style(
+                    f'Outbox: {sent} sent, {failed} failed in {time.perf_counter() - started:.2f}s.'
+                ))
+            if not options['loop']:
+                return
+            # A full batch means more are due, so go again straight away
+            if sent + failed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from userFolder.order.sweeper import SWEEP_BATCH_SIZE, SWEEP_GRACE, sweep_expired_drafts
+
+
+class Command(BaseCommand):
+    help = 'Deletes (or marks failed) draft orders that expired without being paid, in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+        parser.add_argument('--grace-minutes', type=int, default=int(SWEEP_GRACE.total_seconds() // 60),
+                            help='Only touch drafts that expired at least this long ago')
+        parser.add_argument('--mark-failed', action='store_true', help='Keep the drafts as failed orders instead of deleting them')
+        parser.add_argument('--max-batches', type=int, default=None)
+
+    def handle(self, *args, **options):
+        deleted, failed, seconds = sweep_expired_drafts(
+            batch_size=options['batch_size'],
+            grace=timedelta(minutes=options['grace_minutes']),
+            mark_failed=options['mark_failed'],
+            max_batches=options['max_batches'],
+        )
+        swept = deleted + failed
+        rate = swept / seconds if seconds else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Swept {swept} expired drafts ({deleted} deleted, {failed} marked failed) in {seconds:.2f}s, {rate:.0f} drafts/s.'
+        ))
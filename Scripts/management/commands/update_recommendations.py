@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from products.recommendations import update_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Folds newly delivered orders into the co-purchase counts and rescores "bought together" recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Drop the counts and rebuild from every delivered order')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        orders, products = update_recommendations(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Counted {orders} new orders, rescored {products} products.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from products.home import HOME_SECTIONS, refresh_section
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the cached home page sections (featured, bestsellers, category heroes, hero image)'
+
+    def handle(self, *args, **options):
+        for name in HOME_SECTIONS:
+            refresh_section(name)
+            self.stdout.write(f'{name}: refreshed')
+        self.stdout.write(self.style.SUCCESS('Home sections warmed.'))
@@ -25,7 +25,21 @@ RAZORPAY_KEY_ID = env("RAZORPAY_KEY_ID")
 RAZORPAY_KEY_SECRET = env("RAZORPAY_KEY_SECRET")
 RAZORPAY_CALLBACK_URL = env("RAZORPAY_CALLBACK_URL")
 RAZORPAY_WALLET_CALLBACK_URL = env("RAZORPAY_WALLET_CALLBACK_URL", default="")
+# Secret set on the Razorpay dashboard for the /payment/webhook/ endpoint
+RAZORPAY_WEBHOOK_SECRET = env("RAZORPAY_WEBHOOK_SECRET", default="")
 RAZORPAY_CURRENCY = "INR"
+# Point at `manage.py fake_razorpay` (e.g. http://127.0.0.1:8765) to load-test checkout offline
+RAZORPAY_BASE_URL = env("RAZORPAY_BASE_URL", default="https://api.razorpay.com")
+# Seconds; a hung gateway call must not hold a worker
+RAZORPAY_CONNECT_TIMEOUT = env.float("RAZORPAY_CONNECT_TIMEOUT", default=3.05)
+RAZORPAY_READ_TIMEOUT = env.float("RAZORPAY_READ_TIMEOUT", default=10)
+RAZORPAY_POOL_SIZE = env.int("RAZORPAY_POOL_SIZE", default=10)
+# Retries for calls that are safe to repeat, backing off from RAZORPAY_RETRY_DELAY seconds with jitter
+RAZORPAY_MAX_RETRIES = env.int("RAZORPAY_MAX_RETRIES", default=2)
+RAZORPAY_RETRY_DELAY = env.float("RAZORPAY_RETRY_DELAY", default=0.2)
+# Consecutive gateway failures that open the circuit, and seconds it stays open
+RAZORPAY_BREAKER_THRESHOLD = env.int("RAZORPAY_BREAKER_THRESHOLD", default=5)
+RAZORPAY_BREAKER_RESET = env.float("RAZORPAY_BREAKER_RESET", default=30)
 
 """
     SECURITY
@@ -59,6 +73,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.sites",
+    "django.contrib.postgres",
 
     # Third-party apps
     "dynamic_breadcrumbs",
@@ -121,6 +136,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    "products.middleware.StorefrontPageCacheMiddleware",
 ]
 
 """
@@ -163,6 +179,49 @@ DATABASES = {
     )
 }
 
+"""
+    CACHE
+    Redis when REDIS_URL is set, process-local memory otherwise (tests, local dev)
+"""
+REDIS_URL = env("REDIS_URL", default="")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "SOCKET_CONNECT_TIMEOUT": 2,
+                "SOCKET_TIMEOUT": 2,
+                "IGNORE_EXCEPTIONS": True,
+            },
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "secondstrap",
+        }
+    }
+
+# Anonymous storefront pages: fresh for PAGE_CACHE_TIMEOUT, then served stale while one request rebuilds
+PAGE_CACHE_TIMEOUT = env.int("PAGE_CACHE_TIMEOUT", default=60)
+PAGE_CACHE_STALE_TIMEOUT = env.int("PAGE_CACHE_STALE_TIMEOUT", default=300)
+
+# Seconds between in-process sweeps of expired draft orders; unset leaves it to the sweep_expired_drafts command
+DRAFT_SWEEPER_INTERVAL = env.int("DRAFT_SWEEPER_INTERVAL", default=0) or None
+
+# Seconds between in-process runs of the payment event worker; unset leaves it to process_payment_events
+PAYMENT_EVENT_WORKER_INTERVAL = env.int("PAYMENT_EVENT_WORKER_INTERVAL", default=0) or None
+
+# Seconds between in-process runs of the email outbox worker; unset leaves it to send_outbox_emails
+EMAIL_OUTBOX_WORKER_INTERVAL = env.int("EMAIL_OUTBOX_WORKER_INTERVAL", default=0) or None
+
+# Memory-mapped content similarity index, rebuilt by build_similarity_index (one file per host)
+SIMILARITY_INDEX_PATH = env("SIMILARITY_INDEX_PATH", default=str(BASE_DIR / "var" / "similar_products.npy"))
+
 """
     SOCIAL ACCOUNT PROVIDERS
 """
@@ -218,6 +277,8 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = env("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+# Seconds; a stalled SMTP server must not hang the outbox worker
+EMAIL_TIMEOUT = env.int("EMAIL_TIMEOUT", default=30)
 
 
 # ============================ PROXY / COOKIE / SSL SETTINGS ============================
@@ -1,7 +1,15 @@
 from django.contrib import admin
-from .models import CustomUser,EmailOTP
+from .models import CustomUser,EmailOTP,OutboxEmail
 # Register your models here.
 class CustomUserModelAdmin(admin.ModelAdmin):
     list_display = ['email','first_name','last_name','phone','profile','is_active','is_staff','date_joined']
 admin.site.register(CustomUser,CustomUserModelAdmin)
-admin.site.register(EmailOTP)
\ No newline at end of file
+admin.site.register(EmailOTP)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'to', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['to', 'subject', 'key']
+    readonly_fields = ['created_at', 'sent_at']
@@ -72,4 +72,45 @@ class EmailOTP(models.Model):
         return str(random.randint(100000,999999))
     
     def __str__(self):
-        return f"{self.user}-{self.otp}"
\ No newline at end of file
+        return f"{self.user}-{self.otp}"
+
+class OutboxEmailStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'
+    SENT = 'sent', 'Sent'
+    FAILED = 'failed', 'Failed'
+
+
+class OutboxEmail(models.Model):
+    """
+    Transactional email waiting to be sent. Views write the row in the same
+    transaction as the change it reports on; send_outbox_emails delivers it.
+    """
+    # Optional dedupe key, e.g. order-success:<order id>; a second email with the same key is not queued
+    key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    # Rendered once when queued, so retries never render the template again
+    html = models.TextField(blank=True)
+
+    status = models.CharField(max_length=10, choices=OutboxEmailStatus.choices, default=OutboxEmailStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The worker's queue: only pending rows, due first
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(status='pending'),
+                name='outbox_email_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
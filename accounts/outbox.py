@@ -0,0 +1,154 @@
+"""
+Transactional email outbox.
+
+Order confirmations and OTP emails used to go out over Gmail SMTP inside
+the request: a TLS handshake, login and send per email, with the signup
+transaction held open meanwhile. Now views call queue_email, which renders
+the message once and writes an OutboxEmail row in the caller's transaction,
+so the email exists exactly when the change it reports on commits and the
+view returns without touching SMTP.
+
+send_pending_emails, run by the send_outbox_emails command or an in-process
+thread, claims due rows in batches and sends each batch over one reused
+SMTP connection. A failed send is retried with exponential backoff up to
+MAX_ATTEMPTS times.
+"""
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, connection, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import OutboxEmail, OutboxEmailStatus
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 6
+EMAIL_BATCH_SIZE = 50
+# Seconds before the first retry, doubled after every failure up to RETRY_MAX_DELAY
+RETRY_DELAY = 60
+RETRY_MAX_DELAY = 3600
+# A claimed row is due again after this long, in case its worker died mid-batch
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def queue_email(to, subject, body, template_name=None, context=None, key=None):
+    """
+    Queues one email to `to`, with an HTML part rendered from template_name
+    now. Call it inside the transaction of the change the email is about.
+    With a key, an email already queued under it wins. Returns the row, or
+    None for a duplicate.
+    """
+    if key and OutboxEmail.objects.filter(key=key).exists():
+        return None
+    html = render_to_string(template_name, context or {}) if template_name else ""
+    try:
+        with transaction.atomic():
+            return OutboxEmail.objects.create(key=key, to=to, subject=subject, body=body, html=html)
+    except IntegrityError:
+        return None
+
+
+def _message(email, smtp):
+    msg = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email.to],
+        connection=smtp,
+    )
+    if email.html:
+        msg.attach_alternative(email.html, "text/html")
+    return msg
+
+
+def _claim(batch_size):
+    """Takes up to batch_size due emails off the queue by pushing their next attempt past CLAIM_TIMEOUT."""
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmailStatus.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(next_attempt_at=now + CLAIM_TIMEOUT)
+    return emails
+
+
+def _record_failure(email, error):
+    email.attempts += 1
+    email.last_error = repr(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutboxEmailStatus.FAILED
+        logger.error("Email %s to %s failed after %s attempts: %r", email.pk, email.to, email.attempts, error)
+    else:
+        # Jittered, so a batch that failed together is not retried in lockstep
+        delay = min(RETRY_DELAY * 2 ** (email.attempts - 1), RETRY_MAX_DELAY)
+        email.next_attempt_at = timezone.now() + timedelta(seconds=random.uniform(delay / 2, delay))
+        logger.warning("Email %s to %s will be retried: %r", email.pk, email.to, error)
+    email.save(update_fields=["status", "attempts", "last_error", "next_attempt_at"])
+
+
+def send_pending_emails(batch_size=EMAIL_BATCH_SIZE):
+    """
+    Sends up to batch_size due emails over one SMTP connection. Rows are
+    claimed with SKIP LOCKED, so several workers can share the queue.
+    Returns (sent, failed) counts for this run.
+    """
+    emails = _claim(batch_size)
+    if not emails:
+        return 0, 0
+    sent = failed = 0
+    smtp = get_connection(fail_silently=False)
+    try:
+        for email in emails:
+            try:
+                # Opens the connection for the first email, or again after a failure closed it
+                smtp.open()
+                _message(email, smtp).send()
+            except Exception as e:
+                smtp.close()
+                _record_failure(email, e)
+                failed += 1
+            else:
+                OutboxEmail.objects.filter(pk=email.pk).update(
+                    status=OutboxEmailStatus.SENT, attempts=email.attempts + 1, last_error="", sent_at=timezone.now()
+                )
+                sent += 1
+    finally:
+        smtp.close()
+    return sent, failed
+
+
+def start_email_worker(interval):
+    """Runs send_pending_emails every interval seconds in a daemon thread of this process."""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                while True:
+                    sent, failed = send_pending_emails()
+                    if sent or failed:
+                        logger.info("Outbox emails sent: %s, failed: %s", sent, failed)
+                    if sent + failed < EMAIL_BATCH_SIZE:
+                        break
+            except Exception:
+                logger.exception("Sending outbox emails failed")
+            finally:
+                connection.close()
+
+    thread = threading.Thread(target=run, name="email-outbox", daemon=True)
+    thread.start()
+    return thread
+
+
+def maybe_start_email_worker():
+    interval = getattr(settings, "EMAIL_OUTBOX_WORKER_INTERVAL", None)
+    if interval:
+        start_email_worker(interval)
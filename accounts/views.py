@@ -2,10 +2,9 @@ import logging
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
-from django.template.loader import render_to_string
-from django.core.mail import EmailMultiAlternatives
 from django.views import View
 from .models import CustomUser, EmailOTP
+from .outbox import queue_email
 from .forms import CustomUserRegisterForm, LoginForm, VerifyOTPForm, SetNewPassword, ForgotPasswordEmailForm
 from django.conf import settings
 from django.utils.decorators import method_decorator
@@ -68,15 +67,14 @@ def signup_view(request):
                     print(otp_code)
                     EmailOTP.objects.create(user=user, otp=otp_code)
 
-                    plain_message = f"Your OTP code is {otp_code}"
-                    html_message = render_to_string('accounts/email/otp_email.html', {'otp_code': otp_code,'first_name':user.first_name})
-                    msg = EmailMultiAlternatives(
-                        body=plain_message,
-                        subject='Your OTP Verification Code',
-                        to=[email],
+                    # Queued with the new user, sent by the outbox worker
+                    queue_email(
+                        email,
+                        'Your OTP Verification Code',
+                        f"Your OTP code is {otp_code}",
+                        'accounts/email/otp_email.html',
+                        {'otp_code': otp_code,'first_name':user.first_name},
                     )
-                    msg.attach_alternative(html_message, "text/html")
-                    msg.send()
 
             except Exception as e:
                 logger.error(f"Error during signup for {email}: {e}")
@@ -175,19 +173,17 @@ def resent_otp(request):
 
     otp_code = EmailOTP.generate_otp()
     print(otp_code)
-    EmailOTP.objects.create(user=user, otp=otp_code)
-
-    plain_message = f"Your OTP code is {otp_code}"
-    html_message = render_to_string('accounts/email/otp_email.html', {'otp_code': otp_code})
 
     try:
-        msg = EmailMultiAlternatives(
-            body=plain_message,
-            subject='Your OTP Verification Code',
-            to=[email],
-        )
-        msg.attach_alternative(html_message, "text/html")
-        msg.send()
+        with transaction.atomic():
+            EmailOTP.objects.create(user=user, otp=otp_code)
+            queue_email(
+                email,
+                'Your OTP Verification Code',
+                f"Your OTP code is {otp_code}",
+                'accounts/email/otp_email.html',
+                {'otp_code': otp_code},
+            )
     except Exception as e:
         logger.error(f"Error resending OTP for {email}: {e}")
         messages.error(request, 'There was an error sending the email. Please try again later.')
@@ -282,19 +278,17 @@ class SendOTPView(LoggedInRedirectMixin, View):
                 return render(request, 'accounts/forgot-password.html', {'form': form})
 
             otp = EmailOTP.generate_otp()
-            EmailOTP.objects.create(user=user, otp=otp)
-
-            plain_message = f'Your OTP code for password reset is: {otp}'
-            html_message = render_to_string('accounts/email/otp_email_reset.html', {'otp_code': otp,'first_name':user.first_name})
 
             try:
-                msg = EmailMultiAlternatives(
-                    body=plain_message,
-                    subject='Your OTP Verification Code',
-                    to=[email],
-                )
-                msg.attach_alternative(html_message, "text/html")
-                msg.send()
+                with transaction.atomic():
+                    EmailOTP.objects.create(user=user, otp=otp)
+                    queue_email(
+                        email,
+                        'Your OTP Verification Code',
+                        f'Your OTP code for password reset is: {otp}',
+                        'accounts/email/otp_email_reset.html',
+                        {'otp_code': otp,'first_name':user.first_name},
+                    )
             except Exception as e:
                 logger.error(f"Error sending password reset OTP for {email}: {e}")
                 messages.error(request, 'There was an error sending the email. Please try again later.')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class OfferCouponsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'offer'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offer', '0009_rename_description_offer_title'),
+        ('products', '0018_alter_category_name_alter_product_alt_text_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferIndexState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valid_until', models.DateTimeField(blank=True, null=True)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductOfferIndex',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='offer_index', serialize=False, to='products.product')),
+                ('product_discount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('category_discount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('best_discount', models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=10)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
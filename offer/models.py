@@ -54,4 +54,28 @@ class OfferUsage(models.Model):
     def __str__(self):
         return f"{self.offer.title} - {self.user}"
 
-    
\ No newline at end of file
+class ProductOfferIndex(models.Model):
+    """
+    Best active product / category discount per product.
+    Maintained by offer.services so catalog and cart queries join one row
+    instead of running correlated Offer subqueries.
+    """
+    product = models.OneToOneField('products.Product',on_delete=models.CASCADE,primary_key=True,related_name='offer_index')
+    product_discount = models.DecimalField(max_digits=10,decimal_places=2,default=0)
+    category_discount = models.DecimalField(max_digits=10,decimal_places=2,default=0)
+    best_discount = models.DecimalField(max_digits=10,decimal_places=2,default=0,db_index=True)
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.product_id} - {self.best_discount}%"
+
+class OfferIndexState(models.Model):
+    """
+    Single row holding when the offer index was built and the next
+    start_date / end_date boundary at which it goes stale.
+    """
+    valid_until = models.DateTimeField(null=True,blank=True)
+    rebuilt_at = models.DateTimeField(null=True,blank=True)
+
+    def __str__(self):
+        return f"Offer index valid until {self.valid_until}"
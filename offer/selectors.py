@@ -1,57 +1,43 @@
-from .models import Offer,OfferType
-from django.db.models import OuterRef, Q
+from .models import OfferIndexState
+from .services import rebuild_offer_index
+from django.db.models import F, Value, DecimalField
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-def get_active_offer_subqueries(product_ref="id", category_ref="category_id"):
-    now = timezone.now()
-
-    product_offer_subquery = Offer.objects.filter(
-        products__id=OuterRef(product_ref),   # ✅ important change
-        offer_type=OfferType.PRODUCT,
-        active=True,
-        start_date__lte=now,
-        end_date__gte=now
-    ).order_by('-discount_percentage').values('discount_percentage')[:1]
-
-    category_offer_subquery = Offer.objects.filter(
-        categories__id=OuterRef(category_ref),  # ✅ important change
-        offer_type=OfferType.CATEGORY,
-        active=True,
-        start_date__lte=now,
-        end_date__gte=now
-    ).order_by('-discount_percentage').values('discount_percentage')[:1]
-
-    return product_offer_subquery, category_offer_subquery
-
-
-def get_active_offer_subqueries_cart(
-    product_ref='variant__product_id',
-    category_ref='variant__product__category_id'
-):
-    now = timezone.now()
-
-    product_offer_subquery = (
-        Offer.objects.filter(
-            products__id=OuterRef(product_ref),
-            offer_type=OfferType.PRODUCT,
-            active=True,
-            start_date__lte=now,
-        )
-        .filter(Q(end_date__gte=now) | Q(end_date__isnull=True))
-        .order_by('-discount_percentage')
-        .values('discount_percentage')[:1]
+def ensure_offer_index_fresh():
+    """
+    Rebuilds the offer index when an offer started or ended since the last build.
+    Offer edits rebuild it through offer.signals, this only covers time boundaries.
+    """
+    state = OfferIndexState.objects.filter(pk=1).values('valid_until', 'rebuilt_at').first()
+    if state is None or state['rebuilt_at'] is None:
+        rebuild_offer_index()
+    elif state['valid_until'] and state['valid_until'] <= timezone.now():
+        rebuild_offer_index()
+
+
+def offer_index_valid_until():
+    """When the current offer index goes stale (next offer start / end), or None."""
+    return OfferIndexState.objects.filter(pk=1).values_list('valid_until', flat=True).first()
+
+
+def get_active_offer_discounts(product_path=""):
+    """
+    Returns (product_discount, category_discount) expressions joined from
+    ProductOfferIndex. product_path is the lookup from the queried model to
+    Product, e.g. "" for Product, "product" for ProductVariant and
+    "variant__product" for CartItems.
+    """
+    ensure_offer_index_fresh()
+    prefix = f"{product_path}__" if product_path else ""
+
+    product_offer_discount = Coalesce(
+        F(f"{prefix}offer_index__product_discount"),
+        Value(0, output_field=DecimalField())
     )
-
-    category_offer_subquery = (
-        Offer.objects.filter(
-            categories__id=OuterRef(category_ref),
-            offer_type=OfferType.CATEGORY,
-            active=True,
-            start_date__lte=now,
-        )
-        .filter(Q(end_date__gte=now) | Q(end_date__isnull=True))
-        .order_by('-discount_percentage')
-        .values('discount_percentage')[:1]
+    category_offer_discount = Coalesce(
+        F(f"{prefix}offer_index__category_discount"),
+        Value(0, output_field=DecimalField())
     )
 
-    return product_offer_subquery, category_offer_subquery
\ No newline at end of file
+    return product_offer_discount, category_offer_discount
@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from products.models import Product
+from products.cache import ALL_OFFERS, invalidate_tags
+from products.services import refresh_price_summaries
+from .models import Offer, OfferType, ProductOfferIndex, OfferIndexState
+
+
+def active_offers(now=None):
+    now = now or timezone.now()
+    return Offer.objects.filter(
+        active=True,
+        start_date__lte=now,
+    ).filter(Q(end_date__gte=now) | Q(end_date__isnull=True))
+
+
+def get_next_offer_boundary(now=None):
+    """
+    Earliest future start_date / end_date of an active offer.
+    After this moment the index no longer matches the live offers.
+    """
+    now = now or timezone.now()
+    boundaries = Offer.objects.filter(active=True).aggregate(
+        next_start=Min('start_date', filter=Q(start_date__gt=now)),
+        next_end=Min('end_date', filter=Q(end_date__gte=now)),
+    )
+    candidates = [value for value in boundaries.values() if value is not None]
+    return min(candidates) if candidates else None
+
+
+def rebuild_offer_index(product_ids=None):
+    """
+    Recomputes ProductOfferIndex rows.
+    With product_ids only those products are refreshed, otherwise the whole index.
+    """
+    now = timezone.now()
+    offers = active_offers(now)
+
+    product_discounts = dict(
+        offers.filter(offer_type=OfferType.PRODUCT, products__isnull=False)
+        .values_list('products')
+        .annotate(discount=Max('discount_percentage'))
+        .order_by()
+    )
+    category_discounts = dict(
+        offers.filter(offer_type=OfferType.CATEGORY, categories__isnull=False)
+        .values_list('categories')
+        .annotate(discount=Max('discount_percentage'))
+        .order_by()
+    )
+
+    products = Product.objects.filter(
+        Q(id__in=product_discounts.keys()) | Q(category_id__in=category_discounts.keys())
+    )
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+
+    rows = []
+    for product_id, category_id in products.values_list('id', 'category_id').order_by():
+        product_discount = product_discounts.get(product_id, 0)
+        category_discount = category_discounts.get(category_id, 0)
+        rows.append(
+            ProductOfferIndex(
+                product_id=product_id,
+                product_discount=product_discount,
+                category_discount=category_discount,
+                best_discount=max(product_discount, category_discount),
+                refreshed_at=now,
+            )
+        )
+
+    previous = ProductOfferIndex.objects.all()
+    if product_ids is not None:
+        previous = previous.filter(product_id__in=product_ids)
+    previous = dict(previous.values_list('product_id', 'best_discount'))
+    current = {row.product_id: row.best_discount for row in rows}
+    changed_ids = [
+        product_id for product_id in previous.keys() | current.keys()
+        if previous.get(product_id, 0) != current.get(product_id, 0)
+    ]
+    first_build = product_ids is None and not OfferIndexState.objects.filter(pk=1).exists()
+
+    with transaction.atomic():
+        ProductOfferIndex.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['product_discount', 'category_discount', 'best_discount', 'refreshed_at'],
+        )
+
+        # Anything not touched by this build no longer has an active offer
+        stale = ProductOfferIndex.objects.filter(refreshed_at__lt=now)
+        if product_ids is not None:
+            stale = stale.filter(product_id__in=product_ids)
+        stale.delete()
+
+        if product_ids is None:
+            OfferIndexState.objects.update_or_create(
+                pk=1,
+                defaults={'valid_until': get_next_offer_boundary(now), 'rebuilt_at': now},
+            )
+            transaction.on_commit(lambda: invalidate_tags(ALL_OFFERS))
+
+        # Price summaries carry the best discount, refresh the products whose discount moved
+        if first_build:
+            refresh_price_summaries()
+        elif changed_ids:
+            refresh_price_summaries(product_ids=changed_ids)
+
+    return len(rows)
+
+
+def schedule_offer_index_rebuild(product_ids=None):
+    """Rebuild once the surrounding transaction commits (offer M2M is set after save)."""
+    transaction.on_commit(lambda: rebuild_offer_index(product_ids=product_ids))
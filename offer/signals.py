@@ -0,0 +1,26 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from products.models import Product
+from .models import Offer
+from .services import schedule_offer_index_rebuild
+
+
+@receiver(post_save, sender=Offer)
+@receiver(post_delete, sender=Offer)
+def rebuild_index_on_offer_change(sender, instance, **kwargs):
+    schedule_offer_index_rebuild()
+
+
+@receiver(m2m_changed, sender=Offer.products.through)
+@receiver(m2m_changed, sender=Offer.categories.through)
+def rebuild_index_on_offer_targets_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        schedule_offer_index_rebuild()
+
+
+@receiver(post_save, sender=Product)
+def refresh_index_for_product(sender, instance, created, update_fields=None, **kwargs):
+    # Category discount follows the product's category
+    if created or update_fields is None or "category" in update_fields:
+        schedule_offer_index_rebuild(product_ids=[instance.pk])
@@ -3,6 +3,7 @@ from django.shortcuts import render,redirect,get_object_or_404
 from .models import Offer,DiscountType,OfferUsage
 from django.http import JsonResponse
 from products.models import Product,Category
+from products.search import search_products as run_product_search
 from .forms import OfferForm
 from django.contrib import messages
 from django.views.generic import DetailView
@@ -67,7 +68,7 @@ def manage_offer_view(request,pk=None):
 def search_products(request):
     products_search_value = request.GET.get('search','')
 
-    products = Product.objects.filter(name__icontains=products_search_value)[:10]
+    products = run_product_search(Product.objects.all(), products_search_value).order_by('-search_rank', 'pk')[:10]
     
     return JsonResponse([{"id":product.id ,"name":product.name,"image":product.image.url} for product in products],safe=False)
 
@@ -1,96 +1,19 @@
 from django.shortcuts import render,redirect
 from django.views.generic import TemplateView,View
-from django.db.models import Min
 from django.http import JsonResponse
-from django.utils import timezone
 from django.contrib import messages
-from django.db.models import Sum,F
 
-from products.models import Product,Category
+from products.cache import ALL_OFFERS, cached
+from products.home import get_home_sections
 from offer.models import Offer
-from .contact_models import ContactModel,Thumbanails
-from userFolder.order.models import OrderItem
+from .contact_models import ContactModel
 
 class HomePageView(TemplateView):
     template_name = "products/home.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-
-        products = (
-            Product.objects.select_related("category")
-            .prefetch_related("variants")
-            .filter(is_active=True, variants__stock__gte=1)
-            .annotate(offer_price=Min("variants__offer_price"))
-            .order_by("?")[:4]
-        )
-        featured_products = (
-            Product.objects.filter(is_featured=True, is_active=True)
-            .prefetch_related("variants")
-            .filter(is_active=True, variants__stock__gte=1)
-            .annotate(offer_price=Min("variants__offer_price"))
-            .order_by("?")[:4]
-        )
-        # most_demanded = (
-        #     Product.objects.filter(is_active=True)
-        #     .prefetch_related("variants")
-        #     .filter(is_active=True, variants__stock__gte=1)
-        #     .annotate(offer_price=Min("variants__offer_price"))
-        #     .order_by("?")[:4]
-        # )
-        most_demanded = (
-            OrderItem.objects.filter(order__order_status='delivered')
-            .values(
-                'variant__product__slug' # Keep this for the URL
-            )
-            .annotate(
-                name=F('variant__product__name'),
-                category=F('variant__product__category__name'),
-                offer_price=F('variant__offer_price'),
-                image=F('variant__product__image'),
-                total_sold=Sum('quantity'),
-                category_id = F('variant__product__category__id'),
-                variant_id = F('variant__id')
-            )
-            .order_by('-total_sold')[:4]
-        )
-        today = timezone.now().date()
-        new_arrivals = (
-            Product.objects.filter(created_at__date=today, is_active=True)
-            .prefetch_related("variants")
-            .filter(is_active=True, variants__stock__gte=1)
-            .annotate(offer_price=Min("variants__offer_price"))
-            .order_by("?")[:4]
-        )
-
-        categories = Category.objects.filter(is_active=True).prefetch_related(
-            "products"
-        )[:5]
-        categories_for_template = []
-        for category in categories:
-            product = category.products.filter(
-                is_active=True, image__isnull=False
-            ).first()
-            if product:
-                categories_for_template.append(
-                    {
-                        "id": category.id,
-                        "name": category.name,
-                        "image": product.image,
-                        "alt_text": product.name,
-                    }
-                )
-
-        
-        images = Thumbanails.objects.filter(is_visible=True).order_by('?')[:1]
-        
-        context["products"] = products
-        context["featured_products"] = featured_products
-        context["most_demanded"] = most_demanded
-        context["new_arrivals"] = new_arrivals
-        context["categories_for_template"] = categories_for_template
-        context["images"] = images
-
+        context.update(get_home_sections())
         return context
 
 
@@ -127,5 +50,9 @@ def get_offers(request):
     '''
         This view is used to get the offers for the offer track
     '''
-    offers_from_db = list(Offer.objects.filter(active=True,display_home=True).values_list('title',flat=True))
+    offers_from_db = cached(
+        'home:offers',
+        [ALL_OFFERS],
+        lambda: list(Offer.objects.filter(active=True,display_home=True).values_list('title',flat=True)),
+    )
     return JsonResponse({'offers': offers_from_db})
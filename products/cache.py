@@ -0,0 +1,124 @@
+"""
+Tagged cache for catalog data.
+
+Every cached value is stored together with the versions of its tags
+(e.g. product:12, category:3, offer:*). Invalidating a tag bumps its version,
+so every entry registered under it misses on the next read without having
+to know or delete the individual keys.
+"""
+import time
+
+from django.core.cache import cache
+
+DEFAULT_TIMEOUT = 300
+TAG_PREFIX = "tag:version:"
+STATS_PREFIX = "tagcache:stats:"
+
+# product:* / category:* are bumped when every row of the kind changed (bulk
+# rebuilds); per-row entries register under both the row tag and the wildcard.
+# Listings (pages, facets, counts) register under PRODUCT_LISTS, which any
+# product or category change bumps.
+ALL_PRODUCTS = "product:*"
+ALL_CATEGORIES = "category:*"
+ALL_OFFERS = "offer:*"
+PRODUCT_LISTS = "product:list"
+
+
+def product_tag(product_id):
+    return f"product:{product_id}"
+
+
+def category_tag(category_id):
+    return f"category:{category_id}"
+
+
+def _bump_stat(name, amount=1):
+    key = f"{STATS_PREFIX}{name}"
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, amount)
+
+
+def _tag_versions(tags, create=False):
+    keys = {f"{TAG_PREFIX}{tag}": tag for tag in tags}
+    found = cache.get_many(keys.keys())
+    versions = {keys[key]: value for key, value in found.items()}
+    if create:
+        for key, tag in keys.items():
+            if tag not in versions:
+                # Nanosecond start value: an evicted tag never reuses an old version
+                version = time.time_ns()
+                cache.add(key, version, timeout=None)
+                versions[tag] = cache.get(key, version)
+    return versions
+
+
+def get_tagged_entry(key):
+    """
+    Returns (value, current) or None when the key is absent. current is False
+    once one of the tags was invalidated; callers serving stale-while-revalidate
+    may still use the value.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    tags = entry["tags"]
+    return entry["value"], not tags or _tag_versions(tags.keys()) == tags
+
+
+def get_tagged(key):
+    """Returns (hit, value)."""
+    entry = get_tagged_entry(key)
+    if entry is not None and entry[1]:
+        _bump_stat("hits")
+        return True, entry[0]
+    _bump_stat("misses")
+    return False, None
+
+
+def set_tagged(key, value, tags, timeout=DEFAULT_TIMEOUT):
+    cache.set(key, {"tags": _tag_versions(set(tags), create=True), "value": value}, timeout)
+
+
+def cached(key, tags, producer, timeout=DEFAULT_TIMEOUT):
+    """get_or_set that registers the value under tags."""
+    hit, value = get_tagged(key)
+    if hit:
+        return value
+    value = producer()
+    set_tagged(key, value, tags, timeout)
+    return value
+
+
+def invalidate_tags(*tags):
+    for tag in set(tags):
+        key = f"{TAG_PREFIX}{tag}"
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Unknown or evicted tag: nothing can be holding its current version
+            cache.set(key, time.time_ns(), timeout=None)
+    _bump_stat("invalidations", len(set(tags)))
+
+
+def invalidate_products(product_ids=None):
+    """Invalidates the given products (or every product) and the listings they appear in."""
+    if product_ids is None:
+        invalidate_tags(ALL_PRODUCTS, PRODUCT_LISTS)
+    else:
+        invalidate_tags(PRODUCT_LISTS, *(product_tag(product_id) for product_id in product_ids))
+
+
+def invalidate_categories(category_ids=None):
+    if category_ids is None:
+        invalidate_tags(ALL_CATEGORIES, PRODUCT_LISTS)
+    else:
+        invalidate_tags(PRODUCT_LISTS, *(category_tag(category_id) for category_id in category_ids))
+
+
+def cache_stats():
+    names = ("hits", "misses", "invalidations")
+    found = cache.get_many([f"{STATS_PREFIX}{name}" for name in names])
+    return {name: found.get(f"{STATS_PREFIX}{name}", 0) for name in names}
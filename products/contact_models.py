@@ -1,6 +1,7 @@
 from django.db import models
 import os
 import uuid
+from .models import generate_random_key
 
 class ContactModel(models.Model):
     name = models.CharField(max_length=150, blank=True, null=True)
@@ -21,4 +22,5 @@ class Thumbanails(models.Model):
     image = models.ImageField(upload_to=get_file_path,blank=True, null=True)
     name = models.CharField(null=True,max_length=250)
     is_visible = models.BooleanField(default=True)
+    random_key = models.FloatField(default=generate_random_key, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
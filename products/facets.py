@@ -0,0 +1,108 @@
+import hashlib
+
+from django.db.models import Count, F, IntegerField, Max, Min, Q, Value
+from django.db.models.functions import Cast, Floor
+
+from .cache import PRODUCT_LISTS, cached
+from .models import Category, Product
+from .search import search_products
+
+PRICE_BUCKET_SIZE = 500
+FACET_CACHE_TIMEOUT = 300
+
+
+def _facet_cache_key(search):
+    signature = hashlib.md5((search or "").strip().lower().encode()).hexdigest()
+    return f"products:facets:{signature}"
+
+
+def _compute_facets(search):
+    products = Product.objects.filter(is_active=True)
+    if search:
+        products = search_products(products, search)
+
+    # One grouped pass over the price summary: (category, price bucket) cells
+    cells = list(
+        products.annotate(
+            price_bucket=Cast(
+                Floor(F("price_summary__min_discounted_price") / Value(PRICE_BUCKET_SIZE)),
+                IntegerField(),
+            )
+        )
+        .values("category_id", "price_bucket")
+        .annotate(
+            product_count=Count("id"),
+            in_stock_count=Count("id", filter=Q(price_summary__in_stock=True)),
+            min_price=Min("price_summary__min_discounted_price"),
+            max_price=Max("price_summary__min_discounted_price"),
+        )
+        .order_by()
+    )
+
+    return {
+        "categories": list(Category.objects.filter(is_active=True).order_by("name").values("id", "name")),
+        "cells": cells,
+    }
+
+
+def get_listing_facets(search=None, category_id=None):
+    """
+    Sidebar facets for the storefront listing: per-category product and
+    in-stock counts, a price-bucket histogram and the slider bounds.
+    Category counts follow the search only; the histogram and bounds also
+    follow the selected category. The grouped cells are cached per search
+    text, so changing the category or price filter does not hit the database.
+    """
+    data = cached(
+        _facet_cache_key(search),
+        [PRODUCT_LISTS],
+        lambda: _compute_facets(search),
+        FACET_CACHE_TIMEOUT,
+    )
+
+    if category_id and category_id != "all":
+        category_id = str(category_id)
+        cells = [cell for cell in data["cells"] if str(cell["category_id"]) == category_id]
+    else:
+        cells = data["cells"]
+
+    category_counts = {}
+    for cell in data["cells"]:
+        counts = category_counts.setdefault(cell["category_id"], [0, 0])
+        counts[0] += cell["product_count"]
+        counts[1] += cell["in_stock_count"]
+
+    categories = [
+        {
+            **category,
+            "product_count": category_counts.get(category["id"], [0, 0])[0],
+            "in_stock_count": category_counts.get(category["id"], [0, 0])[1],
+        }
+        for category in data["categories"]
+    ]
+
+    buckets = {}
+    for cell in cells:
+        if cell["price_bucket"] is None:
+            continue
+        buckets[cell["price_bucket"]] = buckets.get(cell["price_bucket"], 0) + cell["product_count"]
+    price_buckets = [
+        {
+            "min": bucket * PRICE_BUCKET_SIZE,
+            "max": (bucket + 1) * PRICE_BUCKET_SIZE,
+            "count": count,
+        }
+        for bucket, count in sorted(buckets.items())
+    ]
+
+    prices_min = [cell["min_price"] for cell in cells if cell["min_price"] is not None]
+    prices_max = [cell["max_price"] for cell in cells if cell["max_price"] is not None]
+
+    return {
+        "categories": categories,
+        "price_buckets": price_buckets,
+        "min_amount": min(prices_min) if prices_min else None,
+        "max_amount": max(prices_max) if prices_max else None,
+        "product_count": sum(cell["product_count"] for cell in cells),
+        "in_stock_count": sum(cell["in_stock_count"] for cell in cells),
+    }
@@ -0,0 +1,137 @@
+"""
+Home page sections, built once and served from the cache.
+
+Each section has its own TTL. After the TTL (or a tag invalidation) the old
+value keeps being served while one request refreshes it in a background
+thread; warm_home_sections rebuilds everything from cron or after a deploy.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+
+from userFolder.order.leaderboard import top_products
+from .cache import ALL_CATEGORIES, PRODUCT_LISTS, get_tagged_entry, set_tagged
+from .contact_models import Thumbanails
+from .models import Category, Product, ProductVariant
+from .selectors import sample_random, with_price_summary
+
+# Stale values stay usable this many times the TTL, long enough to cover a refresh
+STALE_FACTOR = 10
+REFRESH_LOCK_TIMEOUT = 60
+
+
+def build_featured_products():
+    return sample_random(
+        with_price_summary(Product.objects.filter(is_featured=True, is_active=True))
+        .filter(price_summary__in_stock=True),
+        4,
+    )
+
+
+def build_most_demanded():
+    """All-time bestsellers from the sales leaderboard, with the cheapest variant for the wishlist button."""
+    cheapest = ProductVariant.objects.filter(product=OuterRef("product_id")).order_by("offer_price", "id")
+    ranks = top_products("all", 4).annotate(
+        variant_id=Subquery(cheapest.values("id")[:1]),
+        variant_offer_price=Subquery(cheapest.values("offer_price")[:1]),
+    )
+    return [
+        {
+            "variant__product__slug": rank.product.slug,
+            "name": rank.product.name,
+            "category": rank.product.category.name,
+            "offer_price": rank.variant_offer_price,
+            "image": rank.product.image.name if rank.product.image else None,
+            "total_sold": rank.quantity,
+            "category_id": rank.product.category_id,
+            "variant_id": rank.variant_id,
+        }
+        for rank in ranks
+    ]
+
+
+def build_category_heroes():
+    """First active product image per category, in one query instead of one per category."""
+    hero = Product.objects.filter(
+        category=OuterRef("pk"), is_active=True, image__isnull=False
+    ).exclude(image="").order_by("-created_at")
+    categories = (
+        Category.objects.filter(is_active=True)
+        .annotate(
+            hero_image=Subquery(hero.values("image")[:1]),
+            hero_name=Subquery(hero.values("name")[:1]),
+        )
+        .values("id", "name", "hero_image", "hero_name")[:5]
+    )
+    storage = Product._meta.get_field("image").storage
+    return [
+        {
+            "id": category["id"],
+            "name": category["name"],
+            "image_url": storage.url(category["hero_image"]),
+            "alt_text": category["hero_name"],
+        }
+        for category in categories
+        if category["hero_image"]
+    ]
+
+
+def build_hero_images():
+    return sample_random(Thumbanails.objects.filter(is_visible=True), 1)
+
+
+# name: (builder, ttl seconds, invalidation tags)
+HOME_SECTIONS = {
+    "featured_products": (build_featured_products, 300, [PRODUCT_LISTS]),
+    "most_demanded": (build_most_demanded, 60 * 60, []),
+    "categories_for_template": (build_category_heroes, 60 * 60, [ALL_CATEGORIES, PRODUCT_LISTS]),
+    "images": (build_hero_images, 60, []),
+}
+
+
+def _section_key(name):
+    return f"home:section:{name}"
+
+
+def refresh_section(name):
+    builder, ttl, tags = HOME_SECTIONS[name]
+    value = builder()
+    set_tagged(
+        _section_key(name),
+        {"value": value, "fresh_until": time.time() + ttl},
+        tags,
+        ttl * STALE_FACTOR,
+    )
+    return value
+
+
+def _refresh_in_background(name, lock_key):
+    def run():
+        try:
+            refresh_section(name)
+        finally:
+            cache.delete(lock_key)
+            # Threads get their own connection, don't leave it open
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_home_sections():
+    sections = {}
+    for name in HOME_SECTIONS:
+        entry = get_tagged_entry(_section_key(name))
+        if entry is None:
+            sections[name] = refresh_section(name)
+            continue
+
+        section, current = entry
+        if not current or section["fresh_until"] <= time.time():
+            lock_key = f"{_section_key(name)}:refresh"
+            if cache.add(lock_key, 1, REFRESH_LOCK_TIMEOUT):
+                _refresh_in_background(name, lock_key)
+        sections[name] = section["value"]
+    return sections
@@ -0,0 +1,140 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+
+from .cache import ALL_OFFERS, PRODUCT_LISTS, get_tagged_entry, set_tagged
+
+CACHED_URL_NAMES = {"Home_page_user", "products_page_user", "Product_card_view"}
+# The only parameters the storefront views read, anything else (utm_*, fbclid) shares the entry
+CACHED_QUERY_PARAMS = ("category", "sort", "price_range", "min_rating", "page", "cursor", "search")
+DEFAULT_PAGE_TAGS = (PRODUCT_LISTS, ALL_OFFERS)
+
+PAGE_CACHE_TIMEOUT = getattr(settings, "PAGE_CACHE_TIMEOUT", 60)
+PAGE_CACHE_STALE_TIMEOUT = getattr(settings, "PAGE_CACHE_STALE_TIMEOUT", 300)
+REBUILD_LOCK_TIMEOUT = 10
+COALESCE_WAIT = 2.0
+COALESCE_POLL_INTERVAL = 0.05
+
+
+def page_cache_key(request):
+    params = []
+    for name in CACHED_QUERY_PARAMS:
+        value = request.GET.get(name, "").strip()
+        if not value or (name == "category" and value == "all"):
+            continue
+        params.append(f"{name}={value}")
+    raw = f"{request.get_host()}{request.path}?{'&'.join(params)}"
+    return f"page:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+class StorefrontPageCacheMiddleware:
+    """
+    Serves anonymous GETs of the home, listing and product pages from the shared cache.
+
+    Entries are fresh for PAGE_CACHE_TIMEOUT seconds, then served stale for up
+    to PAGE_CACHE_STALE_TIMEOUT while a single request (holding a cache lock)
+    rebuilds them. Tag invalidation (products.cache) makes an entry stale
+    immediately. On a cold miss only the lock holder renders; concurrent
+    requests wait briefly for its result. Views can set
+    request.page_cache_tags to register the page under narrower tags.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.is_cacheable_request(request):
+            return self.get_response(request)
+
+        key = page_cache_key(request)
+        lock_key = f"{key}:rebuild"
+        entry = get_tagged_entry(key)
+
+        if entry is not None:
+            page, current = entry
+            if current and page["fresh_until"] > time.time():
+                return self.build_response(page, "HIT")
+            if not cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT):
+                return self.build_response(page, "STALE")
+            return self.rebuild(request, key, lock_key)
+
+        if not cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT):
+            page = self.wait_for_rebuild(key)
+            if page is not None:
+                return self.build_response(page, "COALESCED")
+            response = self.get_response(request)
+            response["X-Page-Cache"] = "BYPASS"
+            return response
+
+        return self.rebuild(request, key, lock_key)
+
+    def is_cacheable_request(self, request):
+        if request.method not in ("GET", "HEAD"):
+            return False
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            return False
+        if url_name not in CACHED_URL_NAMES:
+            return False
+        if request.user.is_authenticated or request.COOKIES.get("messages"):
+            return False
+        # Anonymous sessions holding anything (pending messages, flow state) render per user
+        return not list(request.session.keys())
+
+    def is_cacheable_response(self, request, response):
+        if response.status_code != 200 or response.streaming or response.cookies:
+            return False
+        cache_control = response.get("Cache-Control", "")
+        if "private" in cache_control or "no-store" in cache_control:
+            return False
+        # A rendered {% csrf_token %} is bound to this visitor's cookie
+        if request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+            return False
+        if request.session.modified or getattr(get_messages(request), "added_new", False):
+            return False
+        return True
+
+    def rebuild(self, request, key, lock_key):
+        try:
+            response = self.get_response(request)
+            if hasattr(response, "render") and callable(response.render):
+                response.render()
+            if not self.is_cacheable_response(request, response):
+                response["X-Page-Cache"] = "BYPASS"
+                return response
+
+            page = {
+                "content": response.content,
+                "status": response.status_code,
+                "content_type": response["Content-Type"],
+                "fresh_until": time.time() + PAGE_CACHE_TIMEOUT,
+            }
+            tags = getattr(request, "page_cache_tags", DEFAULT_PAGE_TAGS)
+            set_tagged(key, page, tags, PAGE_CACHE_TIMEOUT + PAGE_CACHE_STALE_TIMEOUT)
+            response["X-Page-Cache"] = "MISS"
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    def wait_for_rebuild(self, key):
+        deadline = time.monotonic() + COALESCE_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(COALESCE_POLL_INTERVAL)
+            entry = get_tagged_entry(key)
+            if entry is not None:
+                return entry[0]
+        return None
+
+    def build_response(self, page, state):
+        response = HttpResponse(page["content"], status=page["status"], content_type=page["content_type"])
+        response["X-Page-Cache"] = state
+        # Same page must never be reused by an HTTP cache for a logged-in visitor
+        patch_vary_headers(response, ("Cookie",))
+        return response
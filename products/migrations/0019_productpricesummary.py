@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_alter_category_name_alter_product_alt_text_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPriceSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='price_summary', serialize=False, to='products.product')),
+                ('min_base_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('min_offer_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('best_discount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('min_discounted_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('min_stock', models.PositiveIntegerField(default=0)),
+                ('total_stock', models.PositiveIntegerField(default=0)),
+                ('in_stock', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Product price summaries',
+                'indexes': [models.Index(fields=['min_discounted_price'], name='products_pr_min_dis_26c0eb_idx'), models.Index(fields=['in_stock', 'min_discounted_price'], name='products_pr_in_stoc_f9fa98_idx')],
+            },
+        ),
+    ]
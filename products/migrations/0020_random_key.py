@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:44
+
+import random
+
+import products.models
+from django.db import migrations, models
+
+
+def spread_random_keys(apps, schema_editor):
+    # AddField fills existing rows with one value, give every row its own key
+    for model_name in ("Product", "Thumbanails"):
+        model = apps.get_model("products", model_name)
+        rows = list(model.objects.only("id"))
+        for row in rows:
+            row.random_key = random.random()
+        model.objects.bulk_update(rows, ["random_key"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_productpricesummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='random_key',
+            field=models.FloatField(default=products.models.generate_random_key),
+        ),
+        migrations.AddField(
+            model_name='thumbanails',
+            name='random_key',
+            field=models.FloatField(db_index=True, default=products.models.generate_random_key),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['random_key'], name='products_pr_random__7158bc_idx'),
+        ),
+        migrations.RunPython(spread_random_keys, migrations.RunPython.noop),
+    ]
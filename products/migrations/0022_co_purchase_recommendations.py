@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0021_sales_leaderboard'),
+        ('products', '0021_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoPurchaseOrder',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='order.ordermain')),
+                ('counted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CoPurchaseProduct',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='co_purchase', serialize=False, to='products.product')),
+                ('orders', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CoPurchasePair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('product_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('product_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product_b'], name='products_co_product_2e2c0b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product_a', 'product_b'), name='unique_co_purchase_pair'), models.CheckConstraint(condition=models.Q(('product_a__lt', models.F('product_b'))), name='co_purchase_pair_ordered')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='products.product')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_for', to='products.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'rank'), name='unique_recommendation_rank')],
+            },
+        ),
+    ]
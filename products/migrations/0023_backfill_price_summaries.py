@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:30
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Min, Sum
+
+
+def discounted_price(base_price, offer_price, best_discount):
+    # products.services.get_discounted_price, frozen for this migration
+    if base_price is None:
+        return None
+    if best_discount and best_discount > 0:
+        price = base_price - (base_price * best_discount / Decimal("100"))
+        return max(price, Decimal("0.00")).quantize(Decimal("0.01"))
+    if offer_price is not None:
+        return offer_price
+    return base_price
+
+
+def fill_price_summaries(apps, schema_editor):
+    # Products that existed before 0019 have no summary, and the offer index
+    # only builds them all on its very first rebuild
+    Product = apps.get_model("products", "Product")
+    ProductVariant = apps.get_model("products", "ProductVariant")
+    ProductPriceSummary = apps.get_model("products", "ProductPriceSummary")
+    ProductOfferIndex = apps.get_model("offer", "ProductOfferIndex")
+
+    variant_totals = {
+        row["product_id"]: row
+        for row in ProductVariant.objects.values("product_id").annotate(
+            min_base_price=Min("base_price"),
+            min_offer_price=Min("offer_price"),
+            min_stock=Min("stock"),
+            total_stock=Sum("stock"),
+        ).order_by()
+    }
+    best_discounts = dict(ProductOfferIndex.objects.values_list("product_id", "best_discount"))
+
+    summaries = []
+    for product_id in Product.objects.filter(price_summary__isnull=True).values_list("id", flat=True).order_by():
+        totals = variant_totals.get(product_id, {})
+        best_discount = best_discounts.get(product_id, Decimal("0"))
+        total_stock = totals.get("total_stock") or 0
+        summaries.append(
+            ProductPriceSummary(
+                product_id=product_id,
+                min_base_price=totals.get("min_base_price"),
+                min_offer_price=totals.get("min_offer_price"),
+                best_discount=best_discount,
+                min_discounted_price=discounted_price(
+                    totals.get("min_base_price"), totals.get("min_offer_price"), best_discount
+                ),
+                min_stock=totals.get("min_stock") or 0,
+                total_stock=total_stock,
+                in_stock=total_stock > 0,
+            )
+        )
+    ProductPriceSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offer', '0010_offerindexstate_productofferindex'),
+        ('products', '0022_co_purchase_recommendations'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_price_summaries, migrations.RunPython.noop),
+    ]
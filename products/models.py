@@ -5,10 +5,16 @@ from decimal import Decimal
 from django.db.models import Q
 from django.utils import timezone
 from django.core.validators import RegexValidator
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+import random
 
 def product_image_upload_to(instance, filename):
     return f"products/{instance.slug}/{filename}"
 
+def generate_random_key():
+    return random.random()
+
 
 class Category(models.Model):
     name = models.CharField(max_length=1024, unique=True)
@@ -53,6 +59,10 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     in_wishlist = models.BooleanField(default=False)
+    # Reshuffled periodically (reshuffle_random_keys), used for random carousels and shuffle sort
+    random_key = models.FloatField(default=generate_random_key)
+    # Weighted name / category / description vector, maintained by products.search
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
@@ -60,6 +70,9 @@ class Product(models.Model):
             models.Index(fields=["slug"]),
             models.Index(fields=["is_featured"]),
             models.Index(fields=["-created_at"]),
+            models.Index(fields=["random_key"]),
+            GinIndex(fields=["search_vector"], name="product_search_vector_gin"),
+            GinIndex(fields=["name"], name="product_name_trgm", opclasses=["gin_trgm_ops"]),
         ]
 
     def __str__(self):
@@ -146,4 +159,80 @@ class ProductVariant(models.Model):
         # elif offer.discount_type == "fixed_amount":
         #     price -= Decimal(str(offer.discount_value))
 
-        return max(price, Decimal("0.00"))
\ No newline at end of file
+        return max(price, Decimal("0.00"))
+
+class ProductPriceSummary(models.Model):
+    """
+    Denormalized pricing and stock per product, kept in sync by products.services.
+    The storefront sorts and filters on these columns instead of aggregating variants.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="price_summary"
+    )
+    min_base_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    min_offer_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    best_discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    min_discounted_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    min_stock = models.PositiveIntegerField(default=0)
+    total_stock = models.PositiveIntegerField(default=0)
+    in_stock = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Product price summaries"
+        indexes = [
+            models.Index(fields=["min_discounted_price"]),
+            models.Index(fields=["in_stock", "min_discounted_price"]),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.min_discounted_price}"
+
+
+class CoPurchaseProduct(models.Model):
+    """Number of counted (delivered) orders containing the product, the n in the cosine score."""
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="co_purchase"
+    )
+    orders = models.PositiveIntegerField(default=0)
+
+
+class CoPurchasePair(models.Model):
+    """
+    Sparse co-occurrence matrix: orders containing both products.
+    Stored once per pair with product_a < product_b.
+    """
+    product_a = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    product_b = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product_a", "product_b"], name="unique_co_purchase_pair"),
+            models.CheckConstraint(condition=Q(product_a__lt=models.F("product_b")), name="co_purchase_pair_ordered"),
+        ]
+        indexes = [
+            models.Index(fields=["product_b"]),
+        ]
+
+
+class CoPurchaseOrder(models.Model):
+    """Orders already folded into the co-purchase counts, so each run only reads new ones."""
+    order = models.OneToOneField("order.OrderMain", on_delete=models.CASCADE, primary_key=True, related_name="+")
+    counted_at = models.DateTimeField(auto_now_add=True)
+
+
+class ProductRecommendation(models.Model):
+    """Precomputed top-k "bought together" neighbours, read by the detail page in rank order."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="recommendations")
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="recommended_for")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "rank"], name="unique_recommendation_rank"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} ({self.score:.3f})"
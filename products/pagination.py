@@ -0,0 +1,148 @@
+import math
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .cache import PRODUCT_LISTS, cached
+
+CURSOR_SALT = "products.pagination.cursor"
+
+
+def encode_cursor(values, number, backwards=False):
+    encoded = []
+    for value in values:
+        if isinstance(value, Decimal):
+            value = str(value)
+        elif isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        encoded.append(value)
+    return signing.dumps({"v": encoded, "n": number, "b": int(backwards)}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor):
+    """Returns (values, page number, backwards) or None for a missing / tampered cursor."""
+    if not cursor:
+        return None
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+        return data["v"], int(data["n"]), bool(data["b"])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """Quacks like django.core.paginator.Page for the listing template, plus cursors."""
+
+    def __init__(self, object_list, number, num_pages, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.number = number
+        self.num_pages = num_pages
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over the queryset's own order_by.
+    Every ordering field must be a non-null model field or annotation and the
+    last one must be unique (pk) so the seek condition is exact. Next/previous
+    pages seek past the boundary row instead of using OFFSET, and the total
+    used for the page window is cached (under count_tags) instead of counted
+    per request. A total already known from a summary row can be passed as count.
+    """
+
+    def __init__(self, queryset, per_page, count_cache_key=None, count_tags=(PRODUCT_LISTS,), count_timeout=300,
+                 count=None):
+        if count is not None:
+            self.count = count
+        self.queryset = queryset
+        self.per_page = per_page
+        self.count_cache_key = count_cache_key
+        self.count_tags = count_tags
+        self.count_timeout = count_timeout
+        self.keys = [
+            (field.lstrip("-"), field.startswith("-"))
+            for field in queryset.query.order_by
+        ]
+
+    @cached_property
+    def count(self):
+        if not self.count_cache_key:
+            return self.queryset.count()
+        return cached(self.count_cache_key, self.count_tags, self.queryset.count, self.count_timeout)
+
+    @cached_property
+    def num_pages(self):
+        return max(1, math.ceil(self.count / self.per_page))
+
+    def _key_values(self, obj):
+        return [getattr(obj, field) for field, _ in self.keys]
+
+    def _seek(self, values, backwards):
+        condition = Q()
+        equal = {}
+        for (field, descending), value in zip(self.keys, values):
+            lookup = "gt" if descending == backwards else "lt"
+            condition |= Q(**equal, **{f"{field}__{lookup}": value})
+            equal[field] = value
+        return condition
+
+    def _build_page(self, rows, number, more_before, more_after):
+        previous_cursor = next_cursor = None
+        if rows and more_before:
+            previous_cursor = encode_cursor(self._key_values(rows[0]), number - 1, backwards=True)
+        if rows and more_after:
+            next_cursor = encode_cursor(self._key_values(rows[-1]), number + 1)
+        return KeysetPage(rows, number, max(self.num_pages, number), next_cursor, previous_cursor)
+
+    def page_from_cursor(self, cursor):
+        decoded = decode_cursor(cursor)
+        if decoded is None or len(decoded[0]) != len(self.keys):
+            return self.page_from_number(1)
+
+        values, number, backwards = decoded
+        queryset = self.queryset.filter(self._seek(values, backwards))
+        if backwards:
+            reverse_ordering = [field if descending else f"-{field}" for field, descending in self.keys]
+            rows = list(queryset.order_by(*reverse_ordering)[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return self._build_page(rows, max(number, 1), more_before=has_more, more_after=True)
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        return self._build_page(rows[:self.per_page], number, more_before=True, more_after=has_more)
+
+    def page_from_number(self, number):
+        """Numbered jumps from the page window still use OFFSET, bounded by the cached total."""
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        number = min(max(number, 1), self.num_pages)
+
+        offset = (number - 1) * self.per_page
+        rows = list(self.queryset[offset:offset + self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        return self._build_page(rows[:self.per_page], number, more_before=number > 1, more_after=has_more)
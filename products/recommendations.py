@@ -0,0 +1,239 @@
+"""
+"Bought together" recommendations from delivered order history.
+
+The co-occurrence matrix is kept sparse in the database (CoPurchasePair,
+one row per product pair seen together) with per-product order counts
+(CoPurchaseProduct). update_recommendations folds in only orders that are
+not yet in CoPurchaseOrder, then rescores the products whose counts moved:
+cosine similarity c_ab / sqrt(n_a * n_b), top RECOMMENDATIONS_PER_PRODUCT
+neighbours per product written to ProductRecommendation.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Q
+
+from userFolder.order.leaderboard import COUNTED_STATUS
+from userFolder.order.models import OrderItem, OrderMain
+from .cache import invalidate_tags, product_tag
+from .models import CoPurchaseOrder, CoPurchasePair, CoPurchaseProduct, Product, ProductRecommendation
+
+RECOMMENDATIONS_PER_PRODUCT = 8
+# A single shared order is noise, not a pattern
+MIN_CO_PURCHASES = 2
+# Bulk orders would add size^2 pairs that say little about either product
+MAX_ORDER_PRODUCTS = 50
+ORDER_BATCH_SIZE = 5000
+
+# Pair keys pack (low id, high id) into one int64 so np.unique can count them
+_PAIR_SHIFT = np.int64(32)
+
+
+def _pack(low, high):
+    return (low.astype(np.int64) << _PAIR_SHIFT) | high.astype(np.int64)
+
+
+def _unpack(keys):
+    return keys >> _PAIR_SHIFT, keys & np.int64(0xFFFFFFFF)
+
+
+def count_pairs(order_ids, product_ids):
+    """
+    Co-occurrence counts for (order, product) incidence arrays holding one
+    entry per distinct product in an order. Returns (low, high, count)
+    arrays with low < high, all pairs generated without a Python loop.
+    """
+    if len(order_ids) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    order = np.lexsort((product_ids, order_ids))
+    order_ids, product_ids = order_ids[order], product_ids[order]
+    _, starts, sizes = np.unique(order_ids, return_index=True, return_counts=True)
+
+    # Each entry pairs with the entries after it in the same order
+    positions = np.arange(len(order_ids))
+    group_ends = np.repeat(starts + sizes, sizes)
+    partners = group_ends - positions - 1
+    left = np.repeat(positions, partners)
+    first_partner = np.repeat(np.cumsum(partners) - partners, partners)
+    right = left + 1 + (np.arange(partners.sum()) - first_partner)
+
+    keys, counts = np.unique(_pack(product_ids[left], product_ids[right]), return_counts=True)
+    low, high = _unpack(keys)
+    return low, high, counts
+
+
+def _new_orders():
+    return (
+        OrderMain.objects.filter(order_status=COUNTED_STATUS)
+        .exclude(pk__in=CoPurchaseOrder.objects.values("order_id"))
+        .annotate(product_total=Count("items__variant__product", distinct=True))
+    )
+
+
+def _fold_orders(order_ids):
+    """Adds one batch of orders to the counts. Returns the product ids whose counts changed."""
+    rows = np.array(
+        list(
+            OrderItem.objects.filter(order_id__in=order_ids, variant__isnull=False)
+            .values_list("order_id", "variant__product_id")
+            .distinct()
+            .order_by()
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    incidence_orders, incidence_products = rows[:, 0], rows[:, 1]
+
+    touched, product_counts = np.unique(incidence_products, return_counts=True)
+    existing = dict(
+        CoPurchaseProduct.objects.filter(product_id__in=touched.tolist()).values_list("product_id", "orders")
+    )
+    CoPurchaseProduct.objects.bulk_create(
+        [
+            CoPurchaseProduct(product_id=product_id, orders=existing.get(product_id, 0) + count)
+            for product_id, count in zip(touched.tolist(), product_counts.tolist())
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["orders"],
+    )
+
+    low, high, counts = count_pairs(incidence_orders, incidence_products)
+    if len(counts):
+        existing_pairs = {
+            (a, b): orders
+            for a, b, orders in CoPurchasePair.objects.filter(
+                product_a_id__in=np.unique(low).tolist(), product_b_id__in=np.unique(high).tolist()
+            ).values_list("product_a_id", "product_b_id", "orders")
+        }
+        CoPurchasePair.objects.bulk_create(
+            [
+                CoPurchasePair(product_a_id=a, product_b_id=b, orders=existing_pairs.get((a, b), 0) + count)
+                for a, b, count in zip(low.tolist(), high.tolist(), counts.tolist())
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["product_a", "product_b"],
+            update_fields=["orders"],
+        )
+
+    CoPurchaseOrder.objects.bulk_create(
+        [CoPurchaseOrder(order_id=order_id) for order_id in order_ids], batch_size=1000
+    )
+    return set(touched.tolist())
+
+
+def top_neighbours(products, neighbours, co_orders, product_orders, k=RECOMMENDATIONS_PER_PRODUCT):
+    """
+    Scores directed pairs (products[i] -> neighbours[i]) by cosine similarity
+    and keeps the best k per product. product_orders maps id -> order count.
+    Returns (products, neighbours, scores, ranks) sorted by product and rank.
+    """
+    n_product = np.array([product_orders[p] for p in products.tolist()], dtype=np.float64)
+    n_neighbour = np.array([product_orders[p] for p in neighbours.tolist()], dtype=np.float64)
+    scores = co_orders / np.sqrt(n_product * n_neighbour)
+
+    # Best first within each product, ties to the more co-purchased, then lower id
+    order = np.lexsort((neighbours, -co_orders, -scores, products))
+    products, neighbours, scores = products[order], neighbours[order], scores[order]
+    _, starts, sizes = np.unique(products, return_index=True, return_counts=True)
+    ranks = np.arange(len(products)) - np.repeat(starts, sizes)
+    keep = ranks < k
+    return products[keep], neighbours[keep], scores[keep], ranks[keep]
+
+
+def _rescore(product_ids):
+    """Rewrites the recommendations of product_ids from the current counts."""
+    pairs = np.array(
+        list(
+            CoPurchasePair.objects.filter(orders__gte=MIN_CO_PURCHASES)
+            .filter(Q(product_a_id__in=product_ids) | Q(product_b_id__in=product_ids))
+            .values_list("product_a_id", "product_b_id", "orders")
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    # Both directions, then keep the rows whose source is being rescored
+    products = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    neighbours = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    co_orders = np.concatenate([pairs[:, 2], pairs[:, 2]]).astype(np.float64)
+    wanted = np.isin(products, np.array(list(product_ids), dtype=np.int64))
+    products, neighbours, co_orders = products[wanted], neighbours[wanted], co_orders[wanted]
+
+    product_orders = dict(
+        CoPurchaseProduct.objects.filter(
+            product_id__in=np.union1d(products, neighbours).tolist()
+        ).values_list("product_id", "orders")
+    )
+    products, neighbours, scores, ranks = top_neighbours(products, neighbours, co_orders, product_orders)
+
+    ProductRecommendation.objects.filter(product_id__in=product_ids).delete()
+    ProductRecommendation.objects.bulk_create(
+        [
+            ProductRecommendation(product_id=product, recommended_id=neighbour, rank=rank, score=score)
+            for product, neighbour, score, rank in zip(
+                products.tolist(), neighbours.tolist(), scores.tolist(), ranks.tolist()
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+def _affected_products(touched):
+    """Touched products plus everything bought with them: their scores share a changed n."""
+    partners = CoPurchasePair.objects.filter(Q(product_a_id__in=touched) | Q(product_b_id__in=touched))
+    affected = set(touched)
+    for a, b in partners.values_list("product_a_id", "product_b_id"):
+        affected.add(a)
+        affected.add(b)
+    return affected
+
+
+def update_recommendations(full=False, batch_size=ORDER_BATCH_SIZE):
+    """
+    Folds delivered orders that have not been counted yet into the
+    co-purchase counts and rescores the affected products. full=True starts
+    over from every delivered order. Each batch commits on its own; a run
+    racing another one fails on the CoPurchaseOrder primary key instead of
+    counting an order twice. Returns (orders counted, products rescored).
+    """
+    if full:
+        with transaction.atomic():
+            ProductRecommendation.objects.all().delete()
+            CoPurchasePair.objects.all().delete()
+            CoPurchaseProduct.objects.all().delete()
+            CoPurchaseOrder.objects.all().delete()
+
+    orders_counted = 0
+    rescored = set()
+    while True:
+        with transaction.atomic():
+            order_ids = list(
+                _new_orders().filter(product_total__lte=MAX_ORDER_PRODUCTS)
+                .order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            # Oversized orders are logged as seen without adding pairs
+            skipped = list(
+                _new_orders().filter(product_total__gt=MAX_ORDER_PRODUCTS).values_list("pk", flat=True)
+            )
+            CoPurchaseOrder.objects.bulk_create([CoPurchaseOrder(order_id=order_id) for order_id in skipped])
+            if not order_ids:
+                break
+            affected = _affected_products(_fold_orders(order_ids))
+            if affected:
+                _rescore(affected)
+        orders_counted += len(order_ids)
+        rescored |= affected
+
+    if rescored:
+        transaction.on_commit(lambda: invalidate_tags(*(product_tag(product_id) for product_id in rescored)))
+    return orders_counted, len(rescored)
+
+
+def recommended_products(product, queryset=None):
+    """The product's precomputed neighbours in rank order, one indexed query."""
+    queryset = queryset if queryset is not None else Product.objects.all()
+    return (
+        queryset.filter(recommended_for__product=product, is_active=True)
+        .order_by("recommended_for__rank")
+    )
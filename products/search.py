@@ -0,0 +1,82 @@
+import re
+from decimal import Decimal
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast
+
+from .models import Category, Product
+
+SEARCH_CONFIG = "english"
+# search_rank is numeric rather than the PostgreSQL real that ts_rank and
+# similarity return: a real does not survive the keyset cursor (JSON, then a
+# float8 parameter) exactly, so tied ranks would repeat or skip the boundary
+# row between pages.
+RANK_FIELD = DecimalField(max_digits=12, decimal_places=6)
+NO_RANK = Value(Decimal("0"), output_field=RANK_FIELD)
+
+
+def _is_postgres():
+    return connection.vendor == "postgresql"
+
+
+def product_search_vector():
+    category_name = Subquery(Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1])
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(category_name, weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(product_ids=None, category_ids=None):
+    """
+    Recomputes Product.search_vector in a single UPDATE.
+    Without ids every product is refreshed (bulk loads, rebuild_search_vectors).
+    """
+    if not _is_postgres():
+        return 0
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+    if category_ids is not None:
+        products = products.filter(category_id__in=category_ids)
+    return products.update(search_vector=product_search_vector())
+
+
+def build_prefix_query(text):
+    """'blue shi' -> blue:* & shi:*, so partially typed words still match."""
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    return SearchQuery(" & ".join(f"{word}:*" for word in words), search_type="raw", config=SEARCH_CONFIG)
+
+
+def search_products(queryset, text):
+    """
+    Filters a Product queryset by text and annotates search_rank.
+    Full-text (GIN on search_vector) with prefix matching, plus trigram
+    similarity on the name (GIN gin_trgm_ops, pg_trgm's default 0.3
+    threshold) for misspellings.
+    search_rank is rounded to 6 places so it can be a keyset cursor key.
+    Callers decide whether to order by -search_rank.
+    """
+    text = (text or "").strip()
+    if not text:
+        return queryset.annotate(search_rank=NO_RANK)
+
+    if not _is_postgres():
+        return queryset.filter(name__icontains=text).annotate(search_rank=NO_RANK)
+
+    query = build_prefix_query(text)
+    condition = Q(name__trigram_similar=text)
+    if query is not None:
+        condition |= Q(search_vector=query)
+
+    rank = TrigramSimilarity("name", text)
+    if query is not None:
+        rank = SearchRank(F("search_vector"), query) + rank
+
+    return queryset.filter(condition).annotate(search_rank=Cast(rank, RANK_FIELD))
+
@@ -0,0 +1,79 @@
+import random
+import time
+from django.db.models import F, Q, Value, Case, When, DecimalField, IntegerField
+from django.db.models.functions import Coalesce
+from offer.selectors import ensure_offer_index_fresh
+
+def with_price_summary(queryset):
+    """
+    Annotates a Product queryset with the card fields (base_price, offer_price,
+    best_discount, min_discounted_price, stock, total_stock) read from
+    ProductPriceSummary instead of aggregating variants per request.
+    summary_updated_at is part of the product card cache version.
+    """
+    ensure_offer_index_fresh()
+    return queryset.annotate(
+        base_price=F("price_summary__min_base_price"),
+        offer_price=F("price_summary__min_offer_price"),
+        best_discount=Coalesce(
+            F("price_summary__best_discount"),
+            Value(0, output_field=DecimalField())
+        ),
+        min_discounted_price=F("price_summary__min_discounted_price"),
+        stock=Coalesce(F("price_summary__min_stock"), Value(0, output_field=IntegerField())),
+        total_stock=Coalesce(F("price_summary__total_stock"), Value(0, output_field=IntegerField())),
+        summary_updated_at=F("price_summary__updated_at"),
+    )
+
+
+def with_rating_summary(queryset):
+    """
+    Annotates a Product queryset with avg_rating and review_count from
+    ProductRatingSummary (0 for products without reviews, so both can be
+    sorted and paged on). rating_updated_at is part of the card cache version.
+    """
+    return queryset.annotate(
+        avg_rating=Coalesce(
+            F("rating_summary__average_rating"),
+            Value(0, output_field=DecimalField(max_digits=3, decimal_places=2)),
+        ),
+        review_count=Coalesce(F("rating_summary__review_count"), Value(0, output_field=IntegerField())),
+        rating_updated_at=F("rating_summary__updated_at"),
+    )
+
+
+def sample_random(queryset, k, key="random_key"):
+    """
+    Picks k rows starting at a random point of the indexed random_key column
+    and wraps around if the tail is short. Costs an index range scan of k rows
+    instead of ORDER BY RANDOM() over the whole set; neighbouring keys come
+    together until the keys are reshuffled (reshuffle_random_keys).
+    """
+    pivot = random.random()
+    rows = list(queryset.filter(**{f"{key}__gte": pivot}).order_by(key, "pk")[:k])
+    if len(rows) < k:
+        rows += list(queryset.filter(**{f"{key}__lt": pivot}).order_by(key, "pk")[:k - len(rows)])
+    return rows
+
+
+def current_shuffle_seed(period=3600):
+    """
+    Seed shared by every visitor and rotated each period, so the shuffled
+    listing stays stable while paging and identical pages can be cached.
+    """
+    return random.Random(int(time.time() // period)).random()
+
+
+def shuffle_order(queryset, seed, key="random_key"):
+    """
+    Deterministic "random" order for a given seed: rows from the seed up to 1
+    first, then the wrapped-around rest. Stable across pages for one seed.
+    The bucket is annotated (shuffle_bucket) so keyset pagination can seek on it.
+    """
+    return queryset.annotate(
+        shuffle_bucket=Case(
+            When(Q(**{f"{key}__gte": seed}), then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        ),
+    ).order_by("shuffle_bucket", key, "pk")
@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Min, Sum
+from django.utils import timezone
+
+from offer.models import ProductOfferIndex
+from .cache import invalidate_products
+from .models import Product, ProductVariant, ProductPriceSummary
+
+
+def get_discounted_price(base_price, offer_price, best_discount):
+    """
+    Same rule the storefront applies per variant:
+    an active offer wins over the variant offer price, otherwise offer price, otherwise base.
+    """
+    if base_price is None:
+        return None
+    if best_discount and best_discount > 0:
+        price = base_price - (base_price * best_discount / Decimal("100"))
+        return max(price, Decimal("0.00")).quantize(Decimal("0.01"))
+    if offer_price is not None:
+        return offer_price
+    return base_price
+
+
+def refresh_price_summaries(product_ids=None):
+    """
+    Recomputes ProductPriceSummary rows from variants and the offer index.
+    With product_ids only those products are refreshed, otherwise every product.
+    """
+    products = Product.objects.all()
+    variants = ProductVariant.objects.all()
+    discounts = ProductOfferIndex.objects.all()
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        products = products.filter(id__in=product_ids)
+        variants = variants.filter(product_id__in=product_ids)
+        discounts = discounts.filter(product_id__in=product_ids)
+
+    variant_totals = {
+        row["product_id"]: row
+        for row in variants.values("product_id").annotate(
+            min_base_price=Min("base_price"),
+            min_offer_price=Min("offer_price"),
+            min_stock=Min("stock"),
+            total_stock=Sum("stock"),
+        ).order_by()
+    }
+    best_discounts = dict(discounts.values_list("product_id", "best_discount"))
+
+    now = timezone.now()
+    summaries = []
+    for product_id in products.values_list("id", flat=True).order_by():
+        totals = variant_totals.get(product_id, {})
+        min_base_price = totals.get("min_base_price")
+        min_offer_price = totals.get("min_offer_price")
+        best_discount = best_discounts.get(product_id, Decimal("0"))
+        total_stock = totals.get("total_stock") or 0
+
+        summaries.append(
+            ProductPriceSummary(
+                product_id=product_id,
+                min_base_price=min_base_price,
+                min_offer_price=min_offer_price,
+                best_discount=best_discount,
+                min_discounted_price=get_discounted_price(min_base_price, min_offer_price, best_discount),
+                min_stock=totals.get("min_stock") or 0,
+                total_stock=total_stock,
+                in_stock=total_stock > 0,
+                updated_at=now,
+            )
+        )
+
+    ProductPriceSummary.objects.bulk_create(
+        summaries,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=[
+            "min_base_price", "min_offer_price", "best_discount", "min_discounted_price",
+            "min_stock", "total_stock", "in_stock", "updated_at",
+        ],
+    )
+    transaction.on_commit(lambda: invalidate_products(product_ids))
+    return len(summaries)
+
+
+def schedule_price_summary_refresh(product_ids=None):
+    transaction.on_commit(lambda: refresh_price_summaries(product_ids=product_ids))
@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_categories, invalidate_products
+from .models import Category, Product, ProductImage, ProductVariant
+from .search import update_search_vectors
+from .services import schedule_price_summary_refresh
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def refresh_summary_on_variant_change(sender, instance, **kwargs):
+    schedule_price_summary_refresh(product_ids=[instance.product_id])
+
+
+@receiver(post_save, sender=Product)
+def refresh_search_vector_on_product_save(sender, instance, **kwargs):
+    update_search_vectors(product_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_cache_on_product_change(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_products([instance.pk]))
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_cache_on_image_change(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_products([instance.product_id]))
+
+
+@receiver(post_save, sender=Category)
+def refresh_search_vectors_on_category_save(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(category_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_cache_on_category_change(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_categories([instance.pk]))
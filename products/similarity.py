@@ -0,0 +1,183 @@
+"""
+Content-based "similar products" from name, description and category.
+
+build_similarity_index turns every active product into a TF-IDF vector
+(sparse, NumPy only), computes the top SIMILAR_PER_PRODUCT cosine
+neighbours block by block and writes them to one .npy file: a structured
+array of (product_id int32, neighbours int32[k], scores float16[k]) sorted
+by product_id. Web workers memory-map the file, so every worker on a host
+shares one copy through the page cache and a lookup is a binary search.
+"""
+import os
+import re
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .models import Product
+
+SIMILAR_PER_PRODUCT = 8
+# Terms in fewer documents than this are typos or ids, they only add noise
+MIN_DOCUMENT_FREQUENCY = 2
+MAX_FEATURES = 20000
+# Name and category say more about what a product is than the description prose
+NAME_WEIGHT = 3
+CATEGORY_WEIGHT = 2
+# Upper bound for one block of the product x nonzero score expansion
+BLOCK_BUDGET = 8_000_000
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to with your you our".split()
+)
+
+
+def index_path():
+    return Path(getattr(settings, "SIMILARITY_INDEX_PATH", Path(settings.BASE_DIR) / "var" / "similar_products.npy"))
+
+
+def _tokens(text):
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOP_WORDS and len(token) > 1]
+
+
+def _document(name, description, category):
+    return _tokens(name) * NAME_WEIGHT + _tokens(category) * CATEGORY_WEIGHT + _tokens(description)
+
+
+def tfidf_matrix(documents):
+    """
+    Row-normalized TF-IDF for token lists, as CSR arrays (indptr, indices, data).
+    Sublinear tf (1 + log tf) and smoothed idf, like the usual text defaults.
+    """
+    counts = [Counter(document) for document in documents]
+    document_frequency = Counter(term for document in counts for term in document)
+    vocabulary = [
+        term for term, frequency in document_frequency.most_common(MAX_FEATURES)
+        if frequency >= MIN_DOCUMENT_FREQUENCY
+    ]
+    term_index = {term: index for index, term in enumerate(vocabulary)}
+
+    indptr = [0]
+    indices, tf = [], []
+    for document in counts:
+        for term, count in document.items():
+            index = term_index.get(term)
+            if index is not None:
+                indices.append(index)
+                tf.append(count)
+        indptr.append(len(indices))
+
+    indptr = np.array(indptr, dtype=np.int64)
+    indices = np.array(indices, dtype=np.int32)
+    frequencies = np.array([document_frequency[term] for term in vocabulary], dtype=np.float32)
+    idf = np.log((1 + len(documents)) / (1 + frequencies)) + 1
+    data = (1 + np.log(np.array(tf, dtype=np.float32))) * idf[indices]
+
+    # L2-normalize each row so dot products are cosines
+    rows = np.repeat(np.arange(len(documents)), np.diff(indptr))
+    norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(documents)))
+    data = (data / np.where(norms > 0, norms, 1)[rows]).astype(np.float32)
+    return indptr, indices, data, len(vocabulary)
+
+
+def top_k_cosine(indptr, indices, data, n_terms, k=SIMILAR_PER_PRODUCT):
+    """
+    Top-k neighbours of every row by cosine, (rows x k) index and score
+    arrays, -1 / 0 where a row has fewer than k neighbours with any overlap.
+    Each block of rows is densified and multiplied against the sparse matrix
+    through its nonzeros, so memory stays near BLOCK_BUDGET floats.
+    """
+    n_rows = len(indptr) - 1
+    k = min(k, max(n_rows - 1, 0))
+    neighbours = np.full((n_rows, k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float32)
+    if k == 0 or len(data) == 0:
+        return neighbours, scores
+
+    nonempty = np.diff(indptr) > 0
+    row_starts = indptr[:-1][nonempty]
+    block_size = max(1, BLOCK_BUDGET // len(data))
+    for start in range(0, n_rows, block_size):
+        stop = min(start + block_size, n_rows)
+        block = np.zeros((stop - start, n_terms), dtype=np.float32)
+        block_rows = np.repeat(np.arange(stop - start), np.diff(indptr[start:stop + 1]))
+        block[block_rows, indices[indptr[start]:indptr[stop]]] = data[indptr[start]:indptr[stop]]
+
+        # similarity[:, j] = sum over row j's nonzeros of block[:, term] * value
+        similarity = np.zeros((stop - start, n_rows), dtype=np.float32)
+        similarity[:, nonempty] = np.add.reduceat(block[:, indices] * data, row_starts, axis=1)
+        similarity[np.arange(stop - start), np.arange(start, stop)] = 0
+
+        best = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(similarity, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best[best_scores <= 0] = -1
+        neighbours[start:stop] = best
+        scores[start:stop] = np.where(best_scores > 0, best_scores, 0)
+    return neighbours, scores
+
+
+def build_similarity_index(path=None, k=SIMILAR_PER_PRODUCT):
+    """Rebuilds the index file from active products. Returns the number of products indexed."""
+    path = Path(path or index_path())
+    products = list(
+        Product.objects.filter(is_active=True)
+        .values_list("id", "name", "description", "category__name")
+        .order_by("id")
+    )
+    ids = np.array([product[0] for product in products], dtype=np.int32)
+    indptr, indices, data, n_terms = tfidf_matrix([_document(*product[1:]) for product in products])
+    neighbour_rows, scores = top_k_cosine(indptr, indices, data, n_terms, k)
+
+    index = np.zeros(len(ids), dtype=[
+        ("product_id", np.int32),
+        ("neighbours", np.int32, (k,)),
+        ("scores", np.float16, (k,)),
+    ])
+    index["product_id"] = ids
+    width = neighbour_rows.shape[1]
+    index["neighbours"][:, :width] = np.where(neighbour_rows >= 0, ids[neighbour_rows], -1)
+    index["neighbours"][:, width:] = -1
+    index["scores"][:, :width] = scores
+
+    # Write next to the target and swap, readers keep their old mapping until they reopen
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".npy", delete=False) as handle:
+        np.save(handle, index)
+    os.replace(handle.name, path)
+    return len(ids)
+
+
+_loaded = {"key": None, "index": None}
+
+
+def _index():
+    """The memory-mapped index, reopened when the file is replaced. None if not built yet."""
+    path = index_path()
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    key = (str(path), stat.st_ino, stat.st_mtime_ns)
+    if _loaded["key"] != key:
+        _loaded["index"] = np.load(path, mmap_mode="r")
+        _loaded["key"] = key
+    return _loaded["index"]
+
+
+def similar_product_ids(product_id, limit=SIMILAR_PER_PRODUCT):
+    """Most similar product ids by content, best first. Empty if the product is not indexed."""
+    index = _index()
+    if index is None or len(index) == 0:
+        return []
+    ids = index["product_id"]
+    position = int(np.searchsorted(ids, product_id))
+    if position >= len(ids) or ids[position] != product_id:
+        return []
+    neighbours = index["neighbours"][position]
+    return [int(neighbour) for neighbour in neighbours[neighbours >= 0][:limit]]
@@ -0,0 +1,50 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+# Bump when a card template changes so old fragments are not served after a deploy
+CARD_TEMPLATE_VERSION = 2
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def card_version(product):
+    """
+    Changes whenever anything a card shows changes: the product row itself
+    (updated_at), its price summary, which is refreshed on variant, stock
+    and offer changes (summary_updated_at, annotated by with_price_summary),
+    or its review totals (rating_updated_at, annotated by with_rating_summary).
+    """
+    stamps = [
+        product.updated_at,
+        getattr(product, "summary_updated_at", None),
+        getattr(product, "rating_updated_at", None),
+    ]
+    return ":".join(str(int(stamp.timestamp() * 1_000_000)) if stamp else "0" for stamp in stamps)
+
+
+def card_cache_key(product, template_name):
+    return f"card:{CARD_TEMPLATE_VERSION}:{template_name}:{product.pk}:{card_version(product)}"
+
+
+@register.simple_tag
+def product_cards(products, template_name):
+    """
+    Renders one card per product with template_name, fetching every card in
+    one cache multi-get and rendering only the misses.
+    """
+    products = list(products)
+    keys = [card_cache_key(product, template_name) for product in products]
+    rendered = cache.get_many(keys)
+
+    missing = {}
+    for key, product in zip(keys, products):
+        if key not in rendered:
+            missing[key] = render_to_string(template_name, {"product": product})
+    if missing:
+        cache.set_many(missing, CARD_CACHE_TIMEOUT)
+        rendered.update(missing)
+
+    return mark_safe("".join(rendered[key] for key in keys))
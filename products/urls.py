@@ -4,12 +4,13 @@ from .views import *
 from .base_views import *
 from django.conf import settings
 from django.conf.urls.static import static
-from userFolder.review.views import submit_review
+from userFolder.review.views import submit_review, product_reviews
 
 urlpatterns = [
     path('',HomePageView.as_view(),name='Home_page_user'),
     path('about/',AboutView.as_view(),name='About_page_user'),
     path('review/',submit_review,name='submit_review'),
+    path('review/<int:product_id>/',product_reviews,name='product_reviews'),
     path('products/',views.product_list_view,name='products_page_user'),
     path('products/<slug:slug>',ProductDetailedView.as_view(),name='Product_card_view'),
     path('api/get-offers/', get_offers, name='get_offers'),
@@ -1,98 +1,62 @@
+import hashlib
 from django.shortcuts import render
 from django.utils import timezone
-from django.core.paginator import Paginator
 from django.views.generic import DetailView
-from django.http import JsonResponse
+from django.http import JsonResponse, QueryDict
 from django.db.models import (
-    Min, Max, Sum, Count, Avg,
-    OuterRef, Subquery, F, Value,
+    Min, Max, Sum, Count,
+    F, Value,
     DecimalField, When, Case, Prefetch, Q,
     ExpressionWrapper,
 )
 from django.db.models.functions import Coalesce, Greatest
 from .models import Product, ProductVariant, Category
-from offer.selectors import get_active_offer_subqueries
+from offer.selectors import get_active_offer_discounts
+from .selectors import (
+    with_price_summary, with_rating_summary, sample_random, shuffle_order, current_shuffle_seed,
+)
+from .cache import ALL_OFFERS, ALL_PRODUCTS, product_tag
+from .pagination import KeysetPaginator
+from .search import search_products
+from .recommendations import recommended_products
+from .similarity import similar_product_ids
+from .facets import get_listing_facets
 from coupon.models import Coupon
-from userFolder.review.models import Review
+from userFolder.review.views import review_page
 from offer.models import Offer,OfferType
 
-def product_list_view(request):
-    categories = (
-        Category.objects.filter(is_active=True)
-        .prefetch_related("products")
-        .annotate(product_count=Count("products"))
-        .order_by("name")
-    )
+LISTING_SORTS = {
+    "newest": ("-created_at", "-pk"),
+    "price-low-high": ("sort_price", "pk"),
+    "price-high-low": ("-sort_price", "-pk"),
+    "name-asc": ("name", "pk"),
+    "name-desc": ("-name", "-pk"),
+    "featured": ("-is_featured", "-created_at", "-pk"),
+    "rating": ("-avg_rating", "-review_count", "-pk"),
+}
+RATING_FILTERS = ("4", "3", "2", "1")
 
-    products = (
-        Product.objects.filter(is_active=True)
-        .prefetch_related("variants")
-        .annotate(
-            offer_price=Min("variants__offer_price"),
-            base_price=Min("variants__base_price"),
-            stock=Coalesce(Min("variants__stock"), 0),
-            total_stock=Coalesce(Sum("variants__stock"), 0),
-        )
-        .order_by("?")
-    )
 
-    product_offer_subquery, category_offer_subquery = get_active_offer_subqueries(
-        product_ref="id",
-        category_ref="category_id",
+def product_list_view(request):
+    products = shuffle_order(
+        with_rating_summary(with_price_summary(Product.objects.filter(is_active=True))),
+        current_shuffle_seed(),
     )
 
-    # ✅ Apply offers (percentage based)
-    products = products.annotate(
-        min_variant_price=Min("variants__base_price"),
-        min_variant_offer_price=Min("variants__offer_price"),
-
-        offer_prod_val=Coalesce(
-            Subquery(product_offer_subquery),
-            Value(0, output_field=DecimalField())
-        ),
-        offer_cat_val=Coalesce(
-            Subquery(category_offer_subquery),
-            Value(0, output_field=DecimalField())
-        ),
-    ).annotate(
-        best_discount=Greatest("offer_prod_val", "offer_cat_val"),
-    ).annotate(
-        min_discounted_price=Case(
-            When(
-                best_discount__gt=0,
-                then=Greatest(
-                    ExpressionWrapper(
-                        F("min_variant_price") - (F("min_variant_price") * F("best_discount") / Value(100.0)),
-                        output_field=DecimalField(max_digits=10, decimal_places=2),
-                    ),
-                    Value(0, output_field=DecimalField(max_digits=10, decimal_places=2))
-                )
-            ),
-            When(
-                min_variant_offer_price__isnull=False,
-                then=F("min_variant_offer_price")
-            ),
-            default=F("min_variant_price"),
-            output_field=DecimalField(max_digits=10, decimal_places=2),
-        )
-    )
     selected_category_id = request.GET.get("category")
     selected_price = request.GET.get("price_range")
     selected_sort = request.GET.get("sort")
+    selected_rating = request.GET.get("min_rating")
     search = request.GET.get("search")
 
-    if selected_sort == "newest":
-        products = products.order_by("-created_at")
-    elif selected_sort == "price-low-high":
-        products = products.order_by("min_discounted_price")
-    elif selected_sort == "price-high-low":
-        products = products.order_by("-min_discounted_price")
-    elif selected_sort == "name-asc":
-        products = products.order_by("name")
-    elif selected_sort == "name-desc":
-        products = products.order_by("-name")
-    elif selected_sort == "featured":
-        products = products.order_by("-is_featured", "-created_at")
+    # Every listing order ends on pk so cursors seek on a unique key
+    if selected_sort in LISTING_SORTS:
+        products = products.annotate(
+            sort_price=Coalesce(
+                F("min_discounted_price"),
+                Value(0, output_field=DecimalField(max_digits=10, decimal_places=2)),
+            )
+        ).order_by(*LISTING_SORTS[selected_sort])
 
     if selected_category_id and selected_category_id != "all":
         products = products.filter(category_id=selected_category_id)
@@ -100,23 +64,35 @@ def product_list_view(request):
     if selected_price:
         try:
             price_limit = float(selected_price)
-            products = products.filter(min_discounted_price__lte=price_limit).distinct()
+            products = products.filter(price_summary__min_discounted_price__lte=price_limit)
         except ValueError:
             pass
 
+    if selected_rating in RATING_FILTERS:
+        products = products.filter(rating_summary__average_rating__gte=int(selected_rating))
+    else:
+        selected_rating = None
+
     if search:
-        products = products.filter(name__icontains=search).distinct()
+        products = search_products(products, search)
+        if selected_sort not in LISTING_SORTS:
+            products = products.order_by("-search_rank", "pk")
 
-    price_range = Product.objects.filter(is_active=True).aggregate(
-        min_amount=Min("variants__offer_price"),
-        max_amount=Max("variants__offer_price"),
-    )
+    facets = get_listing_facets(search=search, category_id=selected_category_id)
 
-    paginator = Paginator(products, 13)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    count_signature = f"{selected_category_id}:{selected_price}:{selected_rating}:{search}"
+    paginator = KeysetPaginator(
+        products,
+        13,
+        count_cache_key=f"products:listing:count:{hashlib.md5(count_signature.encode()).hexdigest()}",
+    )
+    cursor = request.GET.get("cursor")
+    if cursor:
+        page_obj = paginator.page_from_cursor(cursor)
+    else:
+        page_obj = paginator.page_from_number(request.GET.get("page"))
     current_page = page_obj.number
-    total_pages = paginator.num_pages
+    total_pages = page_obj.num_pages
     window = 5
     half_window = (window - 1) // 2
 
@@ -132,15 +108,26 @@ def product_list_view(request):
 
     custom_page_range = range(start_page, end_page + 1)
 
+    # Only the filters the view reads, so cached pages never carry another visitor's extra params
+    query_params = QueryDict(mutable=True)
+    for name in ("category", "price_range", "sort", "min_rating", "search"):
+        if request.GET.get(name):
+            query_params[name] = request.GET[name]
+
     context = {
-        "categories": categories,
+        "categories": facets["categories"],
+        "price_buckets": facets["price_buckets"],
+        "in_stock_count": facets["in_stock_count"],
         "page_obj": page_obj,
         "custom_page_range": custom_page_range,
-        "max_amount": price_range["max_amount"] or 10000,
-        "min_amount": price_range["min_amount"] or 0,
+        "query_params": query_params.urlencode(),
+        "max_amount": facets["max_amount"] or 10000,
+        "min_amount": facets["min_amount"] or 0,
         "selected_category_id": selected_category_id,
         "selected_price": selected_price,
         "selected_sort": selected_sort,
+        "selected_rating": selected_rating,
+        "rating_filters": RATING_FILTERS,
         "search": search,
     }
 
@@ -155,21 +142,12 @@ class ProductDetailedView(DetailView):
     slug_url_kwarg = "slug"
 
     def get_queryset(self):
-        product_offer_subquery, category_offer_subquery = get_active_offer_subqueries(
-            product_ref="product_id",
-            category_ref="product__category_id",
-        )
+        product_offer_discount, category_offer_discount = get_active_offer_discounts("product")
 
         variants_queryset = (
             ProductVariant.objects.annotate(
-                offer_prod_value=Coalesce(
-                    Subquery(product_offer_subquery),
-                    Value(0, output_field=DecimalField())
-                ),
-                offer_cate_value=Coalesce(
-                    Subquery(category_offer_subquery),
-                    Value(0, output_field=DecimalField())
-                ),
+                offer_prod_value=product_offer_discount,
+                offer_cate_value=category_offer_discount,
             )
             .annotate(
                 best_discount=Greatest("offer_prod_value", "offer_cate_value"),
@@ -223,8 +201,8 @@ class ProductDetailedView(DetailView):
 
         return (
             Product.objects.filter(is_active=True)
-            .annotate(base_price=Min("variants__base_price"))
-            .select_related("category")
+            .annotate(base_price=F("price_summary__min_base_price"))
+            .select_related("category", "rating_summary")
             .prefetch_related(
                 Prefetch("variants", queryset=variants_queryset, to_attr="annotated_variants"),
                 "images",
@@ -234,18 +212,16 @@ class ProductDetailedView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         product = self.object
+        self.request.page_cache_tags = [product_tag(product.pk), ALL_PRODUCTS, ALL_OFFERS]
         all_images = product.images.all()
         context["images_list_limited"] = all_images[:4]
         context["sizes"] = product.annotated_variants
 
-        reviews = Review.objects.filter(product=product)
-        avg_rating = reviews.aggregate(avg=Avg("rating"))["avg"] or 0
-        ratings = reviews.count()
+        rating_summary = getattr(product, "rating_summary", None)
+        ratings = rating_summary.review_count if rating_summary else 0
+        avg_rating = rating_summary.average_rating if rating_summary else 0
         rating_range = range(int(avg_rating))
-
-        for review in reviews:
-            review.filled_stars = range(review.rating)
-            review.empty_stars = range(5 - review.rating)
+        review_page_obj = review_page(product.pk, review_count=ratings)
 
         now = timezone.now()
         coupons = Coupon.objects.filter(
@@ -254,30 +230,38 @@ class ProductDetailedView(DetailView):
             is_active=True
         )
 
-        related_products = (
-            Product.objects.filter(category=product.category, is_active=True)
-            .select_related("category")
-            .prefetch_related("variants", "images")
-            .annotate(
-                base_price=Min("variants__base_price"),
-                offer_price=Min("variants__offer_price"),
-            )
-            .exclude(pk=product.pk)
-        )
-        random_products = (
-            Product.objects.filter(is_active=True)
-            .exclude(pk=product.pk)
-            .prefetch_related("variants", "images")
-            .annotate(
-                offer_price=Min("variants__offer_price"),
-                base_price=Min("variants__base_price"),
-            )
-            .order_by("?")
+        related_products = list(recommended_products(
+            product, with_price_summary(Product.objects.select_related("category"))
+        )[:4])
+        if len(related_products) < 4:
+            # Thin purchase history (new or rarely bought): top up with similar content
+            shown = {product.pk, *(related.pk for related in related_products)}
+            similar_ids = [pk for pk in similar_product_ids(product.pk) if pk not in shown]
+            similar = with_price_summary(
+                Product.objects.filter(pk__in=similar_ids, is_active=True).select_related("category")
+            ).in_bulk()
+            related_products += [similar[pk] for pk in similar_ids if pk in similar][:4 - len(related_products)]
+        if len(related_products) < 4:
+            # No index yet either, fall back to the same category
+            related_products += with_price_summary(
+                Product.objects.filter(category=product.category, is_active=True)
+                .select_related("category")
+                .exclude(pk__in=[product.pk, *(related.pk for related in related_products)])
+            )[:4 - len(related_products)]
+        random_products = sample_random(
+            with_price_summary(
+                Product.objects.filter(is_active=True)
+                .exclude(pk=product.pk)
+                .prefetch_related("images")
+            ),
+            4,
         )
-        context["related_products"] = related_products[:4]
+        context["related_products"] = related_products
         context["random_products"] = random_products[:4]
         context["coupons"] = coupons
-        context["reviews"] = reviews
+        context["reviews"] = review_page_obj.object_list
+        context["reviews_next_cursor"] = review_page_obj.next_cursor
+        context["rating_summary"] = rating_summary
         context["avg_rating"] = avg_rating
         context["rating_range"] = rating_range
         context["ratings"] = ratings
@@ -1,10 +1,11 @@
-from userFolder.cart.models import CartItems
+from django.utils.functional import SimpleLazyObject
+
+from .counters import CART, get_count
+
 
 def cart_count(request):
     if request.user.is_authenticated:
-        return {
-            "cart_count": CartItems.objects.filter(
-                cart__user=request.user
-            ).count()
-        }
+        user_id = request.user.pk
+        # Only resolved if the template prints the badge
+        return {"cart_count": SimpleLazyObject(lambda: get_count(CART, user_id))}
     return {"cart_count": 0}
@@ -0,0 +1,55 @@
+"""
+Per-user cart and wishlist item counts for the header badges.
+
+Counts live in the shared cache. Mutation views adjust them after their
+transaction commits, so the context processors never COUNT(*) on a warm
+cache. Every entry expires after COUNTER_TIMEOUT and is then recounted from
+the database, which repairs any drift (a lost increment, an admin edit).
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+COUNTER_TIMEOUT = 60 * 15
+
+CART = "cart"
+WISHLIST = "wishlist"
+
+
+def _key(kind, user_id):
+    return f"counter:{kind}:{user_id}"
+
+
+def _count_from_db(kind, user_id):
+    # Imported here: the wishlist app imports this module
+    if kind == CART:
+        from .models import CartItems
+        return CartItems.objects.filter(cart__user_id=user_id).count()
+    from userFolder.wishlist.models import WishlistItem
+    return WishlistItem.objects.filter(wishlist__user_id=user_id).count()
+
+
+def get_count(kind, user_id):
+    count = cache.get(_key(kind, user_id))
+    if count is None or count < 0:
+        count = _count_from_db(kind, user_id)
+        cache.set(_key(kind, user_id), count, COUNTER_TIMEOUT)
+    return count
+
+
+def _adjust(kind, user_id, delta):
+    try:
+        cache.incr(_key(kind, user_id), delta)
+    except ValueError:
+        # Not cached: the next read counts from the database anyway
+        pass
+
+
+def adjust_count(kind, user_id, delta):
+    """Moves the cached count by delta once the current transaction commits."""
+    if delta:
+        transaction.on_commit(lambda: _adjust(kind, user_id, delta))
+
+
+def set_count(kind, user_id, count):
+    """For mutations that know the result, such as an order emptying the cart."""
+    transaction.on_commit(lambda: cache.set(_key(kind, user_id), count, COUNTER_TIMEOUT))
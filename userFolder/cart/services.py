@@ -0,0 +1,319 @@
+"""
+Cart summary: every line plus the cart totals from one query, cached per user.
+
+Totals come from window aggregates over the annotated cart rows, so the
+lines and the sums arrive in the same round trip. The result is an
+immutable CartSummary stored under the user's cart tag (bumped by every
+cart mutation through cart_changed), the offers tag and the tags of the
+products in it, so price, stock and offer changes also rebuild it.
+
+apply_cart_operations takes a batch of add / set / remove operations and
+writes them with bulk queries in one transaction, so the cart page can
+debounce rapid quantity clicks into a single request.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When, Window
+
+from offer.selectors import offer_index_valid_until
+from products.cache import ALL_OFFERS, get_tagged, invalidate_tags, product_tag, set_tagged
+from products.models import Product, ProductVariant
+from .counters import CART, adjust_count
+from .models import Cart, CartItems
+from .utils import get_annotated_cart_items
+
+SHIPPING_FEE = Decimal(30)
+SUMMARY_TIMEOUT = 60 * 10
+
+
+def cart_tag(user_id):
+    return f"cart:{user_id}"
+
+
+def cart_changed(user_id):
+    """Call from every cart mutation; the cached summary is rebuilt on next read."""
+    transaction.on_commit(lambda: invalidate_tags(cart_tag(user_id)))
+
+
+@dataclass(frozen=True, slots=True)
+class CartLine:
+    id: int
+    variant_id: int
+    product_id: int
+    product_name: str
+    product_slug: str
+    image_url: str
+    is_active: bool
+    size: str
+    quantity: int
+    stock: int
+    base_price: Decimal
+    final_price: Decimal
+    actual_discount: Decimal
+    product_total: Decimal
+    subtotal: Decimal
+
+    @property
+    def in_stock(self):
+        return 0 < self.stock and self.quantity <= self.stock
+
+
+@dataclass(frozen=True, slots=True)
+class CartSummary:
+    lines: tuple
+    subtotal: Decimal
+    cart_total_price: Decimal
+    cart_discount: Decimal
+    total_quantity: int
+    out_of_stock_lines: int
+    shipping: Decimal = SHIPPING_FEE
+
+    @property
+    def grand_total(self):
+        return self.cart_total_price + self.shipping
+
+    @property
+    def is_empty(self):
+        return not self.lines
+
+    @property
+    def totals(self):
+        """Same keys calculate_cart_totals returns, for the draft order helpers."""
+        return {
+            "subtotal": self.subtotal,
+            "cart_total_price": self.cart_total_price,
+            "cart_discount": self.cart_discount,
+            "shipping": self.shipping,
+            "grand_total": self.grand_total,
+        }
+
+    def as_json(self):
+        """What the cart page needs to redraw its rows and totals."""
+        return {
+            "lines": [
+                {
+                    "id": line.id,
+                    "quantity": line.quantity,
+                    "stock": line.stock,
+                    "final_price": line.final_price,
+                    "actual_discount": line.actual_discount,
+                    "product_total": line.product_total,
+                }
+                for line in self.lines
+            ],
+            "total_quantity": self.total_quantity,
+            **self.totals,
+        }
+
+    def validation_error(self):
+        """The error dict validate_stock_and_cart would return, or None if the cart can be ordered."""
+        if self.is_empty:
+            return {"success": False, "error": "Cart is empty."}
+        if self.out_of_stock_lines:
+            line = next(line for line in self.lines if not line.in_stock)
+            return {"success": False, "error": f"Out of stock: {line.product_name}"}
+        return None
+
+
+def build_cart_summary(user_id):
+    rows = (
+        get_annotated_cart_items(user_id)
+        .annotate(
+            total_subtotal=Window(Sum("subtotal")),
+            total_price=Window(Sum("product_total")),
+            total_discount=Window(Sum("actual_discount")),
+            total_quantity=Window(Sum("quantity")),
+            out_of_stock_lines=Window(Sum(Case(
+                When(Q(quantity__gt=F("variant__stock")) | Q(variant__stock__lte=0), then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ))),
+        )
+        .order_by("-item_added")
+        .values(
+            "id", "variant_id", "size", "quantity",
+            "product_base_price", "final_price", "actual_discount", "product_total", "subtotal",
+            "total_subtotal", "total_price", "total_discount", "total_quantity", "out_of_stock_lines",
+            product_id=F("variant__product_id"),
+            product_name=F("variant__product__name"),
+            product_slug=F("variant__product__slug"),
+            image=F("variant__product__image"),
+            is_active=F("variant__product__is_active"),
+            stock=F("variant__stock"),
+        )
+    )
+    rows = list(rows)
+    if not rows:
+        zero = Decimal("0.00")
+        return CartSummary((), zero, zero, zero, 0, 0)
+
+    storage = Product._meta.get_field("image").storage
+    lines = tuple(
+        CartLine(
+            id=row["id"],
+            variant_id=row["variant_id"],
+            product_id=row["product_id"],
+            product_name=row["product_name"],
+            product_slug=row["product_slug"],
+            image_url=storage.url(row["image"]) if row["image"] else "",
+            is_active=row["is_active"],
+            size=row["size"],
+            quantity=row["quantity"],
+            stock=row["stock"] or 0,
+            base_price=row["product_base_price"],
+            final_price=row["final_price"],
+            actual_discount=row["actual_discount"],
+            product_total=row["product_total"],
+            subtotal=row["subtotal"],
+        )
+        for row in rows
+    )
+    totals = rows[0]
+    return CartSummary(
+        lines=lines,
+        subtotal=totals["total_subtotal"],
+        cart_total_price=totals["total_price"],
+        cart_discount=totals["total_discount"],
+        total_quantity=totals["total_quantity"],
+        out_of_stock_lines=totals["out_of_stock_lines"],
+    )
+
+
+def get_cart_summary(user):
+    user_id = getattr(user, "pk", user)
+    key = f"cart:summary:{user_id}"
+    hit, summary = get_tagged(key)
+    if hit:
+        return summary
+    summary = build_cart_summary(user_id)
+    tags = [cart_tag(user_id), ALL_OFFERS, *{product_tag(line.product_id) for line in summary.lines}]
+    # An offer starting or ending only rebuilds the index (and bumps ALL_OFFERS) when
+    # something reads it, so the entry must not outlive the index it was priced from
+    timeout = SUMMARY_TIMEOUT
+    valid_until = offer_index_valid_until()
+    if valid_until is not None:
+        timeout = max(1, min(timeout, int((valid_until - timezone.now()).total_seconds())))
+    set_tagged(key, summary, tags, timeout)
+    return summary
+
+
+class CartOperationError(Exception):
+    """An operation in a batch that cannot be applied; nothing in the batch is saved."""
+
+
+ADD, SET, REMOVE = "add", "set", "remove"
+MAX_OPERATIONS = 50
+
+
+def _parse_operations(operations):
+    if not isinstance(operations, list) or not operations:
+        raise CartOperationError("No cart operations sent.")
+    if len(operations) > MAX_OPERATIONS:
+        raise CartOperationError(f"At most {MAX_OPERATIONS} operations per request.")
+
+    parsed = []
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise CartOperationError("Invalid data sent.")
+        op = operation.get("op")
+        try:
+            if op == ADD:
+                parsed.append((
+                    ADD,
+                    int(operation["product_id"]),
+                    (operation.get("size") or "").strip(),
+                    int(operation.get("quantity", 1)),
+                ))
+            elif op in (SET, REMOVE):
+                quantity = int(operation["quantity"]) if op == SET else 0
+                parsed.append((op, int(operation["item_id"]), None, quantity))
+            else:
+                raise CartOperationError(f"Unknown cart operation: {op}")
+        except (KeyError, TypeError, ValueError):
+            raise CartOperationError("Invalid data sent.")
+        if op != REMOVE and parsed[-1][3] < 1:
+            raise CartOperationError("Quantity must be at least 1")
+    return parsed
+
+
+@transaction.atomic
+def apply_cart_operations(user, operations):
+    """
+    Applies a batch of add / set / remove operations to the user's cart.
+
+    Operations are folded in order into the final quantity per cart line, so
+    repeated clicks on the same line become one write. Every touched variant
+    is read (and locked) in one query, then the changes go out as one
+    bulk_create, one bulk_update and one delete. Any invalid operation raises
+    CartOperationError and rolls back the whole batch.
+    """
+    parsed = _parse_operations(operations)
+    cart, _ = Cart.objects.get_or_create(user=user)
+    items = {item.pk: item for item in CartItems.objects.filter(cart=cart).only("id", "variant_id", "size", "quantity")}
+
+    for op, item_id, _, _ in parsed:
+        if op != ADD and item_id not in items:
+            raise CartOperationError("Item not found")
+
+    add_products = {product_id for op, product_id, _, _ in parsed if op == ADD}
+    variants = list(
+        ProductVariant.objects.select_for_update(of=("self",))
+        .filter(Q(pk__in=[item.variant_id for item in items.values()]) | Q(product_id__in=add_products))
+        .order_by("pk")
+        .values("pk", "product_id", "size__size", "stock")
+    )
+    stock = {variant["pk"]: variant["stock"] for variant in variants}
+    by_size, first_variant = {}, {}
+    for variant in variants:
+        by_size[(variant["product_id"], variant["size__size"])] = variant["pk"]
+        first_variant.setdefault(variant["product_id"], variant["pk"])
+
+    # Final quantity per (variant, size) line; 0 means the line goes away
+    lines = {(item.variant_id, item.size): item.quantity for item in items.values()}
+    touched = set()
+    for op, target, size, quantity in parsed:
+        if op == ADD:
+            variant_id = by_size.get((target, size)) if size else first_variant.get(target)
+            if variant_id is None:
+                raise CartOperationError("No variants available for this product.")
+            key = (variant_id, size)
+            lines[key] = lines.get(key, 0) + quantity
+        else:
+            item = items[target]
+            key = (item.variant_id, item.size)
+            lines[key] = quantity
+        touched.add(key)
+
+    # Lines the batch did not touch keep whatever they had, like the single-item views
+    for variant_id, size in touched:
+        quantity = lines[(variant_id, size)]
+        available = stock.get(variant_id) or 0
+        if quantity > available:
+            raise CartOperationError(f"Only {available} item(s) available in this size.")
+
+    existing = {(item.variant_id, item.size): item for item in items.values()}
+    created, updated, deleted = [], [], []
+    for key in touched:
+        quantity = lines[key]
+        item = existing.get(key)
+        if item is None:
+            if quantity:
+                created.append(CartItems(cart=cart, variant_id=key[0], size=key[1], quantity=quantity))
+        elif not quantity:
+            deleted.append(item.pk)
+        elif quantity != item.quantity:
+            item.quantity = quantity
+            updated.append(item)
+
+    if deleted:
+        CartItems.objects.filter(cart=cart, pk__in=deleted).delete()
+    if updated:
+        CartItems.objects.bulk_update(updated, ["quantity"])
+    if created:
+        CartItems.objects.bulk_create(created)
+    if created or updated or deleted:
+        adjust_count(CART, user.pk, len(created) - len(deleted))
+        cart_changed(user.pk)
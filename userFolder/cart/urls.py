@@ -6,4 +6,5 @@ urlpatterns = [
     path("add/", cart_item_add, name="add_cart"),
     path("remove/", cart_item_remove, name="remove_cart_item"),
     path("quantity/add",update_cart_item_quantity,name='update_cart_item_quantity'),
+    path("batch/", cart_batch_update, name="cart_batch_update"),
 ]
@@ -1,6 +1,6 @@
 from django.db.models.functions import Coalesce,Greatest
 from django.db.models import F,Q,Value,Case,When,DecimalField,ExpressionWrapper
-from offer.selectors import get_active_offer_subqueries_cart
+from offer.selectors import get_active_offer_discounts
 from .models import *
 from functools import wraps
 from django.http import JsonResponse
@@ -9,7 +9,7 @@ from django.contrib import messages
 
 def get_annotated_cart_items(user):
     
-    product_offer_subquery, category_offer_subquery = get_active_offer_subqueries_cart()
+    product_offer_discount, category_offer_discount = get_active_offer_discounts("variant__product")
     return CartItems.objects.filter(
         cart__user=user
     ).select_related(
@@ -21,8 +21,8 @@ def get_annotated_cart_items(user):
         product_base_price = F('variant__base_price'),
         product_offer_price =F('variant__offer_price'),
         
-        offer_prod_val=Coalesce(product_offer_subquery, Value(0, output_field=DecimalField())),
-        offer_cat_val=Coalesce(category_offer_subquery, Value(0, output_field=DecimalField())),
+        offer_prod_val=product_offer_discount,
+        offer_cat_val=category_offer_discount,
         
         best_discount = Greatest("offer_prod_val","offer_cat_val"),
         
@@ -8,6 +8,8 @@ from products.models import *
 from django.views.decorators.http import require_POST
 from django.db import transaction
 from .utils import get_annotated_cart_items,verification_required
+from .counters import CART, adjust_count
+from .services import CartOperationError, apply_cart_operations, cart_changed, get_cart_summary
 from django.contrib.auth.decorators import login_required
 # Create your views here.
 class CartView(LoginRequiredMixin, ListView):
@@ -16,22 +18,15 @@ class CartView(LoginRequiredMixin, ListView):
     login_url = "login"
 
     def get_queryset(self):
-        user = self.request.user
-
-        cart, created = Cart.objects.get_or_create(user=user)
-
-        return get_annotated_cart_items(self.request.user).order_by("-item_added")
+        self.summary = get_cart_summary(self.request.user)
+        return self.summary.lines
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        cart, created = Cart.objects.get_or_create(user=self.request.user)     
-        cartitems = context['cartitems']   
-        
-
-        context["subtotal"] = sum(item.subtotal for item in cartitems)
-        context["total_price"] = sum(item.product_total for item in cartitems)
-        context["total_quantity"] = cart.total_quantity
-        context["total_savings"] = sum((item.actual_discount for item in cartitems))
+        context["subtotal"] = self.summary.subtotal
+        context["total_price"] = self.summary.cart_total_price
+        context["total_quantity"] = self.summary.total_quantity
+        context["total_savings"] = self.summary.cart_discount
 
         return context
 
@@ -99,6 +94,10 @@ def cart_item_add(request):
     # Get or create the cart item for the chosen variant
     item, created = CartItems.objects.get_or_create(cart=cart,variant=variant,size=cleaned_size,defaults={"quantity": quantity})
 
+    cart_changed(request.user.pk)
+    if created:
+        adjust_count(CART, request.user.pk, 1)
+
     # If the item already exists, increase the quantity
     if not created:
         new_quantity = item.quantity + quantity
@@ -131,6 +130,8 @@ def cart_item_remove(request):
     try:
         item = CartItems.objects.get(id=item_id, cart__user=request.user)
         item.delete()
+        adjust_count(CART, request.user.pk, -1)
+        cart_changed(request.user.pk)
         return JsonResponse({"status": "success", "message": "Item removed"})
     except CartItems.DoesNotExist:
         return JsonResponse({"status": "error", "message": "Item not found"})
@@ -168,7 +169,7 @@ def update_cart_item_quantity(request):
 
     # Fetching Item form the cart
     try:
-        item = CartItems.objects.get(id=item_id)
+        item = CartItems.objects.select_related("variant").get(id=item_id, cart__user=request.user)
     except CartItems.DoesNotExist:
         return JsonResponse(
             {"status": "error", "message": "Error found !!!"}, status=404
@@ -187,4 +188,24 @@ def update_cart_item_quantity(request):
         )
     item.quantity = quantity
     item.save()
+    cart_changed(request.user.pk)
     return JsonResponse({"status": "success", "message": "Quantity updated"})
+
+
+@require_POST
+@verification_required
+def cart_batch_update(request):
+    """Applies a list of add / set / remove operations at once and returns the new cart summary."""
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"status": "error", "message": "Invalid JSON"}, status=400)
+
+    try:
+        apply_cart_operations(request.user, data.get("operations") if isinstance(data, dict) else None)
+    except CartOperationError as error:
+        return JsonResponse(
+            {"status": "error", "message": str(error), "summary": get_cart_summary(request.user).as_json()},
+            status=400,
+        )
+    return JsonResponse({"status": "success", "summary": get_cart_summary(request.user).as_json()})
@@ -5,11 +5,12 @@ from django.views.generic import View
 from django.contrib import messages
 from decimal import Decimal
 from userFolder.wallet.models import Wallet
-from userFolder.cart.utils import get_annotated_cart_items
 from userFolder.order.models import OrderMain
+from userFolder.order.inventory import InsufficientStock
 from coupon.models import Coupon
 from django.utils import timezone
-from userFolder.payment.utils import calculate_cart_totals, sync_draft_order
+from userFolder.payment.utils import sync_draft_order
+from userFolder.cart.services import get_cart_summary
 from userFolder.cart.utils import verification_required
 from django.utils.decorators import method_decorator
 
@@ -17,24 +18,18 @@ from django.utils.decorators import method_decorator
 class CheckOutView(View):
     
     def get(self, request, *args, **kwargs):
-        try:
-            cart = Cart.objects.get(user=request.user)
-        except Cart.DoesNotExist:
-            return redirect('cart')
-
-        cart_items = get_annotated_cart_items(user=request.user)
-        
-        if not cart_items.exists():
+        summary = get_cart_summary(request.user)
+        if summary.is_empty:
             return redirect("products_page_user")
-        
-        for item in cart_items:
-            if int(item.variant.stock) <= 0 or item.quantity > item.variant.stock:
-                messages.error(request, "Remove the out-of-stock product from the cart to proceed")
-                return redirect("cart")
-        
+
+        if summary.out_of_stock_lines:
+            messages.error(request, "Remove the out-of-stock product from the cart to proceed")
+            return redirect("cart")
+        cart_items = summary.lines
+
         addresses = Address.objects.filter(user=request.user)
         
-        totals = calculate_cart_totals(cart_items=cart_items)
+        totals = summary.totals
         
         try:
             wallet = Wallet.objects.get(user=request.user)
@@ -73,8 +68,10 @@ class CheckOutView(View):
             except OrderMain.DoesNotExist:
                 if 'draft_order_id' in request.session:
                     del request.session['draft_order_id']
+            except InsufficientStock as e:
+                messages.error(request, str(e))
+                return redirect("cart")
         context = {
-            'cart': cart,
             'wallet': wallet,
             'coupons': coupons,
             'addresses': addresses,
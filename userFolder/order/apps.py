@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class OrderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'userFolder.order'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .sweeper import maybe_start_draft_sweeper
+
+        maybe_start_draft_sweeper()
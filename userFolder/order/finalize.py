@@ -0,0 +1,155 @@
+"""
+Placing an order once it is paid for (or accepted as COD).
+
+COD, Razorpay and wallet payments all end the same way: take the stock,
+debit the wallet, record the coupon use, mark the order and its items
+pending, empty the cart and queue the confirmation email. finalize_order
+does all of it in one short transaction. Stock goes down through
+decrement_stock: the order's variant rows are locked in id order with one
+SELECT, then every line is applied by a single conditional UPDATE whose
+affected-row count proves each line fit.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from coupon.models import Coupon, CouponUsage
+from products.models import ProductVariant
+from products.services import schedule_price_summary_refresh
+from userFolder.cart.counters import CART, set_count
+from userFolder.cart.models import CartItems
+from userFolder.cart.services import cart_changed
+from userFolder.wallet.models import Transaction, TransactionStatus, TransactionType, Wallet
+from .inventory import release_reservations, reserved_quantities
+from .utils import queue_order_success_email
+
+logger = logging.getLogger(__name__)
+
+
+class OrderFinalizationError(Exception):
+    """The order cannot be placed; the message is meant for the shopper."""
+
+
+def decrement_stock(lines, exclude=None):
+    """
+    Takes (variant_id, quantity, product_name) lines off the stock in one
+    UPDATE, keeping back units other shoppers have reserved (exclude is
+    passed to reserved_quantities, normally the order's own hold). Raises
+    OrderFinalizationError naming the first line that does not fit; call it
+    inside a transaction so a failure leaves the stock untouched.
+    """
+    quantities, names = {}, {}
+    for variant_id, quantity, product_name in lines:
+        quantities[variant_id] = quantities.get(variant_id, 0) + quantity
+        names.setdefault(variant_id, product_name)
+    if not quantities:
+        return
+    variant_ids = sorted(quantities)
+
+    # Id order, so two orders sharing variants always queue on the same row first
+    locked = {
+        pk: (stock, product_id)
+        for pk, stock, product_id in ProductVariant.objects.select_for_update()
+        .filter(pk__in=variant_ids).order_by("pk").values_list("pk", "stock", "product_id")
+    }
+    reserved = reserved_quantities(variant_ids, exclude)
+    required = {variant_id: quantities[variant_id] + reserved.get(variant_id, 0) for variant_id in variant_ids}
+    for variant_id in variant_ids:
+        if variant_id not in locked:
+            raise OrderFinalizationError(f"{names[variant_id]} is no longer available.")
+        if locked[variant_id][0] < required[variant_id]:
+            raise OrderFinalizationError(f"Out of stock: {names[variant_id]}")
+
+    def per_variant(values):
+        return Case(
+            *[When(pk=variant_id, then=Value(values[variant_id])) for variant_id in variant_ids],
+            output_field=IntegerField(),
+        )
+
+    updated = ProductVariant.objects.filter(
+        pk__in=variant_ids, stock__gte=per_variant(required)
+    ).update(stock=F("stock") - per_variant(quantities))
+    if updated != len(variant_ids):
+        raise OrderFinalizationError("Stock changed while placing the order. Please try again.")
+    # update() skips the post_save signal that keeps the listing summaries current
+    schedule_price_summary_refresh(product_ids={product_id for _, product_id in locked.values()})
+
+
+def _debit_wallet(order, amount):
+    wallet = Wallet.objects.select_for_update().filter(user=order.user).first()
+    if wallet is None:
+        raise OrderFinalizationError("Wallet not found.")
+    if wallet.balance < amount:
+        raise OrderFinalizationError("Insufficient wallet balance.")
+    wallet.balance -= amount
+    wallet.save(update_fields=["balance", "updated_at"])
+    Transaction.objects.create(
+        wallet=wallet,
+        transaction_type=TransactionType.DEBIT,
+        amount=amount,
+        description=f"Payment for order {order.order_id}",
+        status=TransactionStatus.COMPLETED,
+        related_order=order,
+    )
+
+
+def _record_coupon_use(order, captured):
+    """
+    captured: the money was already taken outside this transaction (Razorpay),
+    so a rollback would not return it. A reused one-time coupon is then only
+    logged; the payment is honoured.
+    """
+    coupon = Coupon.objects.select_for_update().filter(code=order.coupon_code).first()
+    if coupon is None:
+        return
+    if coupon.one_time_per_user and CouponUsage.objects.filter(coupon=coupon, user=order.user).exists():
+        if not captured:
+            raise OrderFinalizationError("Coupon already used")
+        logger.warning("One-time coupon %s reused by user %s on paid order %s", coupon.code, order.user_id, order.order_id)
+    Coupon.objects.filter(pk=coupon.pk).update(times_used=F("times_used") + 1)
+    CouponUsage.objects.create(
+        coupon=coupon,
+        user=order.user,
+        order=order,
+        discount_amount=order.coupon_discount,
+        # The total the coupon was applied to
+        cart_total_before_discount=order.total_price - order.discount_amount + order.shipping_amount,
+    )
+
+
+@transaction.atomic
+def finalize_order(order, *, payment_method, payment_status, is_paid, wallet_amount=Decimal("0.00"), **fields):
+    """
+    Places a draft order: stock, wallet debit of wallet_amount, coupon use,
+    status, cart and confirmation email, all or nothing. fields are extra
+    OrderMain values to store (Razorpay ids, final_price...). Raises
+    OrderFinalizationError.
+    """
+    decrement_stock(
+        order.items.filter(variant__isnull=False).values_list("variant_id", "quantity", "product_name"),
+        exclude={"order": order},
+    )
+    release_reservations(order)
+
+    if wallet_amount > 0:
+        _debit_wallet(order, wallet_amount)
+    if order.coupon_code:
+        _record_coupon_use(order, captured=payment_method == "razorpay")
+
+    order.order_status = "pending"
+    order.payment_method = payment_method
+    order.payment_status = payment_status
+    order.is_paid = is_paid
+    order.expires_at = None
+    for name, value in fields.items():
+        setattr(order, name, value)
+    order.save()
+    order.items.update(status="pending")
+
+    CartItems.objects.filter(cart__user=order.user).delete()
+    set_count(CART, order.user_id, 0)
+    cart_changed(order.user_id)
+    queue_order_success_email(order)
+    return order
@@ -0,0 +1,111 @@
+"""
+Stock reservations for draft orders.
+
+Creating or syncing a draft order holds its quantities in StockReservation
+rows that expire with the draft. Available stock is the variant's stock
+minus the live reservations, an indexed sum over (variant, expires_at), so
+units held by one checkout are not sold to another and a shopper who
+cannot get the last unit finds out before paying, not after. Payment turns
+the reservation into the real decrement; expired rows simply stop counting
+and release_expired_reservations deletes them in bulk.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Min, Sum
+from django.utils import timezone
+
+from products.models import ProductVariant
+from .models import StockReservation
+
+# How long a draft (and its reservation) is held once the shopper is sent to the payment gateway
+PAYMENT_HOLD = timedelta(minutes=30)
+RELEASE_BATCH_SIZE = 5000
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_name):
+        self.product_name = product_name
+        super().__init__(f"Out of stock: {product_name}")
+
+
+def reserved_quantities(variant_ids, exclude=None):
+    """
+    Live reserved units per variant id. exclude takes lookups for the
+    reservations that should not count, e.g. {"order": order} for an order's
+    own hold or {"order__user": user} for a shopper's own drafts.
+    """
+    reservations = StockReservation.objects.filter(variant_id__in=variant_ids, expires_at__gt=timezone.now())
+    if exclude:
+        reservations = reservations.exclude(**exclude)
+    return dict(
+        reservations.values("variant_id").annotate(reserved=Sum("quantity")).values_list("variant_id", "reserved")
+    )
+
+
+def available_stock(variant_ids, exclude=None):
+    """Stock minus live reservations per variant id, never below zero."""
+    reserved = reserved_quantities(variant_ids, exclude)
+    return {
+        variant_id: max(stock - reserved.get(variant_id, 0), 0)
+        for variant_id, stock in ProductVariant.objects.filter(pk__in=variant_ids).values_list("pk", "stock")
+    }
+
+
+@transaction.atomic
+def reserve_order(order, expires_at=None):
+    """
+    Replaces the order's reservations with its current items, held until
+    expires_at (the draft's own expiry by default). Raises InsufficientStock
+    if another live reservation or a sale took the units.
+
+    The touched variant rows are locked in id order only for this check and
+    insert, so two checkouts racing for the last unit serialize here for a
+    few milliseconds instead of at payment time.
+    """
+    expires_at = expires_at or order.expires_at
+    lines = list(
+        order.items.filter(variant__isnull=False)
+        .values("variant_id")
+        .annotate(quantity=Sum("quantity"), product_name=Min("product_name"))
+        .order_by("variant_id")
+    )
+    variant_ids = [line["variant_id"] for line in lines]
+    stock = dict(
+        ProductVariant.objects.select_for_update().filter(pk__in=variant_ids).order_by("pk").values_list("pk", "stock")
+    )
+    reserved = reserved_quantities(variant_ids, exclude={"order": order})
+    for line in lines:
+        variant_id = line["variant_id"]
+        if line["quantity"] > stock.get(variant_id, 0) - reserved.get(variant_id, 0):
+            raise InsufficientStock(line["product_name"])
+
+    StockReservation.objects.filter(order=order).delete()
+    StockReservation.objects.bulk_create([
+        StockReservation(order=order, variant_id=line["variant_id"], quantity=line["quantity"], expires_at=expires_at)
+        for line in lines
+    ])
+
+
+def release_reservations(order):
+    """Frees an order's held units (payment failed or abandoned). Takes an OrderMain or its order_id."""
+    lookup = {"order__order_id": order} if isinstance(order, str) else {"order": order}
+    StockReservation.objects.filter(**lookup).delete()
+
+
+def release_expired_reservations(batch_size=RELEASE_BATCH_SIZE):
+    """
+    Deletes reservations that have expired, batch by batch so no statement
+    holds locks for long. They no longer count towards availability anyway;
+    this only keeps the table small. Returns the number of rows removed.
+    """
+    released = 0
+    while True:
+        ids = list(
+            StockReservation.objects.filter(expires_at__lte=timezone.now())
+            .order_by("expires_at")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return released
+        released += StockReservation.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,193 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    OrderItem, SalesDay, ProductSalesRank, CategorySalesRank, SalesLeaderboardState,
+)
+
+COUNTED_STATUS = 'delivered'
+# Rolling windows: number of days including today
+WINDOW_DAYS = {'today': 1, '7d': 7, '30d': 30}
+
+LINE_REVENUE = ExpressionWrapper(
+    F('price_at_purchase') * F('quantity'),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+def _window_start(window, today):
+    return today - timedelta(days=WINDOW_DAYS[window] - 1)
+
+
+def _windows_for_day(day, today):
+    windows = ['all']
+    windows += [window for window in WINDOW_DAYS if day >= _window_start(window, today)]
+    return windows
+
+
+def _add(model, lookup, quantity, revenue, **extra):
+    """Adds to a counter row, creating it on first use."""
+    try:
+        with transaction.atomic():
+            _, created = model.objects.get_or_create(
+                **lookup, defaults={'quantity': quantity, 'revenue': revenue, **extra}
+            )
+    except IntegrityError:
+        created = False
+    if not created:
+        model.objects.filter(**lookup).update(
+            quantity=F('quantity') + quantity,
+            revenue=F('revenue') + revenue,
+        )
+
+
+def apply_order_sales(order, sign):
+    """
+    Adds (sign=1) or removes (sign=-1) an order's items from the counters.
+    Called when an order moves into or out of delivered.
+    """
+    today = timezone.localdate()
+    day = timezone.localdate(order.created_at)
+    windows = _windows_for_day(day, today)
+
+    lines = (
+        OrderItem.objects.filter(order=order, variant__isnull=False)
+        .values(product_id=F('variant__product_id'), category_id=F('variant__product__category_id'))
+        .annotate(sold=Sum('quantity'), earned=Sum(LINE_REVENUE))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        # Held until commit, so a concurrent rebuild or roll neither drops nor double-counts these
+        if _bring_current(_lock_state()):
+            # Built from history just now, which already reflects this order
+            return
+        for line in lines:
+            quantity = line['sold'] * sign
+            revenue = line['earned'] * sign
+            _add(SalesDay, {'product_id': line['product_id'], 'day': day}, quantity, revenue,
+                 category_id=line['category_id'])
+            for window in windows:
+                _add(ProductSalesRank, {'window': window, 'product_id': line['product_id']}, quantity, revenue)
+                _add(CategorySalesRank, {'window': window, 'category_id': line['category_id']}, quantity, revenue)
+
+
+def _rebuild_window(window, today):
+    days = SalesDay.objects.all()
+    if window != 'all':
+        days = days.filter(day__gte=_window_start(window, today))
+
+    ProductSalesRank.objects.filter(window=window).delete()
+    ProductSalesRank.objects.bulk_create(
+        [
+            ProductSalesRank(window=window, product_id=row['product_id'],
+                             quantity=row['quantity'], revenue=row['revenue'])
+            for row in days.values('product_id').annotate(quantity=Sum('quantity'), revenue=Sum('revenue')).order_by()
+        ],
+        batch_size=1000,
+    )
+    CategorySalesRank.objects.filter(window=window).delete()
+    CategorySalesRank.objects.bulk_create(
+        [
+            CategorySalesRank(window=window, category_id=row['category_id'],
+                              quantity=row['quantity'], revenue=row['revenue'])
+            for row in days.values('category_id').annotate(quantity=Sum('quantity'), revenue=Sum('revenue')).order_by()
+        ],
+        batch_size=1000,
+    )
+
+
+def _lock_state():
+    """
+    The state row, created if missing and locked FOR UPDATE. Every writer of
+    the counters holds it, so two rebuilds never interleave their delete and
+    bulk_create, and order increments wait for a rebuild to finish.
+    """
+    SalesLeaderboardState.objects.get_or_create(pk=1)
+    return SalesLeaderboardState.objects.select_for_update().get(pk=1)
+
+
+@transaction.atomic
+def roll_windows(today=None):
+    """Recomputes today / 7d / 30d from the daily rows once the date has moved on."""
+    state = _lock_state()
+    today = today or timezone.localdate()
+    for window in WINDOW_DAYS:
+        _rebuild_window(window, today)
+    state.windows_day = today
+    state.save(update_fields=['windows_day'])
+
+
+@transaction.atomic
+def rebuild_leaderboard():
+    """Recomputes every counter from delivered order history."""
+    state = _lock_state()
+    today = timezone.localdate()
+    SalesDay.objects.all().delete()
+    history = (
+        OrderItem.objects.filter(order__order_status=COUNTED_STATUS, variant__isnull=False)
+        .values(
+            product_id=F('variant__product_id'),
+            category_id=F('variant__product__category_id'),
+            day=TruncDate('order__created_at'),
+        )
+        # Aliased so the aggregates don't shadow OrderItem.quantity inside LINE_REVENUE
+        .annotate(sold=Sum('quantity'), earned=Sum(LINE_REVENUE))
+        .order_by()
+    )
+    SalesDay.objects.bulk_create(
+        [
+            SalesDay(product_id=row['product_id'], category_id=row['category_id'], day=row['day'],
+                     quantity=row['sold'], revenue=row['earned'])
+            for row in history
+        ],
+        batch_size=1000,
+    )
+
+    for window in ['all', *WINDOW_DAYS]:
+        _rebuild_window(window, today)
+    state.windows_day = today
+    state.rebuilt_at = timezone.now()
+    state.save(update_fields=['windows_day', 'rebuilt_at'])
+
+
+def _bring_current(state):
+    """Rebuild / roll for a state row locked by the caller. True if rebuilt from history."""
+    if state.rebuilt_at is None:
+        rebuild_leaderboard()
+        return True
+    if state.windows_day != timezone.localdate():
+        roll_windows()
+    return False
+
+
+def ensure_leaderboard_current():
+    """Builds the counters on first use and rolls the windows on a new day. True if rebuilt."""
+    state = SalesLeaderboardState.objects.filter(pk=1).values('windows_day', 'rebuilt_at').first()
+    if state is not None and state['rebuilt_at'] is not None and state['windows_day'] == timezone.localdate():
+        return False
+    # Checked again under the lock: a request that waited on another's rebuild finds it done
+    with transaction.atomic():
+        return _bring_current(_lock_state())
+
+
+def top_products(window='all', limit=5):
+    ensure_leaderboard_current()
+    return (
+        ProductSalesRank.objects.filter(window=window, quantity__gt=0)
+        .select_related('product__category')
+        .order_by('-quantity', 'product_id')[:limit]
+    )
+
+
+def top_categories(window='all', limit=5):
+    ensure_leaderboard_current()
+    return (
+        CategorySalesRank.objects.filter(window=window, revenue__gt=0)
+        .select_related('category')
+        .order_by('-revenue', 'category_id')[:limit]
+    )
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0020_alter_ordermain_options_orderitem_updated_at_and_more'),
+        ('products', '0021_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesLeaderboardState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('windows_day', models.DateField(blank=True, null=True)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CategorySalesRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('today', 'Today'), ('7d', 'Last 7 days'), ('30d', 'Last 30 days'), ('all', 'All time')], max_length=10)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_ranks', to='products.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window', '-revenue'], name='order_categ_window_2f1c3e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('window', 'category'), name='unique_category_sales_rank')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSalesRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('today', 'Today'), ('7d', 'Last 7 days'), ('30d', 'Last 30 days'), ('all', 'All time')], max_length=10)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_ranks', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window', '-quantity'], name='order_produ_window_bb5dbe_idx')],
+                'constraints': [models.UniqueConstraint(fields=('window', 'product'), name='unique_product_sales_rank')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_days', to='products.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_days', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='order_sales_day_9e3e35_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='unique_sales_day_product')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0021_sales_leaderboard'),
+        ('products', '0022_co_purchase_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='order.ordermain')),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='products.productvariant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['variant', 'expires_at'], include=('quantity',), name='reservation_live_idx'), models.Index(fields=['expires_at'], name='reservation_expiry_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order', 'variant'), name='unique_reservation_order_variant')],
+            },
+        ),
+    ]
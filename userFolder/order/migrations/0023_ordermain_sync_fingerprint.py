@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0022_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordermain',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
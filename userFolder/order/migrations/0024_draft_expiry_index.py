@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0023_ordermain_sync_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ordermain',
+            index=models.Index(condition=models.Q(('order_status', 'draft')), fields=['order_status', 'expires_at'], name='order_draft_expiry_idx'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.db import models
-from products.models import ProductVariant
+from products.models import ProductVariant, Product, Category
 from accounts.models import CustomUser
 from django.utils import timezone
 import random
@@ -116,6 +116,8 @@ class OrderMain(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_item_updated_at = models.DateTimeField(null=True, blank=True)        
+    # Draft orders only: hash of the cart and price inputs of the last sync_draft_order
+    sync_fingerprint = models.CharField(max_length=64, blank=True, default='', editable=False)
     
     def get_progress_status(self):
         status_map = {
@@ -145,6 +147,14 @@ class OrderMain(models.Model):
     # if don't use that we call like has_return_requested() like this 
     class Meta:
         ordering = ['-last_item_updated_at', '-updated_at']
+        indexes = [
+            # Only drafts carry an expiry worth scanning, see order/sweeper.py
+            models.Index(
+                fields=['order_status', 'expires_at'],
+                condition=models.Q(order_status='draft'),
+                name='order_draft_expiry_idx',
+            ),
+        ]
         
     def is_draft(self):
         return self.status == 'draft'
@@ -271,3 +281,80 @@ class CancelItem(models.Model):
 
     def __str__(self):
         return f"{self.order_item.product_name} ({self.quantity})"
+
+
+SALES_WINDOW_CHOICES = [
+    ('today', 'Today'),
+    ('7d', 'Last 7 days'),
+    ('30d', 'Last 30 days'),
+    ('all', 'All time'),
+]
+
+class SalesDay(models.Model):
+    """Delivered quantity / revenue per product and order day, the source for the leaderboards."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_days')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='sales_days')
+    day = models.DateField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_sales_day_product'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+class ProductSalesRank(models.Model):
+    window = models.CharField(max_length=10, choices=SALES_WINDOW_CHOICES)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_ranks')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['window', 'product'], name='unique_product_sales_rank'),
+        ]
+        indexes = [
+            models.Index(fields=['window', '-quantity']),
+        ]
+
+class CategorySalesRank(models.Model):
+    window = models.CharField(max_length=10, choices=SALES_WINDOW_CHOICES)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='sales_ranks')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['window', 'category'], name='unique_category_sales_rank'),
+        ]
+        indexes = [
+            models.Index(fields=['window', '-revenue']),
+        ]
+
+class SalesLeaderboardState(models.Model):
+    """Single row (pk=1): the day the today/7d/30d windows were last rolled for."""
+    windows_day = models.DateField(null=True, blank=True)
+    rebuilt_at = models.DateTimeField(null=True, blank=True)
+
+class StockReservation(models.Model):
+    """Units of a variant held for a draft order until expires_at, see order/inventory.py."""
+    order = models.ForeignKey(OrderMain, on_delete=models.CASCADE, related_name='reservations')
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'variant'], name='unique_reservation_order_variant'),
+        ]
+        indexes = [
+            # Live sum per variant: range scan on expires_at, quantity read from the index
+            models.Index(fields=['variant', 'expires_at'], include=['quantity'], name='reservation_live_idx'),
+            models.Index(fields=['expires_at'], name='reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.variant_id} x {self.quantity} for {self.order_id}"
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .leaderboard import COUNTED_STATUS, apply_order_sales
+from .models import OrderMain
+
+
+@receiver(post_init, sender=OrderMain)
+def remember_order_status(sender, instance, **kwargs):
+    instance._loaded_order_status = instance.order_status
+
+
+@receiver(post_save, sender=OrderMain)
+def update_sales_leaderboard(sender, instance, created, **kwargs):
+    previous = None if created else instance._loaded_order_status
+    current = instance.order_status
+    instance._loaded_order_status = current
+    if previous == current:
+        return
+    if current == COUNTED_STATUS:
+        apply_order_sales(instance, 1)
+    elif previous == COUNTED_STATUS:
+        apply_order_sales(instance, -1)
@@ -0,0 +1,103 @@
+"""
+Removes draft orders that expired without being paid.
+
+Drafts are only meant to live for the few minutes of a checkout, but an
+abandoned one stays in OrderMain (and its items in OrderItem) until
+something removes it. sweep_expired_drafts walks them oldest first through
+the partial (order_status, expires_at) index, one bounded batch per short
+transaction. Drafts that were sent to Razorpay are marked failed instead of
+deleted, so a late payment callback still finds its order.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .inventory import release_expired_reservations
+from .models import OrderItem, OrderMain, StockReservation
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 1000
+# Expired drafts are left alone this long, for callbacks racing the expiry
+SWEEP_GRACE = timedelta(minutes=60)
+
+
+def _sweep_batch(cutoff, batch_size, mark_failed):
+    with transaction.atomic():
+        drafts = list(
+            OrderMain.objects.filter(order_status='draft', expires_at__lt=cutoff)
+            .order_by('expires_at')
+            .values_list('pk', 'razorpay_order_id')[:batch_size]
+        )
+        if not drafts:
+            return 0, 0
+        if mark_failed:
+            to_fail, to_delete = [pk for pk, _ in drafts], []
+        else:
+            to_fail = [pk for pk, razorpay_order_id in drafts if razorpay_order_id]
+            to_delete = [pk for pk, razorpay_order_id in drafts if not razorpay_order_id]
+
+        # Both statements re-check the status: a payment may have placed the order since the select
+        failed = 0
+        if to_fail:
+            failed = OrderMain.objects.filter(pk__in=to_fail, order_status='draft').update(
+                order_status='failed', expires_at=None
+            )
+            OrderItem.objects.filter(order_id__in=to_fail, order__order_status='failed').update(status='failed')
+            StockReservation.objects.filter(order_id__in=to_fail).delete()
+        deleted = 0
+        if to_delete:
+            deleted = OrderMain.objects.filter(pk__in=to_delete, order_status='draft').delete()[1].get(
+                OrderMain._meta.label, 0
+            )
+        return deleted, failed
+
+
+def sweep_expired_drafts(batch_size=SWEEP_BATCH_SIZE, grace=SWEEP_GRACE, mark_failed=False, max_batches=None):
+    """
+    Deletes (or with mark_failed, fails) drafts that expired more than grace
+    ago, batch_size at a time. Returns (deleted, failed, seconds).
+    """
+    started = time.perf_counter()
+    cutoff = timezone.now() - grace
+    deleted = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        batch_deleted, batch_failed = _sweep_batch(cutoff, batch_size, mark_failed)
+        if not batch_deleted and not batch_failed:
+            break
+        deleted += batch_deleted
+        failed += batch_failed
+        batches += 1
+    release_expired_reservations()
+    return deleted, failed, time.perf_counter() - started
+
+
+def start_draft_sweeper(interval):
+    """Runs sweep_expired_drafts every interval seconds in a daemon thread of this process."""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                deleted, failed, seconds = sweep_expired_drafts()
+                if deleted or failed:
+                    logger.info("Swept %s expired drafts (%s failed) in %.2fs", deleted, failed, seconds)
+            except Exception:
+                logger.exception("Draft sweep failed")
+            finally:
+                # Threads get their own connection, don't leave it open
+                connection.close()
+
+    thread = threading.Thread(target=run, name="draft-sweeper", daemon=True)
+    thread.start()
+    return thread
+
+
+def maybe_start_draft_sweeper():
+    interval = getattr(settings, "DRAFT_SWEEPER_INTERVAL", None)
+    if interval:
+        start_draft_sweeper(interval)
@@ -1,30 +1,23 @@
-from django.template.loader import get_template, render_to_string
-from django.core.mail import EmailMultiAlternatives
+from django.template.loader import get_template
 from io import BytesIO
 from django.http import HttpResponse
 from xhtml2pdf import pisa
 
-def send_order_success_email(order):
+from accounts.outbox import queue_email
+
+def queue_order_success_email(order):
     """
-    Utility to send order success email.
+    Queues the order success email; call it in the transaction that places
+    the order. Queued at most once per order.
     """
-    try:
-        user_email = order.user.email
-        html_message = render_to_string(
-            'email/order_success_mail.html',
-            {'order': order, 'items': order.items.all()}
-        )
-        msg = EmailMultiAlternatives(
-            subject='Order Successful - SecondStrap',
-            body='Your order has been placed successfully!',
-            to=[user_email],
-        )
-        msg.attach_alternative(html_message, 'text/html')
-        msg.send()
-        return True
-    except Exception as e:
-        print(f"Email sending failed: {e}")
-        return False
+    queue_email(
+        order.user.email,
+        'Order Successful - SecondStrap',
+        'Your order has been placed successfully!',
+        'email/order_success_mail.html',
+        {'order': order, 'items': order.items.all()},
+        key=f'order-success:{order.order_id}',
+    )
 
 def render_to_pdf(template_src, context_dict={}):
     template = get_template(template_src)
@@ -1,10 +1,9 @@
 import json
 from django.shortcuts import render, redirect,get_object_or_404,HttpResponse, Http404
-from django.template.loader import render_to_string
-from django.core.mail import EmailMultiAlternatives
 from django.contrib.auth.decorators import login_required
 from userFolder.userprofile.models import Address
 from userFolder.cart.models import Cart
+from userFolder.cart.services import get_cart_summary
 from userFolder.wallet.models import *
 from django.db.models import F
 from .models import *
@@ -13,12 +12,14 @@ from django.contrib import messages
 from django.db import transaction
 from django.urls import reverse
 from decimal import Decimal
-from .utils import render_to_pdf, send_order_success_email
+from .utils import render_to_pdf, queue_order_success_email
 from django.http import JsonResponse
 from django.db import transaction
 from django.views.decorators.cache import never_cache
-from userFolder.payment.utils import validate_stock_and_cart,validate_address,calculate_cart_totals
+from userFolder.payment.utils import validate_address,create_draft_order
 from coupon.models import *
+from .finalize import OrderFinalizationError, finalize_order
+from .inventory import InsufficientStock
 
 @require_POST
 @login_required(login_url='login')
@@ -42,75 +43,27 @@ def order(request):
             messages.error(request,'Orders above 1000 , Only Razorpay !!')
             return redirect('checkout')
 
-        for item in draft_order.items.select_related('variant'):
-            try:
-                variant = ProductVariant.objects.select_for_update().get(id=item.variant.id)
-            except ProductVariant.DoesNotExist:
-                messages.error(request, f"{item.product_name} is no longer available.")
-                return render(request, 'orders/order_error.html')
-
-            if item.quantity > variant.stock:
-                messages.error(request, f"Out of stock: {item.product_name}")
-                return render(request, 'orders/order_error.html')
-
-            variant.stock -= item.quantity
-            variant.save()
-
-        if draft_order.wallet_deduction > 0:
-            try:
-                wallet = Wallet.objects.select_for_update().get(user=user)
-
-                if wallet.balance < draft_order.wallet_deduction:
-                    messages.error(request, "Insufficient wallet balance.")
-                    return render(request, 'orders/order_error.html')
-
-                wallet.balance -= draft_order.wallet_deduction
-                wallet.save()
-
-                Transaction.objects.create(
-                    wallet=wallet,
-                    transaction_type='debit',
-                    amount=draft_order.wallet_deduction,
-                    description=f'Payment for order {draft_order.order_id}'
-                )
-            except Wallet.DoesNotExist:
-                messages.error(request, "Wallet not found.")
-                return render(request, 'orders/order_error.html')
-
-        draft_order.order_status = 'pending'
-        draft_order.payment_method = 'cod'
-        draft_order.payment_status = 'pending'
-        draft_order.is_paid = False
-        draft_order.expires_at = None
-        draft_order.save()
-
-        order = draft_order
-
-        if order.coupon_code:
-            try:
-                coupon = Coupon.objects.select_for_update().get(code=order.coupon_code)
-                coupon.times_used += 1
-                coupon.save()
-
-                CouponUsage.objects.create(
-                    coupon=coupon,
-                    user=user,
-                    order=order,
-                    discount_amount=order.coupon_discount,
-                    cart_total_before_discount=order.final_price - order.discount_amount
-                )
-            except Coupon.DoesNotExist:
-                pass
-
-        Cart.objects.filter(user=user).delete()
+        try:
+            order = finalize_order(
+                draft_order,
+                payment_method='cod',
+                payment_status='pending',
+                is_paid=False,
+                wallet_amount=draft_order.wallet_deduction,
+            )
+        except OrderFinalizationError as e:
+            messages.error(request, str(e))
+            return render(request, 'orders/order_error.html')
 
         return redirect('order_processing_animation', order_id=order.order_id)
     try:
-        cart_items, error = validate_stock_and_cart(user)
+        summary = get_cart_summary(user)
+        error = summary.validation_error()
         if error:
-            return error
+            messages.error(request, error.get('error', 'Validation error'))
+            return redirect('checkout')
 
-        totals = calculate_cart_totals(cart_items)
+        totals = summary.totals
 
         if totals['grand_total'] > 2000:
             messages.error(request, 'Orders above ₹1000 are allowed only via UPI.')
@@ -118,61 +71,35 @@ def order(request):
 
         address, error = validate_address(request=request, user=user)
         if error:
-            return error
+            messages.error(request, error.get('error', 'Validation error'))
+            return redirect('checkout')
 
         payment_method = request.POST.get('payment_method')
         if not payment_method:
             messages.info(request, 'Select a payment method')
             return redirect('checkout')
 
-        order = OrderMain.objects.create(
-            user=user,
-            shipping_address_name=address.full_name,
-            shipping_address_line_1=address.address_line_1,
-            shipping_city=address.city,
-            shipping_state=address.state,
-            shipping_pincode=address.postal_code,
-            shipping_phone=address.phone_number,
+        # Placed through a draft, the same way as a checkout that already had one
+        order, error = create_draft_order(user=user, address=address, cart_items=summary.lines, totals=totals)
+        if error:
+            messages.error(request, error.get('error', 'Validation error'))
+            return redirect('checkout')
+
+        finalize_order(
+            order,
             payment_method=payment_method,
-            order_status='pending',
+            payment_status='pending',
             is_paid=False,
-            total_price=totals['subtotal'],
-            discount_amount=totals['cart_discount'],
-            shipping_amount=totals['shipping'],
-            final_price=totals['grand_total']
         )
-
-        variant_ids = [item.variant.id for item in cart_items]
-        variants = ProductVariant.objects.select_for_update().filter(id__in=variant_ids)
-        variant_map = {v.id: v for v in variants}
-
-        order_items = []
-        variants_to_update = []
-
-        for item in cart_items:
-            variant = variant_map[item.variant.id]
-
-            order_items.append(
-                OrderItem(
-                    order=order,
-                    variant=variant,
-                    product_name=variant.product.name,
-                    quantity=item.quantity,
-                    price_at_purchase=item.final_price
-                )
-            )
-
-            variant.stock -= item.quantity
-            variants_to_update.append(variant)
-
-        OrderItem.objects.bulk_create(order_items)
-        ProductVariant.objects.bulk_update(variants_to_update, ['stock'])
-
-        cart_items.delete()
         request.session['order_id'] = order.order_id
 
         return redirect('order_processing_animation', order_id=order.order_id)
 
+    except (InsufficientStock, OrderFinalizationError) as e:
+        # The draft is already written, undo it with the rest
+        transaction.set_rollback(True)
+        messages.error(request, str(e))
+        return redirect('checkout')
     except Exception as e:
         print(f"Order error: {e}")
         messages.error(request, "Something went wrong. Please try again.")
@@ -205,7 +132,7 @@ def order_processing_animation_view(request, order_id):
 @never_cache
 def send_order_email_ajax(request, order_id):
     """
-    AJAX endpoint to send order confirmation email.
+    AJAX endpoint to queue the order confirmation email (a no-op once finalize_order queued it).
     """
     order = get_object_or_404(OrderMain, order_id=order_id)
     
@@ -222,10 +149,9 @@ def send_order_email_ajax(request, order_id):
     
     if not request.session.get(f'email_sent_{order_id}'):
         try:
-            from .utils import send_order_success_email
-            send_order_success_email(order)
+            queue_order_success_email(order)
             request.session[f'email_sent_{order_id}'] = True
-            return JsonResponse({'status': 'success', 'message': 'Email sent'})
+            return JsonResponse({'status': 'success', 'message': 'Email queued'})
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
     else:
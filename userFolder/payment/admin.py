@@ -1,8 +1,25 @@
 from django.contrib import admin
-from .models import PaymentFailure
+from .models import PaymentAttempt, PaymentEvent, PaymentFailure
 # Register your models here.
 @admin.register(PaymentFailure)
 class PaymentFailureAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'failure_type', 'error_code', 'amount', 'created_at']
     list_filter = ['failure_type', 'created_at']
     search_fields = ['razorpay_order_id', 'user__username', 'user__email', 'error_message']
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'source', 'razorpay_order_id', 'razorpay_payment_id', 'status', 'attempts', 'created_at']
+    list_filter = ['status', 'source', 'event']
+    search_fields = ['event_id', 'razorpay_order_id', 'razorpay_payment_id']
+    readonly_fields = ['created_at', 'processed_at']
+
+
+@admin.register(PaymentAttempt)
+class PaymentAttemptAdmin(admin.ModelAdmin):
+    list_display = ['id', 'razorpay_order_id', 'order', 'wallet_transaction', 'amount', 'status', 'created_at', 'completed_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['razorpay_order_id', 'razorpay_payment_id', 'order__order_id']
+    raw_id_fields = ['order', 'wallet_transaction']
+    readonly_fields = ['created_at', 'completed_at']
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PaymentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'userFolder.payment'
+
+    def ready(self):
+        from .events import maybe_start_event_worker
+
+        maybe_start_event_worker()
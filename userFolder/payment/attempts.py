@@ -0,0 +1,63 @@
+"""
+PaymentAttempt bookkeeping.
+
+Every Razorpay order the shop creates gets a PaymentAttempt row pointing at
+the checkout order or wallet transaction it pays for. Whoever hears back
+from Razorpay (callback, webhook worker, reconciliation) resolves the
+Razorpay order id with one unique-index lookup through find_attempt, and
+retries keep their earlier attempts instead of overwriting them.
+"""
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import PaymentAttempt, PaymentAttemptStatus
+
+
+def start_attempt(razorpay_order, *, order=None, wallet_transaction=None):
+    """Records a Razorpay order (the order.create response) for a checkout order or a wallet top-up."""
+    return PaymentAttempt.objects.create(
+        razorpay_order_id=razorpay_order["id"],
+        order=order,
+        wallet_transaction=wallet_transaction,
+        amount=Decimal(razorpay_order["amount"]) / 100,
+    )
+
+
+def find_attempt(razorpay_order_id, lock=False):
+    """The attempt for a Razorpay order id, with its order or transaction, or None."""
+    if not razorpay_order_id:
+        return None
+    attempts = PaymentAttempt.objects.select_related("order", "wallet_transaction")
+    if lock:
+        attempts = attempts.select_for_update(of=("self",))
+    try:
+        return attempts.get(razorpay_order_id=razorpay_order_id)
+    except PaymentAttempt.DoesNotExist:
+        return None
+
+
+def close_attempt(attempt, status, razorpay_payment_id=""):
+    """
+    Moves an open attempt to paid / failed / expired. Only a payment changes
+    a closed attempt: money can still arrive after the shopper gave up.
+    """
+    if attempt is None:
+        return
+    closable = [PaymentAttemptStatus.CREATED]
+    if status == PaymentAttemptStatus.PAID:
+        closable += [PaymentAttemptStatus.FAILED, PaymentAttemptStatus.EXPIRED]
+    now = timezone.now()
+    updated = PaymentAttempt.objects.filter(pk=attempt.pk, status__in=closable).update(
+        status=status, razorpay_payment_id=razorpay_payment_id or "", completed_at=now
+    )
+    if updated:
+        attempt.status, attempt.razorpay_payment_id, attempt.completed_at = status, razorpay_payment_id or "", now
+
+
+def fail_open_attempts(order):
+    """Fails the order's attempts still waiting for a payment (payment failed or dismissed)."""
+    lookup = {"order__order_id": order} if isinstance(order, str) else {"order": order}
+    PaymentAttempt.objects.filter(status=PaymentAttemptStatus.CREATED, **lookup).update(
+        status=PaymentAttemptStatus.FAILED, completed_at=timezone.now()
+    )
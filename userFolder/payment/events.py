@@ -0,0 +1,283 @@
+"""
+Payment confirmation off the request path.
+
+The Razorpay webhook and the checkout callback used to place the order
+inside the request: signature check, a payment.fetch round trip to
+Razorpay, stock, wallet, coupon and cart, all while the shopper's browser
+waited on a web worker. Now both only verify the signature and write a
+PaymentEvent row (record_event); the browser is sent to a page that polls
+the order's status. process_pending_events, run by the
+process_payment_events command or an in-process thread, claims pending
+events and places the orders, so a slow gateway only slows the worker.
+
+Processing is idempotent per razorpay_payment_id: a payment whose webhook
+and callback both arrive, or a webhook delivered twice, places the order
+once. Events that hit a gateway error stay pending and are retried up to
+MAX_ATTEMPTS times.
+"""
+import logging
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from userFolder.order.finalize import OrderFinalizationError, finalize_order
+from userFolder.order.inventory import release_reservations
+from userFolder.order.models import OrderMain
+from . import gateway
+from .attempts import close_attempt, find_attempt
+from .models import PaymentAttempt, PaymentAttemptStatus, PaymentEvent, PaymentEventSource, PaymentEventStatus, PaymentFailure
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+EVENT_BATCH_SIZE = 100
+# Webhook events that mean money was taken; everything else is stored and ignored
+PAYMENT_EVENTS = ("payment.captured", "order.paid")
+PAID_STATUSES = ("authorized", "captured")
+
+
+class EventSkipped(Exception):
+    """Nothing to do for this event; the message says why."""
+
+
+def record_event(event_id, source, event, razorpay_order_id="", razorpay_payment_id="", payload=None):
+    """Stores an event once; a redelivery of the same event_id is a no-op. Returns True if it was new."""
+    try:
+        with transaction.atomic():
+            PaymentEvent.objects.create(
+                event_id=event_id,
+                source=source,
+                event=event,
+                razorpay_order_id=razorpay_order_id or "",
+                razorpay_payment_id=razorpay_payment_id or "",
+                payload=payload or {},
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def record_webhook(event_id, body):
+    """Stores a verified webhook body (already parsed JSON)."""
+    payment = body.get("payload", {}).get("payment", {}).get("entity", {})
+    return record_event(
+        event_id,
+        PaymentEventSource.WEBHOOK,
+        body.get("event", ""),
+        razorpay_order_id=payment.get("order_id"),
+        razorpay_payment_id=payment.get("id"),
+        payload=body,
+    )
+
+
+def record_callback(razorpay_order_id, razorpay_payment_id, razorpay_signature):
+    """Stores the signed fields checkout.js posted back after a payment."""
+    return record_event(
+        f"callback:{razorpay_payment_id}",
+        PaymentEventSource.CALLBACK,
+        "checkout.callback",
+        razorpay_order_id=razorpay_order_id,
+        razorpay_payment_id=razorpay_payment_id,
+        payload={"razorpay_signature": razorpay_signature},
+    )
+
+
+def _payment_for(event):
+    """The Razorpay payment entity behind an event; callbacks fetch it, webhooks carry it signed."""
+    if event.source == PaymentEventSource.WEBHOOK:
+        if event.event not in PAYMENT_EVENTS:
+            raise EventSkipped(f"{event.event} events are not processed")
+        return event.payload["payload"]["payment"]["entity"]
+    # Callback and reconcile events only name the payment
+    return gateway.fetch_payment(event.razorpay_payment_id)
+
+
+def _fail_order(order, razorpay_order_id, message):
+    order.order_status = "failed"
+    order.save(update_fields=["order_status"])
+    order.items.update(status="failed")
+    release_reservations(order)
+    PaymentFailure.objects.create(
+        user=order.user,
+        razorpay_order_id=razorpay_order_id,
+        amount=order.final_price,
+        failure_type="CONFIRMATION_FAILED",
+        error_message=message,
+        user_email=order.user.email,
+        user_phone=order.shipping_phone,
+    )
+
+
+def _apply(event):
+    """Places the order an event pays for. Raises EventSkipped, or GatewayUnavailable to retry later."""
+    if PaymentEvent.objects.filter(
+        razorpay_payment_id=event.razorpay_payment_id, status=PaymentEventStatus.PROCESSED
+    ).exclude(pk=event.pk).exists():
+        raise EventSkipped("Payment already processed")
+    # Fetched before any order row is locked, so a slow gateway holds no locks
+    payment = _payment_for(event)
+
+    attempt = find_attempt(event.razorpay_order_id, lock=True)
+    if attempt is None or attempt.order_id is None:
+        raise EventSkipped("No checkout order for this Razorpay order (wallet top-up or unknown)")
+    order = OrderMain.objects.select_for_update().get(pk=attempt.order_id)
+    if order.order_status not in ("draft", "failed"):
+        raise EventSkipped("Order already placed")
+
+    if payment.get("order_id") != event.razorpay_order_id or payment.get("status") not in PAID_STATUSES:
+        close_attempt(attempt, PaymentAttemptStatus.FAILED)
+        _fail_order(order, event.razorpay_order_id, "Payment was not completed.")
+        return "Payment was not completed."
+    close_attempt(attempt, PaymentAttemptStatus.PAID, event.razorpay_payment_id)
+    paid_amount = Decimal(payment["amount"]) / 100
+    if abs(paid_amount - order.final_price) > Decimal("0.01"):
+        message = f"Payment amount mismatch. Expected ₹{order.final_price}, got ₹{paid_amount}"
+        _fail_order(order, event.razorpay_order_id, message)
+        return message
+
+    try:
+        finalize_order(
+            order,
+            payment_method="razorpay",
+            payment_status="paid",
+            is_paid=True,
+            wallet_amount=order.wallet_deduction,
+            razorpay_order_id=event.razorpay_order_id,
+            razorpay_payment_id=event.razorpay_payment_id,
+            razorpay_signature=event.payload.get("razorpay_signature", order.razorpay_signature or ""),
+        )
+    except OrderFinalizationError as e:
+        _fail_order(order, event.razorpay_order_id, str(e))
+        return str(e)
+    return ""
+
+
+def process_event(event):
+    """Applies one claimed event and records the outcome on it."""
+    try:
+        with transaction.atomic():
+            event.last_error = _apply(event)
+            event.status = PaymentEventStatus.PROCESSED
+    except EventSkipped as e:
+        event.status = PaymentEventStatus.IGNORED
+        event.last_error = str(e)
+    except Exception as e:
+        event.attempts += 1
+        event.last_error = repr(e)
+        if event.attempts >= MAX_ATTEMPTS:
+            event.status = PaymentEventStatus.FAILED
+            logger.error("Payment event %s failed after %s attempts: %r", event.event_id, event.attempts, e)
+        else:
+            logger.warning("Payment event %s will be retried: %r", event.event_id, e)
+    if event.status != PaymentEventStatus.PENDING:
+        event.processed_at = timezone.now()
+    event.save(update_fields=["status", "attempts", "last_error", "processed_at"])
+    return event.status
+
+
+def process_pending_events(batch_size=EVENT_BATCH_SIZE):
+    """
+    Processes up to batch_size pending events, oldest first. Each is claimed
+    with SKIP LOCKED in its own transaction, so several workers can share
+    the queue. Returns {status: count}.
+    """
+    counts = {}
+    # Events retried in this run are skipped until the next one
+    seen = []
+    for _ in range(batch_size):
+        with transaction.atomic():
+            event = (
+                PaymentEvent.objects.select_for_update(skip_locked=True)
+                .filter(status=PaymentEventStatus.PENDING)
+                .exclude(pk__in=seen)
+                .order_by("created_at")
+                .first()
+            )
+            if event is None:
+                break
+            seen.append(event.pk)
+            status = process_event(event)
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def reconcile_attempts(older_than, limit=EVENT_BATCH_SIZE):
+    """
+    Asks Razorpay about attempts still open after older_than (a timedelta),
+    oldest first. A paid checkout attempt whose callback and webhook both got
+    lost is queued as a reconcile event for the worker; attempts with no
+    payment are expired. Paid wallet top-ups are only counted, they need a
+    look by hand. Returns (queued, expired, unresolved_top_ups).
+    """
+    queued = expired = top_ups = 0
+    stale = PaymentAttempt.objects.filter(
+        status=PaymentAttemptStatus.CREATED, created_at__lt=timezone.now() - older_than
+    ).order_by("created_at")[:limit]
+    for attempt in stale:
+        paid = next(
+            (p for p in gateway.fetch_order_payments(attempt.razorpay_order_id) if p.get("status") in PAID_STATUSES),
+            None,
+        )
+        if paid is None:
+            close_attempt(attempt, PaymentAttemptStatus.EXPIRED)
+            expired += 1
+        elif attempt.order_id:
+            queued += record_event(
+                f"reconcile:{paid['id']}",
+                PaymentEventSource.RECONCILE,
+                "reconcile",
+                razorpay_order_id=attempt.razorpay_order_id,
+                razorpay_payment_id=paid["id"],
+            )
+        else:
+            logger.warning("Wallet top-up %s was paid but never credited", attempt.razorpay_order_id)
+            top_ups += 1
+    return queued, expired, top_ups
+
+
+def confirmation_status(order):
+    """What the waiting page shows: ('placed' | 'pending' | 'failed', message)."""
+    if order.order_status not in ("draft", "failed"):
+        return "placed", ""
+    latest = (
+        PaymentEvent.objects.filter(razorpay_order_id__in=order.payment_attempts.values("razorpay_order_id"))
+        .exclude(status=PaymentEventStatus.IGNORED)
+        .order_by("-created_at")
+        .first()
+    )
+    if latest is None or latest.status == PaymentEventStatus.PENDING:
+        return "pending", ""
+    if order.order_status == "failed":
+        return "failed", latest.last_error or "Payment could not be confirmed."
+    if latest.status == PaymentEventStatus.FAILED:
+        return "failed", "Payment could not be confirmed. If money was taken it will be refunded."
+    return "pending", ""
+
+
+def start_event_worker(interval):
+    """Runs process_pending_events every interval seconds in a daemon thread of this process."""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                counts = process_pending_events()
+                if counts:
+                    logger.info("Processed payment events: %s", counts)
+            except Exception:
+                logger.exception("Payment event processing failed")
+            finally:
+                connection.close()
+
+    thread = threading.Thread(target=run, name="payment-events", daemon=True)
+    thread.start()
+    return thread
+
+
+def maybe_start_event_worker():
+    interval = getattr(settings, "PAYMENT_EVENT_WORKER_INTERVAL", None)
+    if interval:
+        start_event_worker(interval)
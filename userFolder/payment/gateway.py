@@ -0,0 +1,265 @@
+"""
+The one Razorpay client every view talks to.
+
+Views used to build a razorpay.Client per request, so every call paid for
+a fresh TLS handshake and had no timeout at all: a slow payment.fetch held
+a gunicorn worker for as long as Razorpay took. Here one client per process
+shares a pooled requests session with connect/read timeouts. Calls go
+through a circuit breaker that fails fast with GatewayUnavailable while the
+gateway keeps erroring, calls that are safe to repeat are retried with
+jittered backoff, and every call's latency is logged and counted in a
+histogram in the shared cache (stats(), `manage.py razorpay_stats`).
+
+RAZORPAY_BASE_URL points the client elsewhere, e.g. at the offline server
+started by `manage.py fake_razorpay` for load tests.
+"""
+import logging
+import random
+import threading
+import time
+
+import razorpay
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Errors that say the gateway, not our request, is in trouble (a proxy's HTML error page fails to parse as JSON)
+GATEWAY_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.JSONDecodeError,
+    razorpay.errors.GatewayError,
+    razorpay.errors.ServerError,
+)
+STATS_PREFIX = "razorpay:stats:"
+CALL_NAMES = ("order.create", "order.payments", "payment.fetch")
+# Upper bounds (ms) of the latency histogram kept per call
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class GatewayUnavailable(Exception):
+    """Razorpay failed to answer (after any retries) or the breaker is open."""
+
+
+class TimeoutSession(requests.Session):
+    """A session that applies a default (connect, read) timeout to every request."""
+
+    def __init__(self, timeout, pool_size):
+        super().__init__()
+        self.timeout = timeout
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(*args, **kwargs)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` gateway failures in a row and rejects calls for
+    `reset_after` seconds. Then one trial call is let through: success
+    closes it again, failure reopens it for another period.
+    Each worker process keeps its own breaker.
+    """
+
+    def __init__(self, threshold, reset_after):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning("Razorpay circuit opened after %s failures", self.failures)
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+
+def _bump_stat(name, field):
+    key = f"{STATS_PREFIX}{name}:{field}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def _record(name, seconds=None, error=False, rejected=False):
+    # Shared cache counters, like the catalog cache stats, so the numbers cover every worker
+    _bump_stat(name, "calls")
+    if error:
+        _bump_stat(name, "errors")
+    if rejected:
+        _bump_stat(name, "rejected")
+    if seconds is not None:
+        ms = seconds * 1000
+        bucket = next((bound for bound in LATENCY_BUCKETS_MS if ms <= bound), "inf")
+        _bump_stat(name, f"le_{bucket}")
+
+
+_client = None
+_client_lock = threading.Lock()
+breaker = CircuitBreaker(settings.RAZORPAY_BREAKER_THRESHOLD, settings.RAZORPAY_BREAKER_RESET)
+
+
+def get_client():
+    """The process-wide razorpay.Client, created on first use (after gunicorn forks)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                session = TimeoutSession(
+                    (settings.RAZORPAY_CONNECT_TIMEOUT, settings.RAZORPAY_READ_TIMEOUT),
+                    settings.RAZORPAY_POOL_SIZE,
+                )
+                _client = razorpay.Client(
+                    session=session,
+                    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+                    base_url=settings.RAZORPAY_BASE_URL,
+                )
+    return _client
+
+
+def _retryable(error, idempotent):
+    # A POST that timed out connecting never reached Razorpay, so even it is safe to send again
+    if idempotent:
+        return isinstance(error, GATEWAY_ERRORS)
+    return isinstance(error, requests.ConnectTimeout)
+
+
+def call(name, func, *args, idempotent=False, **kwargs):
+    """
+    Runs func (a bound method of get_client()) through the breaker, with up
+    to RAZORPAY_MAX_RETRIES retries when it is safe to repeat. Raises
+    GatewayUnavailable on gateway failures; Razorpay's BadRequestError (our
+    request was wrong) passes through and does not count against the breaker.
+    """
+    attempts = 1 + settings.RAZORPAY_MAX_RETRIES
+    delay = settings.RAZORPAY_RETRY_DELAY
+    for attempt in range(1, attempts + 1):
+        if not breaker.allow():
+            _record(name, rejected=True)
+            raise GatewayUnavailable("Payment gateway is temporarily unavailable.")
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except GATEWAY_ERRORS as e:
+            seconds = time.perf_counter() - started
+            breaker.record_failure()
+            _record(name, seconds, error=True)
+            logger.warning("razorpay %s failed in %.0f ms (attempt %s/%s): %r", name, seconds * 1000, attempt, attempts, e)
+            if attempt == attempts or not _retryable(e, idempotent):
+                raise GatewayUnavailable("Payment gateway is temporarily unavailable.") from e
+            # Full jitter, so workers retrying together do not hit the gateway in lockstep
+            time.sleep(random.uniform(0, delay))
+            delay *= 2
+        except Exception:
+            # Request rejected by Razorpay, the gateway itself is fine
+            breaker.record_success()
+            _record(name, time.perf_counter() - started, error=True)
+            raise
+        else:
+            seconds = time.perf_counter() - started
+            breaker.record_success()
+            _record(name, seconds)
+            logger.info("razorpay %s took %.0f ms", name, seconds * 1000)
+            return result
+
+
+def create_order(amount_paise):
+    # Not idempotent: a retried create could leave a second (unpaid) Razorpay order behind
+    return call("order.create", get_client().order.create, {
+        "amount": amount_paise,
+        "currency": settings.RAZORPAY_CURRENCY,
+        "payment_capture": 1,
+    })
+
+
+def fetch_order_payments(razorpay_order_id):
+    """Every payment made against a Razorpay order, as a list of payment entities."""
+    return call("order.payments", get_client().order.payments, razorpay_order_id, idempotent=True)["items"]
+
+
+def fetch_payment(payment_id):
+    return call("payment.fetch", get_client().payment.fetch, payment_id, idempotent=True)
+
+
+def verify_payment_signature(razorpay_order_id, razorpay_payment_id, razorpay_signature):
+    """Local HMAC check, no HTTP call. Raises razorpay.errors.SignatureVerificationError."""
+    get_client().utility.verify_payment_signature({
+        "razorpay_order_id": razorpay_order_id,
+        "razorpay_payment_id": razorpay_payment_id,
+        "razorpay_signature": razorpay_signature,
+    })
+
+
+def verify_webhook_signature(body, signature):
+    """Checks X-Razorpay-Signature against RAZORPAY_WEBHOOK_SECRET. Raises SignatureVerificationError."""
+    if not settings.RAZORPAY_WEBHOOK_SECRET:
+        raise razorpay.errors.SignatureVerificationError("RAZORPAY_WEBHOOK_SECRET is not set")
+    get_client().utility.verify_webhook_signature(body.decode(), signature or "", settings.RAZORPAY_WEBHOOK_SECRET)
+
+
+def stats():
+    """
+    Calls, errors, breaker rejections and a latency histogram per gateway
+    call, summed over all workers. Latency percentiles are bucket upper bounds.
+    """
+    fields = ["calls", "errors", "rejected", *(f"le_{bound}" for bound in (*LATENCY_BUCKETS_MS, "inf"))]
+    keys = [f"{STATS_PREFIX}{name}:{field}" for name in CALL_NAMES for field in fields]
+    found = cache.get_many(keys)
+    result = {}
+    for name in CALL_NAMES:
+        counts = {field: found.get(f"{STATS_PREFIX}{name}:{field}", 0) for field in fields}
+        histogram = [(bound, counts[f"le_{bound}"]) for bound in (*LATENCY_BUCKETS_MS, "inf")]
+        timed = sum(count for _, count in histogram)
+
+        def percentile(p):
+            seen = 0
+            for bound, count in histogram:
+                seen += count
+                if timed and seen >= timed * p:
+                    return bound
+            return None
+
+        result[name] = {
+            "calls": counts["calls"],
+            "errors": counts["errors"],
+            "rejected": counts["rejected"],
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+        }
+    return result
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=100, unique=True)),
+                ('source', models.CharField(choices=[('webhook', 'Webhook'), ('callback', 'Checkout callback')], max_length=10)),
+                ('event', models.CharField(max_length=50)),
+                ('razorpay_order_id', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('razorpay_payment_id', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('ignored', 'Ignored'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='payment_event_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_attempts(apps, schema_editor):
+    # The Razorpay orders known so far: the latest one of every order and the pending top-ups
+    OrderMain = apps.get_model("order", "OrderMain")
+    Transaction = apps.get_model("wallet", "Transaction")
+    PaymentAttempt = apps.get_model("payment", "PaymentAttempt")
+
+    attempts = []
+    orders = OrderMain.objects.exclude(razorpay_order_id__isnull=True).exclude(razorpay_order_id="")
+    for order in orders.only("id", "razorpay_order_id", "razorpay_payment_id", "final_price", "is_paid", "order_status").iterator():
+        if order.is_paid:
+            status = "paid"
+        elif order.order_status == "failed":
+            status = "failed"
+        else:
+            status = "created"
+        attempts.append(PaymentAttempt(
+            razorpay_order_id=order.razorpay_order_id,
+            order_id=order.id,
+            amount=order.final_price,
+            status=status,
+            razorpay_payment_id=(order.razorpay_payment_id or "") if status == "paid" else "",
+        ))
+    # Completed top-ups already replaced the Razorpay order id with the payment id
+    for transaction in Transaction.objects.filter(status="PD", payment_id__startswith="order_").iterator():
+        attempts.append(PaymentAttempt(
+            razorpay_order_id=transaction.payment_id,
+            wallet_transaction_id=transaction.id,
+            amount=transaction.amount,
+        ))
+    PaymentAttempt.objects.bulk_create(attempts, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0024_draft_expiry_index'),
+        ('payment', '0002_payment_event'),
+        ('wallet', '0003_transaction_payment_id_alter_transaction_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentevent',
+            name='source',
+            field=models.CharField(choices=[('webhook', 'Webhook'), ('callback', 'Checkout callback'), ('reconcile', 'Reconciliation')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='PaymentAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('razorpay_order_id', models.CharField(max_length=100, unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('created', 'Created'), ('paid', 'Paid'), ('failed', 'Failed'), ('expired', 'Expired')], default='created', max_length=10)),
+                ('razorpay_payment_id', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payment_attempts', to='order.ordermain')),
+                ('wallet_transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payment_attempts', to='wallet.transaction')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'created')), fields=['created_at'], name='payment_attempt_open_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('order__isnull', False), ('wallet_transaction__isnull', True)), models.Q(('order__isnull', True), ('wallet_transaction__isnull', False)), _connector='OR'), name='payment_attempt_one_target')],
+            },
+        ),
+        migrations.RunPython(backfill_attempts, migrations.RunPython.noop),
+    ]
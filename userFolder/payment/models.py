@@ -26,3 +26,105 @@ class PaymentFailure(models.Model):
     
     def __str__(self):
         return f"{self.failure_type} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class PaymentEventSource(models.TextChoices):
+    WEBHOOK = 'webhook', 'Webhook'
+    CALLBACK = 'callback', 'Checkout callback'
+    RECONCILE = 'reconcile', 'Reconciliation'
+
+
+class PaymentEventStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'
+    PROCESSED = 'processed', 'Processed'
+    IGNORED = 'ignored', 'Ignored'
+    FAILED = 'failed', 'Failed'
+
+
+class PaymentEvent(models.Model):
+    """
+    Inbox of payment confirmations. The webhook and the checkout callback
+    only verify the signature and store the event; process_payment_events
+    places the order.
+    """
+    # X-Razorpay-Event-Id for webhooks, callback:<payment id> / reconcile:<payment id> otherwise
+    event_id = models.CharField(max_length=100, unique=True)
+    source = models.CharField(max_length=10, choices=PaymentEventSource.choices)
+    event = models.CharField(max_length=50)
+    razorpay_order_id = models.CharField(max_length=100, blank=True, db_index=True)
+    razorpay_payment_id = models.CharField(max_length=100, blank=True, db_index=True)
+    payload = models.JSONField(default=dict)
+
+    status = models.CharField(max_length=10, choices=PaymentEventStatus.choices, default=PaymentEventStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The worker's queue: only pending rows, oldest first
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(status='pending'),
+                name='payment_event_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.razorpay_payment_id or self.razorpay_order_id} ({self.status})"
+
+
+class PaymentAttemptStatus(models.TextChoices):
+    CREATED = 'created', 'Created'
+    PAID = 'paid', 'Paid'
+    FAILED = 'failed', 'Failed'
+    EXPIRED = 'expired', 'Expired'
+
+
+class PaymentAttempt(models.Model):
+    """
+    One Razorpay order, created for a checkout order or a wallet top-up.
+    Callbacks, webhooks and reconciliation resolve the Razorpay order id
+    through the unique index here; a payment retry adds a row instead of
+    overwriting the order's razorpay_order_id, so the history is kept.
+    """
+    razorpay_order_id = models.CharField(max_length=100, unique=True)
+    order = models.ForeignKey(
+        'order.OrderMain', on_delete=models.CASCADE, null=True, blank=True, related_name='payment_attempts'
+    )
+    wallet_transaction = models.ForeignKey(
+        'wallet.Transaction', on_delete=models.CASCADE, null=True, blank=True, related_name='payment_attempts'
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+
+    status = models.CharField(max_length=10, choices=PaymentAttemptStatus.choices, default=PaymentAttemptStatus.CREATED)
+    razorpay_payment_id = models.CharField(max_length=100, blank=True, db_index=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(order__isnull=False, wallet_transaction__isnull=True)
+                    | models.Q(order__isnull=True, wallet_transaction__isnull=False)
+                ),
+                name='payment_attempt_one_target',
+            ),
+        ]
+        indexes = [
+            # Reconciliation walks the attempts still waiting for a payment, oldest first
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(status='created'),
+                name='payment_attempt_open_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.razorpay_order_id} ({self.status})"
@@ -7,6 +7,9 @@ urlpatterns = [
     path('deduct-wallet/', views.deduct_amount_from_wallet, name='deduct_amount_from_wallet'),
     path('start/', views.create_razorpay_order, name='create_razorpay_order'),
     path('success/', views.razorpay_callback, name='razorpay_callback'),
+    path('webhook/', views.razorpay_webhook, name='razorpay_webhook'),
+    path('confirming/<str:order_id>/', views.payment_confirming, name='payment_confirming'),
+    path('status/<str:order_id>/', views.payment_status, name='payment_status'),
     
     path('failed/', views.payment_failed_page, name='payment_failed_page'),
     path('retry/<str:order_id>/', views.retry_order_payment, name='retry_order_payment'),
@@ -1,3 +1,4 @@
+import hashlib
 from decimal import Decimal
 from django.http import JsonResponse
 from django.db import transaction
@@ -9,6 +10,7 @@ from userFolder.cart.utils import get_annotated_cart_items
 from products.models import ProductVariant
 from userFolder.userprofile.models import Address
 from userFolder.order.models import OrderItem,OrderMain
+from userFolder.order.inventory import InsufficientStock, reserve_order, reserved_quantities
 from coupon.models import Coupon
 
 def validate_stock_and_cart(user):
@@ -22,15 +24,16 @@ def validate_stock_and_cart(user):
     cart_items = get_annotated_cart_items(user=user)
     variant_ids = [item.variant.id for item in cart_items]
 
-    # Validate stock
+    # Validate stock, minus what other shoppers' drafts are holding
     locked_variants = ProductVariant.objects.filter(id__in=variant_ids)
     variant_map = {variant.id: variant for variant in locked_variants}
+    reserved = reserved_quantities(variant_ids, exclude={"order__user": user})
 
     for item in cart_items:
         current_variant = variant_map.get(item.variant.id)
         if not current_variant:
             return None, {"success": False, "error": f"Product {item.variant.product.name} unavailable."}
-        if item.quantity > current_variant.stock:
+        if item.quantity > current_variant.stock - reserved.get(current_variant.id, 0):
             return None, {"success": False, "error": f"Out of stock: {current_variant.product.name}"}
 
     return cart_items, None
@@ -62,11 +65,31 @@ def calculate_cart_totals(cart_items):
         'grand_total': grand_total
     }
 
+def draft_fingerprint(cart_items, coupon_code, wallet_deduction):
+    """Hash of everything sync_draft_order derives a draft from: the cart lines and their prices, coupon and wallet request."""
+    digest = hashlib.sha256()
+    for item in sorted(cart_items, key=lambda item: item.variant_id):
+        digest.update(
+            f"{item.variant_id}:{item.quantity}:{item.base_price}:{item.final_price}:{item.actual_discount}|".encode()
+        )
+    digest.update(f"coupon:{(coupon_code or '').upper()}|wallet:{wallet_deduction}".encode())
+    return digest.hexdigest()
+
 def sync_draft_order(user, draft_order, cart_items, totals):
     """
-    Synchronizes an existing draft order with the current cart items and totals.
-    Re-calculates coupon and wallet deductions based on fresh cart state.
+    Synchronizes an existing draft order with the current cart lines (CartSummary.lines) and totals.
+    Re-calculates coupon and wallet deductions based on fresh cart state
+    and re-reserves the stock, raising InsufficientStock if it is gone.
+
+    Nothing is read or written when the cart, prices, coupon code and wallet
+    request still match the fingerprint stored by the last sync. The draft
+    expires within minutes, which bounds how long a coupon check is reused.
     """
+    if draft_order.sync_fingerprint and draft_order.sync_fingerprint == draft_fingerprint(
+        cart_items, draft_order.coupon_code, draft_order.wallet_deduction
+    ):
+        return draft_order
+
     with transaction.atomic():
         # Re-calculate coupon discount if applied
         coupon_discount = Decimal('0.00')
@@ -117,23 +140,54 @@ def sync_draft_order(user, draft_order, cart_items, totals):
         draft_order.coupon_discount = coupon_discount
         draft_order.wallet_deduction = wallet_deduction
         draft_order.final_price = final_amount
-        draft_order.save()
-
-        # Update OrderItems
-        draft_order.items.all().delete()
-        order_items_to_create = []
+        # Stored from the values after capping, so the next identical sync matches
+        draft_order.sync_fingerprint = draft_fingerprint(cart_items, draft_order.coupon_code, wallet_deduction)
+        draft_order.save(update_fields=[
+            'total_price', 'discount_amount', 'shipping_amount', 'coupon_code', 'coupon_discount',
+            'wallet_deduction', 'final_price', 'sync_fingerprint', 'updated_at',
+        ])
+
+        # Update OrderItems: only the lines that changed
+        existing = {}
+        stale = []
+        for order_item in draft_order.items.all():
+            if order_item.variant_id in existing:
+                stale.append(order_item.pk)
+            else:
+                existing[order_item.variant_id] = order_item
+        to_create, to_update = [], []
         for item in cart_items:
-            order_items_to_create.append(
-                OrderItem(
-                    order=draft_order,
-                    variant=item.variant,
-                    product_name=item.variant.product.name,
-                    quantity=item.quantity,
-                    price_at_purchase=item.final_price,
-                    status='draft'
+            order_item = existing.pop(item.variant_id, None)
+            if order_item is None:
+                to_create.append(
+                    OrderItem(
+                        order=draft_order,
+                        variant_id=item.variant_id,
+                        product_name=item.product_name,
+                        quantity=item.quantity,
+                        price_at_purchase=item.final_price,
+                        status='draft'
+                    )
                 )
-            )
-        OrderItem.objects.bulk_create(order_items_to_create)
+            elif (order_item.quantity, order_item.price_at_purchase, order_item.product_name) != (
+                item.quantity, item.final_price, item.product_name
+            ):
+                order_item.quantity = item.quantity
+                order_item.price_at_purchase = item.final_price
+                order_item.product_name = item.product_name
+                # bulk_update does not fill auto_now fields
+                order_item.updated_at = timezone.now()
+                to_update.append(order_item)
+        stale.extend(order_item.pk for order_item in existing.values())
+
+        if stale:
+            OrderItem.objects.filter(pk__in=stale).delete()
+        if to_update:
+            OrderItem.objects.bulk_update(to_update, ['quantity', 'price_at_purchase', 'product_name', 'updated_at'])
+        if to_create:
+            OrderItem.objects.bulk_create(to_create)
+        # Hold the new quantities; raises InsufficientStock and rolls the sync back
+        reserve_order(draft_order)
 
     return draft_order
 
@@ -181,16 +235,20 @@ def create_draft_order(user,address,cart_items,totals,**extra_fields):
                 order_items_to_create.append(
                     OrderItem(
                         order=draft_order,
-                        variant=item.variant,
-                        product_name=item.variant.product.name,
+                        variant_id=item.variant_id,
+                        product_name=item.product_name,
                         quantity=item.quantity,
                         price_at_purchase=item.final_price
                     )
                 )
             OrderItem.objects.bulk_create(order_items_to_create)
+            reserve_order(draft_order)
 
             return draft_order,None
 
+    except InsufficientStock:
+        # The caller answers this one with a 400 and the product name
+        raise
     except Exception as e:
         print(f"Draft order creation error: {e}")
         return None, {"success": False, "error": "Failed to create draft order."}
\ No newline at end of file
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import razorpay
 import logging
@@ -5,32 +6,34 @@ import logging
 logger = logging.getLogger(__name__)
 
 from decimal import Decimal
-from django.shortcuts import render, redirect
-from django.template.loader import render_to_string
+from django.shortcuts import get_object_or_404, render, redirect
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages 
 from django.contrib.auth import login as auth_login
-from django.core.mail import EmailMultiAlternatives
 from django.views.decorators.http import require_POST,require_http_methods
 from django.views.decorators.cache import never_cache
 from django.db import transaction
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
 from datetime import timedelta
 
 from django.urls import reverse
 from userFolder.order.models import *
 from userFolder.cart.models import *
+from userFolder.cart.services import get_cart_summary
 from userFolder.userprofile.models import *
 from userFolder.wallet.models import *
 from coupon.models import Coupon,CouponUsage
 from userFolder.cart.utils import get_annotated_cart_items
+from userFolder.order.inventory import PAYMENT_HOLD, InsufficientStock, release_reservations, reserve_order
 from .models import PaymentFailure
+from . import gateway
+from .attempts import fail_open_attempts, find_attempt, start_attempt
+from .events import confirmation_status, record_callback, record_webhook
 
-from .utils import validate_stock_and_cart,validate_address,calculate_cart_totals,create_draft_order,sync_draft_order
-from userFolder.order.utils import send_order_success_email
+from .utils import validate_address,create_draft_order,sync_draft_order
 
 
 @require_POST
@@ -42,15 +45,17 @@ def apply_coupon(request):
     if not coupon_code:
         return JsonResponse({"success": False, "error": "Coupon code not provided"},status=400)
 
-    cart_items, error = validate_stock_and_cart(user=user)
+    summary = get_cart_summary(user)
+    error = summary.validation_error()
     if error:
         return JsonResponse(error, status=400)
+    cart_items = summary.lines
 
     address, error = validate_address(request=request, user=user)
     if error:
         return JsonResponse(error, status=400)
 
-    totals = calculate_cart_totals(cart_items)
+    totals = summary.totals
 
     with transaction.atomic():
         try:
@@ -122,6 +127,9 @@ def apply_coupon(request):
                 status=400
             )
 
+        except InsufficientStock as e:
+            return JsonResponse({"success": False, "error": str(e)}, status=400)
+
         except Exception as e:
             print("Coupon error:", e)
             return JsonResponse(
@@ -157,6 +165,8 @@ def remove_coupon(request):
             draft_order.coupon_code = ''
             draft_order.coupon_discount = Decimal('0.00')
             draft_order.final_price = final_amount
+            # Written outside sync_draft_order, so the stored fingerprint no longer describes the draft
+            draft_order.sync_fingerprint = ''
             draft_order.save()
 
             return JsonResponse({
@@ -173,15 +183,17 @@ def remove_coupon(request):
 def deduct_amount_from_wallet(request):
     user = request.user
 
-    cart_items, error = validate_stock_and_cart(user=user)
+    summary = get_cart_summary(user)
+    error = summary.validation_error()
     if error:
         return JsonResponse(error, status=400)
+    cart_items = summary.lines
 
     address, error = validate_address(request=request, user=user)
     if error:
         return JsonResponse(error, status=400)
 
-    totals = calculate_cart_totals(cart_items)
+    totals = summary.totals
 
     try:
         with transaction.atomic():
@@ -243,6 +255,9 @@ def deduct_amount_from_wallet(request):
     except Wallet.DoesNotExist:
         return JsonResponse({"success": False, "error": "Wallet not found"},status=400)
 
+    except InsufficientStock as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
     except Exception as e:
         print("Wallet deduction error:", e)
         return JsonResponse({"success": False, "error": "Failed to process wallet deduction"},status=500)
@@ -277,16 +292,22 @@ def create_razorpay_order(request):
 
                 payable_amount = draft_order.final_price
 
+                # Keep the draft and its stock held for as long as the gateway may take
+                draft_order.expires_at = timezone.now() + PAYMENT_HOLD
+                draft_order.save(update_fields=['expires_at'])
+                reserve_order(draft_order)
+
                 address = Address.objects.filter(full_name=draft_order.shipping_address_name,postal_code=draft_order.shipping_pincode).first()                  
                 
                 if not address:
                     address = Address.objects.filter(user=user).first()  
             else:
-                cart_items, error = validate_stock_and_cart(user=user)
+                summary = get_cart_summary(user)
+                error = summary.validation_error()
                 if error:
                     return JsonResponse(error, status=400)
 
-                totals = calculate_cart_totals(cart_items)
+                totals = summary.totals
 
                 add_id = request.POST.get('selected_address')
                 if not add_id:
@@ -314,22 +335,27 @@ def create_razorpay_order(request):
                     shipping_amount=totals['shipping'],
                     final_price=totals['grand_total'],
                     order_status='draft',
-                    expires_at=timezone.now() + timedelta(minutes=30)
+                    expires_at=timezone.now() + PAYMENT_HOLD
                 )
 
                 # Create draft order items
-                for item in cart_items:
-                    OrderItem.objects.create(
+                OrderItem.objects.bulk_create([
+                    OrderItem(
                         order=draft_order,
-                        variant=item.variant,
-                        product_name=item.variant.product.name,
-                        quantity=item.quantity,
-                        price_at_purchase=item.final_price,
+                        variant_id=line.variant_id,
+                        product_name=line.product_name,
+                        quantity=line.quantity,
+                        price_at_purchase=line.final_price,
                         status='draft'
                     )
+                    for line in summary.lines
+                ])
+                reserve_order(draft_order)
 
             if payable_amount <= Decimal('0.00'):
                 return JsonResponse({"success": False, "error": "Invalid payable amount"},status=400)
+    except InsufficientStock as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
     except Exception as e:
         print("Order preparation error:", e)
         return JsonResponse(
@@ -338,17 +364,15 @@ def create_razorpay_order(request):
         )
 
     try:
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
         amount_paise = int(payable_amount * 100)
-        razorpay_order = client.order.create({
-            "amount": amount_paise,
-            "currency": settings.RAZORPAY_CURRENCY,
-            "payment_capture": 1,
-        })
+        razorpay_order = gateway.create_order(amount_paise)
         
         if draft_order:
             draft_order.razorpay_order_id = razorpay_order["id"]
             draft_order.save(update_fields=['razorpay_order_id'])
+            start_attempt(razorpay_order, order=draft_order)
+    except gateway.GatewayUnavailable as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=503)
     except Exception as e:
         print("Razorpay error:", e)
         return JsonResponse(
@@ -381,8 +405,9 @@ def create_razorpay_order(request):
 @never_cache
 def razorpay_callback(request):
     """
-    Converts draft order to final order or creates new order
-    All amounts retrieved from database
+    Where checkout.js sends the shopper after paying. Failures mark the draft
+    failed; a success only has its signature checked and is queued for the
+    payment event worker, then the shopper waits on payment_confirming.
     """
     session_data = request.session.get('pending_razorpay')
     if request.method == "GET":
@@ -393,6 +418,8 @@ def razorpay_callback(request):
         if order_id:
             OrderMain.objects.filter(order_id=order_id, order_status='draft').update(order_status='failed')
             OrderItem.objects.filter(order__order_id=order_id, status='draft').update(status='failed')
+            release_reservations(order_id)
+            fail_open_attempts(order_id)
         
         messages.error(request, "Payment failed. Please try again.")
         if session_data and 'pending_razorpay' in request.session:
@@ -438,18 +465,18 @@ def razorpay_callback(request):
                     order.order_status = 'failed'
                     order.save(update_fields=['order_status'])
                     order.items.all().update(status='failed')
+                    release_reservations(order)
+                fail_open_attempts(order)
                 # Restore login if session lost due to SameSite cookie (Razorpay redirect)
                 if user and not request.user.is_authenticated:
                     auth_login(request, user, backend='django.contrib.auth.backends.ModelBackend')
             return render(request, 'orders/order_error.html', {'order_id': order.order_id if order else None})
 
-        # 1. Lookup Order
-        if razorpay_order_id:
-            try:
-                order = OrderMain.objects.get(razorpay_order_id=razorpay_order_id)
-                user = order.user
-            except OrderMain.DoesNotExist:
-                pass
+        # 1. Lookup Order, through the attempt so callbacks for an earlier retry still resolve
+        attempt = find_attempt(razorpay_order_id)
+        if attempt and attempt.order:
+            order = attempt.order
+            user = order.user
         
         # Fallback to session if order not found by ID
         if not order and session_data:
@@ -474,144 +501,86 @@ def razorpay_callback(request):
              return render(request, 'orders/order_error.html')
 
         # Verify Razorpay signature
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-        
         try:
-            verification_data = {
-                'razorpay_order_id': razorpay_order_id,
-                'razorpay_payment_id': razorpay_payment_id,
-                'razorpay_signature': razorpay_signature,
-            }
-            client.utility.verify_payment_signature(verification_data)
+            gateway.verify_payment_signature(razorpay_order_id, razorpay_payment_id, razorpay_signature)
         except razorpay.errors.SignatureVerificationError:
             return handle_failure("Payment verification failed. Invalid signature.")
         except Exception as e:
             print(f"Payment verification error: {e}")
             return handle_failure("Payment verification failed.")
         
-        # Verify payment amount from Razorpay
-        try:
-            payment_details = client.payment.fetch(razorpay_payment_id)
-            paid_amount = Decimal(payment_details['amount']) / 100  # Convert paise to rupees
-        except Exception as e:
-            print(f"Failed to fetch payment details: {e}")
-            return handle_failure("Could not verify payment amount.")
-        
-        # Process order
-        try:
-            with transaction.atomic():
-                # Refresh order from DB to lock it (if needed) or just get fresh state
-                # We already have 'order' object.
-                
-                if order.order_status not in ['draft', 'failed']:
-                    # If it's already processed (e.g., duplicate callback), just show success
-                    return redirect('order_processing_animation', order_id=order.order_id)
-                
-                draft_order = order # For compatibility with existing variable names below
-
-                expected_amount = draft_order.final_price 
-                if abs(paid_amount - expected_amount) > Decimal('0.01'):
-                    return handle_failure(f"Payment amount mismatch. Expected ₹{expected_amount}, got ₹{paid_amount}")
-                
-                # Validate stock using draft order items
-                for item in draft_order.items.all():
-                    try:
-                        variant = ProductVariant.objects.select_for_update().get(id=item.variant.id)
-                    except ProductVariant.DoesNotExist:
-                        return handle_failure(f"Product {item.product_name} is no longer available.")
-                    
-                    if item.quantity > variant.stock:
-                        return handle_failure(f'Out of stock: {item.product_name}')
-                    
-                    # Update stock
-                    variant.stock -= item.quantity
-                    variant.save()
-                
-                # Deduct wallet balance
-                if draft_order.wallet_deduction > 0:
-                    try:
-                        wallet = Wallet.objects.select_for_update().get(user=user)
-                        
-                        if wallet.balance < draft_order.wallet_deduction:
-                            raise Exception("Insufficient wallet balance.")
-                        
-                        wallet.balance -= draft_order.wallet_deduction
-                        wallet.save()
-                        
-                        # Create wallet transaction record
-                        Transaction.objects.create(
-                            wallet=wallet,
-                            transaction_type='DB',
-                            amount=draft_order.wallet_deduction,
-                            description=f'Payment for order {draft_order.order_id}'
-                        )
-                    except Wallet.DoesNotExist:
-                        raise Exception("Wallet not found.")
-                
-                # Convert draft to final order
-                draft_order.order_status = 'pending'  
-                draft_order.payment_method = 'razorpay'
-                draft_order.payment_status = 'paid'
-                draft_order.is_paid = True
-                draft_order.razorpay_order_id = razorpay_order_id
-                draft_order.razorpay_payment_id = razorpay_payment_id
-                draft_order.razorpay_signature = razorpay_signature
-                draft_order.expires_at = None  
-                draft_order.save()
-                
-                order = draft_order # Ensure 'order' ref is updated
-                
-                if order.coupon_code:
-                    try:
-                        coupon = Coupon.objects.select_for_update().get(code=draft_order.coupon_code)
-                        
-                        if coupon:
-                            coupon.times_used += 1
-                            coupon.save()
-                            
-                            CouponUsage.objects.create(
-                                coupon=coupon,
-                                user=user,
-                                order=order,
-                                discount_amount=order.coupon_discount,
-                                cart_total_before_discount=order.final_price-order.discount_amount
-                            )
-                    except Exception as e:
-                        # Non-critical, but log it
-                        print(f"Coupon usage tracking failed: {e}")
-                        pass
-                    
-                # Clear user's cart
-                try:
-                    cart = Cart.objects.get(user=user)
-                    cart.items.all().delete()
-                except Cart.DoesNotExist:
-                    pass
-                
-                # Update item statuses
-                order.items.all().update(status='pending')
+        if order.order_status not in ['draft', 'failed']:
+            # Already placed (webhook got there first, or a duplicate callback)
+            return redirect('order_processing_animation', order_id=order.order_id)
 
-            # Store order ID in session as a courtesy
-            request.session['order_id'] = order.order_id
-            if 'pending_razorpay' in request.session:
-                del request.session['pending_razorpay']
-            if 'draft_order_id' in request.session:
-                del request.session['draft_order_id']
+        # The amount check and the order itself are handled by the payment event worker
+        record_callback(razorpay_order_id, razorpay_payment_id, razorpay_signature)
 
-            # Restore login if needed (SameSite=Lax)
-            if not request.user.is_authenticated:
-                auth_login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+        request.session['order_id'] = order.order_id
+        if 'pending_razorpay' in request.session:
+            del request.session['pending_razorpay']
+        if 'draft_order_id' in request.session:
+            del request.session['draft_order_id']
 
-            # Redirect to animation page
-            return redirect('order_processing_animation', order_id=order.order_id)
+        # Restore login if needed (SameSite=Lax)
+        if not request.user.is_authenticated:
+            auth_login(request, user, backend='django.contrib.auth.backends.ModelBackend')
 
-        except Exception as e:
-            print(f"Razorpay Order Placement Error: {e}")
-            return handle_failure(f"Order processing failed: {str(e)}")
+        return redirect('payment_confirming', order_id=order.order_id)
 
     return redirect('checkout')
 
        
+def _can_view_order(request, order):
+    if request.user.is_authenticated:
+        return order.user_id == request.user.pk
+    return request.session.get('order_id') == order.order_id
+
+
+@never_cache
+def payment_confirming(request, order_id):
+    """Waiting page after a Razorpay payment; polls payment_status until the worker has placed the order."""
+    order = get_object_or_404(OrderMain, order_id=order_id)
+    if not _can_view_order(request, order):
+        return redirect('login')
+    if confirmation_status(order)[0] == 'placed':
+        return redirect('order_processing_animation', order_id=order.order_id)
+    return render(request, 'payment/confirming.html', {'order': order})
+
+
+@never_cache
+@require_http_methods(["GET"])
+def payment_status(request, order_id):
+    order = get_object_or_404(OrderMain, order_id=order_id)
+    if not _can_view_order(request, order):
+        return JsonResponse({"success": False, "error": "Unauthorized"}, status=403)
+    status, message = confirmation_status(order)
+    data = {"success": True, "status": status}
+    if status == 'placed':
+        data["redirect"] = reverse('order_processing_animation', args=[order.order_id])
+    elif status == 'failed':
+        messages.error(request, message)
+        data["redirect"] = f"{reverse('payment_failed_page')}?order_id={order.order_id}"
+    return JsonResponse(data)
+
+
+@csrf_exempt
+@require_POST
+def razorpay_webhook(request):
+    """
+    Razorpay webhook: verify, store in the inbox and answer at once. Razorpay
+    retries anything but a 2xx, so only a bad signature or body is refused.
+    """
+    try:
+        gateway.verify_webhook_signature(request.body, request.headers.get('X-Razorpay-Signature'))
+        body = json.loads(request.body)
+    except (razorpay.errors.SignatureVerificationError, ValueError):
+        return HttpResponse(status=400)
+    event_id = request.headers.get('X-Razorpay-Event-Id') or hashlib.sha256(request.body).hexdigest()
+    record_webhook(event_id, body)
+    return HttpResponse(status=200)
+
+
 @require_http_methods(["GET"])          
 def payment_failed_page(request):
     order_id = request.GET.get('order_id')
@@ -626,6 +595,8 @@ def payment_failed_page(request):
     if order_id:
         OrderMain.objects.filter(order_id=order_id, order_status='draft').update(order_status='failed')
         OrderItem.objects.filter(order__order_id=order_id, status='draft').update(status='failed')
+        release_reservations(order_id)
+        fail_open_attempts(order_id)
         
     context = {
         'order_id': order_id
@@ -653,16 +624,12 @@ def retry_order_payment(request, order_id):
 
     # Prepare Razorpay order
     try:
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
         amount_paise = int(order.final_price * 100)
-        razorpay_order = client.order.create({
-            "amount": amount_paise,
-            "currency": settings.RAZORPAY_CURRENCY,
-            "payment_capture": 1,
-        })
+        razorpay_order = gateway.create_order(amount_paise)
         
         order.razorpay_order_id = razorpay_order["id"]
         order.save(update_fields=['razorpay_order_id'])
+        start_attempt(razorpay_order, order=order)
         
         # Update session for callback
         request.session['pending_razorpay'] = {
@@ -685,6 +652,8 @@ def retry_order_payment(request, order_id):
             "user_phone": user_phone,
             "callback_url": settings.RAZORPAY_CALLBACK_URL,
         })
+    except gateway.GatewayUnavailable as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=503)
     except Exception as e:
         print("Retry payment error:", e)
         return JsonResponse({"success": False, "error": f"Failed to re-initiate payment: {str(e)}"}, status=500)
\ No newline at end of file
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:58
+
+import django.db.models.deletion
+from django.conf import settings
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def fill_rating_summaries(apps, schema_editor):
+    Review = apps.get_model("review", "Review")
+    ProductRatingSummary = apps.get_model("review", "ProductRatingSummary")
+    totals = Review.objects.values("product_id").annotate(
+        review_count=Count("id"),
+        rating_sum=Sum("rating"),
+        **{f"stars_{stars}": Count("id", filter=Q(rating=stars)) for stars in range(1, 6)},
+    ).order_by()
+    ProductRatingSummary.objects.bulk_create(
+        [
+            ProductRatingSummary(
+                **row,
+                average_rating=(Decimal(row["rating_sum"]) / row["review_count"]).quantize(Decimal("0.01")),
+            )
+            for row in totals
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0021_product_search_vector'),
+        ('review', '0002_alter_review_product_alter_review_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRatingSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='products.product')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('average_rating', models.DecimalField(decimal_places=2, default=0, max_digits=3)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Product rating summaries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', '-created_at', '-id'], name='review_revi_product_598f9d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productratingsummary',
+            index=models.Index(fields=['-average_rating', '-review_count'], name='review_prod_average_08f20a_idx'),
+        ),
+        migrations.RunPython(fill_rating_summaries, migrations.RunPython.noop),
+    ]
@@ -10,6 +10,48 @@ class Review(models.Model):
     rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Keyset paging of a product's reviews, newest first
+            models.Index(fields=["product", "-created_at", "-id"]),
+        ]
     
     def __str__(self):
-        return f"{self.user.first_name} - {self.product.name} ({self.rating} stars)"
\ No newline at end of file
+        return f"{self.user.first_name} - {self.product.name} ({self.rating} stars)"
+
+class ProductRatingSummary(models.Model):
+    """
+    Denormalized review totals per product, kept in sync by userFolder.review.services.
+    The listing sorts and filters on average_rating instead of aggregating reviews.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="rating_summary"
+    )
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Product rating summaries"
+        indexes = [
+            models.Index(fields=["-average_rating", "-review_count"]),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.average_rating} ({self.review_count})"
+
+    @property
+    def histogram(self):
+        """(stars, count, percent) from 5 down to 1, for the detail page bars."""
+        return [
+            (stars, count, round(count * 100 / self.review_count) if self.review_count else 0)
+            for stars in range(5, 0, -1)
+            for count in [getattr(self, f"stars_{stars}")]
+        ]
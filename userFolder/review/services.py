@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import Review, ProductRatingSummary
+
+STAR_FIELDS = [f"stars_{stars}" for stars in range(1, 6)]
+
+
+def _average(rating_sum, review_count):
+    if not review_count:
+        return Decimal("0")
+    return (Decimal(rating_sum) / review_count).quantize(Decimal("0.01"))
+
+
+@transaction.atomic
+def apply_rating_change(product_id, old_rating=None, new_rating=None):
+    """
+    Moves one review in a product's summary: old_rating only for a delete,
+    new_rating only for a new review, both for an edited rating.
+    The summary row is locked so concurrent reviews cannot lose updates.
+    """
+    summaries = ProductRatingSummary.objects.select_for_update()
+    if new_rating is None:
+        # Nothing to take away from, and the product may be mid-cascade delete
+        summary = summaries.filter(product_id=product_id).first()
+        if summary is None:
+            return
+    else:
+        summary, _ = summaries.get_or_create(product_id=product_id)
+
+    if old_rating is not None:
+        summary.review_count -= 1
+        summary.rating_sum -= old_rating
+        setattr(summary, f"stars_{old_rating}", getattr(summary, f"stars_{old_rating}") - 1)
+    if new_rating is not None:
+        summary.review_count += 1
+        summary.rating_sum += new_rating
+        setattr(summary, f"stars_{new_rating}", getattr(summary, f"stars_{new_rating}") + 1)
+    summary.average_rating = _average(summary.rating_sum, summary.review_count)
+    summary.save()
+
+
+@transaction.atomic
+def rebuild_rating_summaries(product_ids=None):
+    """
+    Recomputes ProductRatingSummary rows from reviews.
+    With product_ids only those products are rebuilt, otherwise every product.
+    """
+    reviews = Review.objects.all()
+    stale = ProductRatingSummary.objects.all()
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        reviews = reviews.filter(product_id__in=product_ids)
+        stale = stale.filter(product_id__in=product_ids)
+
+    totals = reviews.values("product_id").annotate(
+        review_count=Count("id"),
+        rating_sum=Sum("rating"),
+        **{f"stars_{stars}": Count("id", filter=Q(rating=stars)) for stars in range(1, 6)},
+    ).order_by()
+
+    summaries = [
+        ProductRatingSummary(
+            product_id=row["product_id"],
+            review_count=row["review_count"],
+            rating_sum=row["rating_sum"],
+            average_rating=_average(row["rating_sum"], row["review_count"]),
+            **{field: row[field] for field in STAR_FIELDS},
+        )
+        for row in totals
+    ]
+    stale.filter(product__reviews__isnull=True).delete()
+    ProductRatingSummary.objects.bulk_create(
+        summaries,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["review_count", "rating_sum", "average_rating", *STAR_FIELDS, "updated_at"],
+    )
+    return len(summaries)
@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from products.cache import invalidate_tags, product_tag
+from .models import Review
+from .services import apply_rating_change
+
+
+@receiver(post_init, sender=Review)
+def remember_rating(sender, instance, **kwargs):
+    instance._loaded_rating = instance.rating
+
+
+@receiver(post_save, sender=Review)
+def update_rating_summary_on_save(sender, instance, created, **kwargs):
+    previous = None if created else instance._loaded_rating
+    instance._loaded_rating = instance.rating
+    if created or previous != instance.rating:
+        apply_rating_change(instance.product_id, previous, instance.rating)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_summary_on_delete(sender, instance, **kwargs):
+    apply_rating_change(instance.product_id, old_rating=instance._loaded_rating)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_product_on_review_change(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_tags(product_tag(instance.product_id)))
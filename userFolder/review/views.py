@@ -2,13 +2,46 @@ import json
 
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
+from django.template.loader import render_to_string
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_protect
 from django.db import transaction
 from userFolder.order.models import OrderItem
 
 from products.models import Product
-from .models import Review
+from products.pagination import KeysetPaginator
+from .models import Review, ProductRatingSummary
+
+REVIEWS_PER_PAGE = 10
+
+
+def review_page(product_id, cursor=None, review_count=None):
+    """
+    One page of a product's reviews, newest first, seeking on (created_at, id)
+    so deep pages cost the same as the first. review_count from the rating
+    summary saves the count query.
+    """
+    if review_count is None:
+        summary = ProductRatingSummary.objects.filter(product_id=product_id).values("review_count").first()
+        review_count = summary["review_count"] if summary else 0
+    reviews = (
+        Review.objects.filter(product_id=product_id)
+        .select_related("user")
+        .order_by("-created_at", "-id")
+    )
+    paginator = KeysetPaginator(reviews, REVIEWS_PER_PAGE, count=review_count)
+    if cursor:
+        return paginator.page_from_cursor(cursor)
+    return paginator.page_from_number(1)
+
+
+@require_http_methods(["GET"])
+def product_reviews(request, product_id):
+    page = review_page(product_id, cursor=request.GET.get("cursor"))
+    return JsonResponse({
+        "html": render_to_string("products/reviews/review_items.html", {"reviews": page.object_list}),
+        "next_cursor": page.next_cursor,
+    })
 
 
 @require_http_methods(["POST"])
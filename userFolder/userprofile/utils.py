@@ -1,8 +1,8 @@
 from django.utils.crypto import get_random_string
 import string
 from accounts.models import *
-from django.template.loader import render_to_string
-from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from accounts.outbox import queue_email
 
 def generate_alphabetical_code(length=4):
     '''
@@ -15,23 +15,19 @@ def generate_alphabetical_code(length=4):
     return code
 
 def send_email_otp(user, request):
-    # delete old OTPs
-    EmailOTP.objects.filter(user=user).delete()
-
-    otp = generate_alphabetical_code()
-    EmailOTP.objects.create(user=user, otp=otp)
-
-    html_message = render_to_string(
-        'email/email_verification.html',
-        {'otp_code': otp, 'first_name': user.first_name}
-    )
-
-    msg = EmailMultiAlternatives(
-        subject='Email Verification OTP',
-        body=f'Your OTP code is {otp}',
-        to=[user.email],
-    )
-    msg.attach_alternative(html_message, "text/html")
-    msg.send()
+    with transaction.atomic():
+        # delete old OTPs
+        EmailOTP.objects.filter(user=user).delete()
+
+        otp = generate_alphabetical_code()
+        EmailOTP.objects.create(user=user, otp=otp)
+
+        queue_email(
+            user.email,
+            'Email Verification OTP',
+            f'Your OTP code is {otp}',
+            'email/email_verification.html',
+            {'otp_code': otp, 'first_name': user.first_name},
+        )
 
     request.session['email_to_verify'] = user.email
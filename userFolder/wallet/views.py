@@ -15,17 +15,21 @@ from django.views.decorators.cache import never_cache
 from django.contrib import messages
 from django.contrib.auth import login as auth_login
 from django.db import transaction
-from django.db.models import F, Q
+from django.db.models import F
 from django.urls import reverse
 from django.utils import timezone
 
 from userFolder.cart.models import Cart
+from userFolder.cart.services import get_cart_summary
 from products.models import ProductVariant
+from userFolder.payment import gateway
+from userFolder.payment.attempts import close_attempt, find_attempt, start_attempt
+from userFolder.payment.models import PaymentAttemptStatus
 from userFolder.userprofile.models import Address
 from userFolder.order.models import OrderItem,OrderMain
+from userFolder.order.finalize import OrderFinalizationError, finalize_order
+from userFolder.order.inventory import InsufficientStock
 from userFolder.cart.utils import get_annotated_cart_items
-from django.template.loader import render_to_string
-from django.core.mail import EmailMultiAlternatives
 from userFolder.payment.utils import *
 
 # Create your views here.
@@ -62,19 +66,10 @@ def create_wallet_razorpay_order(request):
     
     wallet = get_object_or_404(Wallet,user=user)
     try:
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-    
         amount_paise = int(amount * 100)
+        razorpay_order = gateway.create_order(amount_paise)
         
-        data = {
-            "amount": amount_paise,
-            "currency" : settings.RAZORPAY_CURRENCY,
-            "payment_capture" : 1,
-        }
-
-        razorpay_order = client.order.create(data=data)
-        
-        Transaction.objects.create(
+        top_up = Transaction.objects.create(
             wallet=wallet,
             transaction_type='CR',
             amount=amount,
@@ -82,6 +77,9 @@ def create_wallet_razorpay_order(request):
             status="PD",
             payment_id=razorpay_order['id'] 
         )
+        start_attempt(razorpay_order, wallet_transaction=top_up)
+    except gateway.GatewayUnavailable as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=503)
     except Exception as e:
         print(f"Razorpay Order Creation Error: {e}")
         return JsonResponse({"success": False, "error": "Failed to communicate with payment gateway."})
@@ -133,9 +131,8 @@ def wallet_razorpay_callback(request):
         return redirect('wallet_top_up_failure')
 
     # --- STEP 2: Find the Transaction in our Database ---
-    transaction_obj = Transaction.objects.filter(
-        Q(payment_id=razorpay_order_id) | Q(payment_id=razorpay_payment_id)
-    ).first()
+    attempt = find_attempt(razorpay_order_id)
+    transaction_obj = attempt.wallet_transaction if attempt else None
 
     if transaction_obj and transaction_obj.status == TransactionStatus.COMPLETED:
         # Already processed - redirect to success
@@ -155,18 +152,14 @@ def wallet_razorpay_callback(request):
             messages.error(request, "Transaction session expired. Please try again.")
             return redirect('wallet_top_up_failure')
     
-    client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
     try:
-        client.utility.verify_payment_signature({
-            'razorpay_order_id': razorpay_order_id,
-            'razorpay_payment_id': razorpay_payment_id,
-            'razorpay_signature': razorpay_signature,
-        })
+        gateway.verify_payment_signature(razorpay_order_id, razorpay_payment_id, razorpay_signature)
     except razorpay.errors.SignatureVerificationError:
         # Mark transaction as failed
         if transaction_obj:
             transaction_obj.status = TransactionStatus.FAILED
             transaction_obj.save()
+            close_attempt(attempt, PaymentAttemptStatus.FAILED)
         messages.error(request, "Security check failed. Invalid signature.")
         return redirect('wallet_top_up_failure')
     except Exception as e:
@@ -175,6 +168,7 @@ def wallet_razorpay_callback(request):
         if transaction_obj:
             transaction_obj.status = TransactionStatus.FAILED
             transaction_obj.save()
+            close_attempt(attempt, PaymentAttemptStatus.FAILED)
         messages.error(request, "Something went wrong while verifying the payment.")
         return redirect('wallet_top_up_failure')
     
@@ -190,6 +184,7 @@ def wallet_razorpay_callback(request):
                 transaction_obj.status = TransactionStatus.COMPLETED
                 transaction_obj.payment_id = razorpay_payment_id
                 transaction_obj.save()
+                close_attempt(attempt, PaymentAttemptStatus.PAID, razorpay_payment_id)
             else:
                 user_wallet.balance += amount_to_add
                 user_wallet.save()
@@ -222,6 +217,7 @@ def wallet_razorpay_callback(request):
         if transaction_obj:
             transaction_obj.status = TransactionStatus.FAILED
             transaction_obj.save()
+            close_attempt(attempt, PaymentAttemptStatus.FAILED)
         messages.error(request, "Payment was successful, but your balance failed to update. Please contact support.")
         return redirect('wallet_top_up_failure')
 
@@ -246,188 +242,47 @@ def pay_using_wallet(request):
                     messages.error(request, error.get('error', 'Validation error'))
                     return redirect('checkout')
 
-                # STOCK DEDUCTION FOR DRAFT ORDER (MISSING BEFORE)
-                for item in order.items.all():
-                    variant = ProductVariant.objects.select_for_update().get(id=item.variant.id)
-                    if item.quantity > variant.stock:
-                        messages.error(request, f"Out of stock: {item.product_name}")
-                        return redirect('checkout')
-                    variant.stock -= item.quantity
-                    variant.save()
-
-                if order.coupon_code:
-                    coupon = Coupon.objects.select_for_update().get(code=order.coupon_code)
-
-                    if coupon.one_time_per_user and CouponUsage.objects.filter(user=user, coupon=coupon).exists():
-                        raise ValueError("Coupon already used")
-
-                    coupon.times_used += 1
-                    coupon.save()
-
-                    CouponUsage.objects.create(
-                        coupon=coupon,
-                        user=user,
-                        order=order,
-                        discount_amount=order.coupon_discount,
-                        cart_total_before_discount=order.final_price + order.coupon_discount
-                    )
-
-                wallet = Wallet.objects.select_for_update().get(user=user)
-                total_wallet_deduction = order.final_price + order.wallet_deduction
-
-                if wallet.balance < total_wallet_deduction:
-                    raise ValueError("Insufficient wallet balance for full payment")
-
-                wallet.balance -= total_wallet_deduction
-                wallet.save()
-
-                Transaction.objects.create(
-                    wallet=wallet,
-                    transaction_type=TransactionType.DEBIT,
-                    amount=total_wallet_deduction,
-                    description=f'Full wallet payment for order {order.order_id}',
-                    status=TransactionStatus.COMPLETED,
-                    related_order=order
-                )
-                
-                order.payment_method = 'wallet'
-                order.payment_status = 'paid'
-                order.is_paid = True
-                order.wallet_deduction = total_wallet_deduction
-                order.final_price = Decimal('0.00')
-                order.order_status = 'pending'
-                order.expires_at = None
-                order.save()
-
-                # Update item statuses
-                order.items.all().update(status='pending')
-
-                cart_items.delete()
-                Cart.objects.filter(user=user).delete()
-
-                # Clear draft order from session
-                if 'draft_order_id' in request.session:
-                    del request.session['draft_order_id']
-                # Set order_id in session for authorization
-                request.session['order_id'] = order.order_id
-
             else:
-                # Path 2: No direct draft order (though create_draft_order usually handles this)
-                cart_items, error = validate_stock_and_cart(user)
+                # Path 2: No draft order yet, create one and place it like path 1
+                summary = get_cart_summary(user)
+                error = summary.validation_error()
                 if error:
                     messages.error(request, error.get('error', 'Validation error'))
                     return redirect('checkout')
 
-                totals = calculate_cart_totals(cart_items)
-
                 address, error = validate_address(request=request, user=user)
                 if error:
                     messages.error(request, error.get('error', 'Validation error'))
                     return redirect('checkout')
 
-                order = OrderMain.objects.create(
-                    user=user,
-                    shipping_address_name=address.full_name,
-                    shipping_address_line_1=address.address_line_1,
-                    shipping_city=address.city,
-                    shipping_state=address.state,
-                    shipping_pincode=address.postal_code,
-                    shipping_phone=address.phone_number,
-                    payment_method='wallet',
-                    order_status='pending',
-                    payment_status='pending',
-                    is_paid=False,
-                    total_price=totals['subtotal'],
-                    discount_amount=totals['cart_discount'],
-                    shipping_amount=totals['shipping'],
-                    final_price=totals['grand_total']
-                )
-
-                wallet = Wallet.objects.select_for_update().get(user=user)
-
-                if wallet.balance < order.final_price:
-                    raise ValueError("Insufficient wallet balance")
-
-                wallet.balance -= order.final_price
-                wallet.save()
-
-                Transaction.objects.create(
-                    wallet=wallet,
-                    transaction_type=TransactionType.DEBIT,
-                    amount=order.final_price,
-                    description=f'Full wallet payment for order {order.order_id}',
-                    status=TransactionStatus.COMPLETED,
-                    related_order=order
-                )
-
-                variant_ids = [item.variant.id for item in cart_items]
-                variants = ProductVariant.objects.select_for_update().filter(id__in=variant_ids)
-                variant_map = {v.id: v for v in variants}
-
-                order_items_to_create = []
-                variants_to_update = []
-                
-                for item in cart_items:
-                    current_variant = variant_map.get(item.variant.id)
-
-                    order_items_to_create.append(
-                        OrderItem(
-                            order=order,
-                            variant=current_variant,
-                            product_name=current_variant.product.name,
-                            quantity=item.quantity,
-                            price_at_purchase=item.final_price,
-                            status='pending'
-                        )
-                    )
-
-                    current_variant.stock -= item.quantity
-                    variants_to_update.append(current_variant)
-
-                OrderItem.objects.bulk_create(order_items_to_create)
-                ProductVariant.objects.bulk_update(variants_to_update, ["stock"])  
-
-                # For full wallet payment, we can move the entire final_price to wallet_deduction
-                total_paid = order.final_price
-                order.wallet_deduction = total_paid
-                order.final_price = Decimal('0.00')
-                order.is_paid = True
-                order.payment_status = 'paid'
-                order.save()
-
-                # Delete cart items
-                cart_items.delete()
-                Cart.objects.filter(user=user).delete()
-
-                # Clear draft order from session
-                if 'draft_order_id' in request.session:
-                    del request.session['draft_order_id']
-                # Set order_id in session for authorization on the animation page
-                request.session['order_id'] = order.order_id
+                order, error = create_draft_order(user=user, address=address, cart_items=summary.lines, totals=summary.totals)
+                if error:
+                    messages.error(request, error.get('error', 'Validation error'))
+                    return redirect('checkout')
 
-        # Send Email (Common Path)
-        try:
-            html_message = render_to_string(
-                'email/order_success_mail.html',
-                {'order': order, 'items': order.items.all()}
+            # Whole payable amount from the wallet, recorded as the wallet deduction
+            total_wallet_deduction = order.final_price + order.wallet_deduction
+            finalize_order(
+                order,
+                payment_method='wallet',
+                payment_status='paid',
+                is_paid=True,
+                wallet_amount=total_wallet_deduction,
+                wallet_deduction=total_wallet_deduction,
+                final_price=Decimal('0.00'),
             )
-            msg = EmailMultiAlternatives(
-                subject='Order Successful',
-                body='Order placed successfully!',
-                to=[order.user.email],
-            )
-            msg.attach_alternative(html_message, 'text/html')
-            msg.send()
-        except Exception as e:
-            print("Email error:", e)
+
+            # Clear draft order from session
+            if 'draft_order_id' in request.session:
+                del request.session['draft_order_id']
+            # Set order_id in session for authorization on the animation page
+            request.session['order_id'] = order.order_id
 
         return redirect('order_processing_animation', order_id=order.order_id)
 
     except OrderMain.DoesNotExist:
         messages.error(request, "Draft order not found.")
-    except Wallet.DoesNotExist:
-        messages.error(request, "Wallet not found.")
-    except ValueError as e:
+    except (InsufficientStock, OrderFinalizationError) as e:
         messages.error(request, str(e))
     except Exception as e:
         print("Checkout error:", e)
@@ -9,6 +9,8 @@ from userFolder.cart.models import Cart,CartItems
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from userFolder.cart.utils import verification_required
+from userFolder.cart.counters import CART, WISHLIST, adjust_count
+from userFolder.cart.services import cart_changed
 
 # Create your views here.
 @verification_required
@@ -67,6 +69,7 @@ def add_to_wishlist(request):
     product.save()
     
     if created:
+        adjust_count(WISHLIST, request.user.pk, 1)
         return JsonResponse({"status":"success","message":"Item Added to the wishlist",},status=200)
     else:
         return JsonResponse({"status":"error","message":"Item already in the wishlist",},status=400)
@@ -103,8 +106,10 @@ def add_to_cart(request):
             size=size,
             from_wishlist = True
         )
-        wishlist_item = WishlistItem.objects.get(variant=variant)
-        wishlist_item.delete()
+        adjust_count(CART, request.user.pk, 1)
+        cart_changed(request.user.pk)
+        removed, _ = WishlistItem.objects.filter(wishlist__user=request.user, variant=variant).delete()
+        adjust_count(WISHLIST, request.user.pk, -removed)
         return JsonResponse({"status":"success","message":"Item moved to the cart"})
     else:
         return JsonResponse({"status":"error","message":"Item already in the cart"})
@@ -143,6 +148,7 @@ def remove_from_wishlist(request):
         item.product.in_wishlist = False
         item.product.save()
         item.delete()
+        adjust_count(WISHLIST, request.user.pk, -1)
         return JsonResponse({
             "status": "success", 
             "message": "Item removed from the wishlist!"